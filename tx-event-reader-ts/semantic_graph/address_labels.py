@@ -0,0 +1,160 @@
+"""
+주소 -> 라벨 레지스트리와 (프로토콜 라벨, 이벤트 이름) 규칙 dispatch
+
+swap.json / staking.json / withdraw.json의 프로토콜 규칙은 address_label(예: ["Compound"])을 가지고 있음.
+이벤트를 발생시킨 주소(event["address"])를 레지스트리에서 라벨로 바꾸고, 라벨이 가리키는 프로토콜의 규칙만 적용해서
+Mint / Deposit 같은 흔한 이름이 다른 프로토콜의 규칙으로 잘못 추출되지 않도록 함.
+
+레지스트리 파일 형식 (--labels):
+    JSON: {"0x4ddc...": "Compound cETH", ...} 또는 {"0x4ddc...": {"label": "Compound cETH"}, ...}
+    CSV: address,label 헤더가 있는 표 (etherscan 라벨 export 등)
+키는 16진수 주소뿐 아니라 디코더가 이미 붙인 이름("bzx iToken" 등)도 사용할 수 있음 (대소문자 무시)
+"""
+import csv
+import hashlib
+import json
+import re
+
+_LABEL_SPLIT = re.compile(r"[\s\-_/:.()]+")
+
+
+def label_key(label):
+    """라벨 비교용 key: 소문자로 바꾸고 구분자(공백, -, _ 등)를 공백 하나로 통일"""
+    return " ".join(token for token in _LABEL_SPLIT.split(label.lower()) if token)
+
+
+def _is_hex_address(address):
+    return len(address) == 42 and address[:2] in ("0x", "0X")
+
+
+class AddressLabelRegistry:
+    """
+    주소(소문자) -> 라벨 해시 인덱스
+
+    resolve는 dict 조회 한 번으로 끝나므로 레지스트리가 수만 개 컨트랙트로 커져도 이벤트당 비용이 일정함.
+    레지스트리에 없는 주소가 16진수가 아니면 디코더가 붙인 이름으로 보고 그대로 라벨로 사용함
+    """
+
+    def __init__(self, labels=None):
+        self._labels = {}
+        self._fingerprint = None
+        for address, label in (labels or {}).items():
+            self.add(address, label)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def add(self, address, label):
+        self._labels[address.lower()] = label
+        self._fingerprint = None
+
+    def resolve(self, address):
+        """이벤트 주소의 라벨 (알 수 없는 16진수 주소면 None)"""
+        if not address:
+            return None
+        label = self._labels.get(address.lower())
+        if label is not None:
+            return label
+        return None if _is_hex_address(address) else address
+
+    def fingerprint(self):
+        """레지스트리 내용의 해시 (GraphCache 키에 포함해서 라벨이 바뀌면 캐시를 무효화)"""
+        if self._fingerprint is None:
+            canonical = json.dumps(sorted(self._labels.items()), ensure_ascii=False)
+            self._fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+
+def load_address_labels(file_path=None):
+    """JSON / CSV 파일에서 AddressLabelRegistry 생성 (file_path가 없으면 빈 레지스트리)"""
+    registry = AddressLabelRegistry()
+    if not file_path:
+        return registry
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        if file_path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                if row.get("address") and row.get("label"):
+                    registry.add(row["address"].strip(), row["label"].strip())
+            return registry
+        for address, entry in json.load(f).items():
+            label = entry.get("label") if isinstance(entry, dict) else entry
+            if label:
+                registry.add(address, label)
+    return registry
+
+
+def _rule_label_keys(rule):
+    labels = rule.get("address_label")
+    if not labels:
+        return ()
+    if isinstance(labels, str):
+        labels = [labels]
+    return tuple(label_key(label) for label in labels)
+
+
+class LabelDispatchIndex(dict):
+    """
+    이벤트 이름 -> 전체 규칙 인덱스(compile_semantic_index 결과)에 (프로토콜, 이벤트 이름) dispatch를 더한 인덱스
+
+    dict 내용은 원래 인덱스와 같아서 이름으로 조회하는 기존 코드는 그대로 동작하고,
+    extract_event_edges는 rules_for(event)로 발생 주소의 프로토콜에 맞는 규칙만 가져옴.
+    - 프로토콜 규칙이 없는 이름(Transfer 등): 라벨과 무관하게 전체 규칙
+    - 라벨을 알 수 없는 주소: 기존처럼 전체 규칙
+    - 라벨이 규칙의 프로토콜과 맞지 않음: address_label 없는 규칙만 (없으면 매칭되지 않음)
+    """
+
+    def __init__(self, semantic_index, label_registry):
+        super().__init__(semantic_index)
+        self.label_registry = label_registry
+        # (프로토콜 key, 이벤트 이름) -> 적용할 규칙 (원래 순서 유지, 라벨 없는 규칙 포함)
+        self._by_protocol = {}
+        # 프로토콜 규칙이 있는 이벤트 이름 -> 라벨 없는 규칙
+        self._generic = {}
+        self._protocol_keys = set()
+        for name, rules in semantic_index.items():
+            rule_keys = [_rule_label_keys(rule) for rule in rules]
+            protocols = {key for keys in rule_keys for key in keys}
+            if not protocols:
+                continue
+            self._protocol_keys.update(protocols)
+            self._generic[name] = [rule for rule, keys in zip(rules, rule_keys) if not keys]
+            for protocol in protocols:
+                self._by_protocol[(protocol, name)] = [rule for rule, keys in zip(rules, rule_keys)
+                                                       if not keys or protocol in keys]
+        # 라벨 -> 프로토콜 key (없으면 None)
+        self._protocol_cache = {}
+
+    def protocol_of(self, label):
+        """
+        라벨이 가리키는 프로토콜 key (규칙의 address_label 중 가장 긴 앞부분 일치, 없으면 None)
+
+        "Compound cETH" -> "compound", "Uniswap-WBTC" -> "uniswap", "dydx" -> "dydx"
+        """
+        try:
+            return self._protocol_cache[label]
+        except KeyError:
+            pass
+        tokens = label_key(label).split(" ")
+        protocol = None
+        for end in range(len(tokens), 0, -1):
+            candidate = " ".join(tokens[:end])
+            if candidate in self._protocol_keys:
+                protocol = candidate
+                break
+        self._protocol_cache[label] = protocol
+        return protocol
+
+    def rules_for(self, event):
+        """이벤트에 적용할 규칙 리스트 (없으면 None)"""
+        name = event.get('name')
+        generic = self._generic.get(name)
+        if generic is None:
+            return self.get(name)
+        label = self.label_registry.resolve(event.get('address'))
+        if label is None:
+            return self.get(name)
+        rules = self._by_protocol.get((self.protocol_of(label), name))
+        if rules is None:
+            return generic or None
+        return rules
+
@@ -0,0 +1,184 @@
+"""
+토큰 금액 표현
+
+디코딩 된 input의 rawValue / formattedValue / symbol을 한 번만 파싱해서
+(정수 원시값, decimals, 토큰 심볼) 형태로 보관함. 합산은 정수로 정확하게 수행하고
+float 변환은 표시(노드 크기, 엣지 weight)할 때만 함.
+"""
+import math
+from collections import defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+Amount = namedtuple("Amount", ["raw", "decimals", "symbol"])
+
+# uint256 금액을 32bit limb 8개로 나눠서 uint64 배열로 합산 (2^31개까지 overflow 없음)
+_LIMB_BITS = 32
+_LIMB_COUNT = 8
+
+
+def load_numpy():
+    """NumPy 모듈 반환 (설치되어 있지 않으면 None). import 비용 때문에 벡터 연산을 할 때만 로드함"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def parse_amount(value, formatted_value=None, symbol="", decimals=None):
+    """
+    rawValue(정수 문자열) 와 formattedValue로부터 Amount 생성
+
+    decimals가 주어지지 않으면 rawValue / formattedValue 비율로 추정함.
+    정수가 아닌 값(예: "1.5")은 소수 자릿수를 decimals로 사용함.
+    금액으로 해석할 수 없으면 None 반환
+    """
+    symbol = symbol or ""
+    text = str(value).strip()
+
+    try:
+        raw = int(text)
+    except ValueError:
+        # 정수가 아닌 경우 (formattedValue만 있는 경우 등) 소수 자릿수를 decimals로 사용
+        try:
+            number = Decimal(text)
+        except InvalidOperation:
+            return None
+        if not number.is_finite():
+            return None
+        exponent = number.normalize().as_tuple().exponent
+        scale = max(0, -exponent)
+        return Amount(int(number.scaleb(scale)), scale, symbol)
+
+    if decimals is None:
+        decimals = _infer_decimals(raw, formatted_value)
+
+    return Amount(raw, decimals, symbol)
+
+
+def _infer_decimals(raw, formatted_value):
+    if raw == 0 or formatted_value is None or isinstance(formatted_value, bool):
+        return 0
+    try:
+        formatted = float(formatted_value)
+    except (TypeError, ValueError):
+        return 0
+    # int256 값(잔액 변화 등)은 음수일 수 있으므로 크기만 비교
+    if formatted == 0 or not math.isfinite(formatted):
+        return 0
+    return max(0, round(math.log10(abs(raw) / abs(formatted))))
+
+
+def amount_from_input(input_field, csv_index=None):
+    """decoded input 필드 하나를 Amount로 변환 (csv_index는 tuple 값의 CSV 인덱스)"""
+    value = input_field.get('rawValue')
+    formatted_value = input_field.get('formattedValue')
+
+    if value is None:
+        value = formatted_value
+
+    # CSV 형식 값에서 특정 인덱스 추출 (formattedValue는 tuple 전체에 대한 값이 아니므로 사용하지 않음)
+    if csv_index is not None and isinstance(value, str) and ',' in value:
+        parts = value.split(',')
+        if csv_index >= len(parts):
+            return None
+        value = parts[csv_index]
+        formatted_value = None
+
+    if value is None:
+        return None
+
+    return parse_amount(value, formatted_value, input_field.get('symbol', ''), input_field.get('decimals'))
+
+
+def format_amount(amount):
+    """Amount를 정확한 10진수 문자열로 변환 (심볼 제외)"""
+    if amount.decimals == 0:
+        return str(amount.raw)
+    sign = "-" if amount.raw < 0 else ""
+    integer_part, fraction_part = divmod(abs(amount.raw), 10 ** amount.decimals)
+    fraction_text = str(fraction_part).rjust(amount.decimals, "0").rstrip("0")
+    if fraction_text:
+        return f"{sign}{integer_part}.{fraction_text}"
+    return f"{sign}{integer_part}"
+
+
+def format_raw_amount(raw_text, decimals):
+    """
+    10진수 정수 문자열(str(raw))을 format_amount와 같은 문자열로 변환
+
+    정수 변환 / 나눗셈 없이 문자열만 자르므로 내보낸 그래프를 읽을 때 amount 문자열을 다시 만드는 데 사용
+    """
+    if decimals == 0:
+        return raw_text
+    sign = ""
+    if raw_text.startswith("-"):
+        sign, raw_text = "-", raw_text[1:]
+    digits = raw_text.rjust(decimals + 1, "0")
+    fraction_text = digits[-decimals:].rstrip("0")
+    if fraction_text:
+        return f"{sign}{digits[:-decimals]}.{fraction_text}"
+    return f"{sign}{digits[:-decimals]}"
+
+
+def amount_to_float(amount):
+    """표시용 float 변환 (합산에는 사용하지 않음)"""
+    return float(Fraction(amount.raw, 10 ** amount.decimals))
+
+
+def sum_amounts_by_token(amounts, vectorized=False):
+    """Amount 목록을 (symbol, decimals) 별 정확한 정수 합계로 집계"""
+    return sum_raw_by_key((((amount.symbol, amount.decimals), amount.raw) for amount in amounts), vectorized)
+
+
+def sum_raw_by_key(keyed_raws, vectorized=False):
+    """
+    (key, 정수 원시값) 목록을 key 별 정확한 정수 합계로 집계
+
+    vectorized=True이고 NumPy가 설치되어 있으면 32bit limb 배열로 나눠 한 번에 합산함
+    """
+    if vectorized and load_numpy() is not None:
+        return _sum_raw_by_key_numpy(keyed_raws)
+
+    totals = defaultdict(int)
+    for key, raw in keyed_raws:
+        totals[key] += raw
+    return dict(totals)
+
+
+def _sum_raw_by_key_numpy(keyed_raws):
+    np = load_numpy()
+    key_codes = {}
+    codes = []
+    raw_bytes = bytearray()
+    out_of_range = []
+    width = _LIMB_BITS * _LIMB_COUNT // 8
+
+    for key, raw in keyed_raws:
+        codes.append(key_codes.setdefault(key, len(key_codes)))
+        if raw < 0 or raw.bit_length() > _LIMB_BITS * _LIMB_COUNT:
+            # uint256 범위를 벗어나는 값은 Python 정수로 따로 더함
+            out_of_range.append((key, raw))
+            raw_bytes += bytes(width)
+        else:
+            raw_bytes += raw.to_bytes(width, "little")
+
+    if not codes:
+        return {}
+
+    limbs = np.frombuffer(bytes(raw_bytes), dtype="<u4").reshape(-1, _LIMB_COUNT).astype(np.uint64)
+    sums = np.zeros((len(key_codes), _LIMB_COUNT), dtype=np.uint64)
+    np.add.at(sums, np.asarray(codes, dtype=np.intp), limbs)
+
+    totals = {}
+    for key, code in key_codes.items():
+        total = 0
+        for limb_index, limb_sum in enumerate(sums[code].tolist()):
+            total += limb_sum << (_LIMB_BITS * limb_index)
+        totals[key] = total
+
+    for key, raw in out_of_range:
+        totals[key] += raw
+
+    return totals
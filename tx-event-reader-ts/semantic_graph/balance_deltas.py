@@ -0,0 +1,189 @@
+"""
+주소 x 토큰 순 잔액 변화(net balance delta) 계산
+
+transfer 엣지 목록을 (주소, symbol, decimals) 별 부호 있는 정수 합계로 줄임.
+받은 금액은 +, 보낸 금액은 - 로 더하므로 공격자의 이익 / 풀의 손실을 바로 볼 수 있음
+(노드 크기에 쓰는 거래량은 유입과 유출을 모두 더한 값이라 이 용도로는 쓸 수 없음).
+
+NumPy를 쓸 때는 주소를 pandas.factorize로 정수 코드로 바꾸고 uint256 금액을 32bit limb 8개로 나눈 뒤
+(주소, 토큰, 방향) 키로 정렬해서 np.add.reduceat으로 한 번에 합산함. 유입 합계와 유출 합계를 따로 구한 뒤 키마다 한 번만 뺌.
+"""
+from amounts import Amount, format_amount, load_numpy
+
+_LIMB_BITS = 32
+_LIMB_COUNT = 8
+_RAW_WIDTH = _LIMB_BITS * _LIMB_COUNT // 8
+_LIMB_MASK = (1 << _LIMB_BITS) - 1
+
+
+def compute_balance_deltas(edges_info, vectorized=False, include_zero=False):
+    """
+    extract_event_edges 형식의 엣지 목록에서 (주소, symbol, decimals) -> 부호 있는 정수 변화량 계산
+
+    vectorized=True이고 NumPy가 설치되어 있으면 limb 배열로 한 번에 합산함.
+    엣지가 Python dict 목록이면 배열을 만드는 비용 때문에 Python 정수 합산과 비슷하거나 느리므로,
+    이미 컬럼으로 저장된 엣지(EdgeStore.balance_deltas)나 큰 블록 범위에 사용.
+    include_zero=False이면 순 변화가 0인 (주소, 토큰)은 제외함 (거쳐가기만 한 라우터 등)
+    """
+    if not isinstance(edges_info, list):
+        edges_info = list(edges_info)
+    if vectorized and load_numpy() is not None:
+        deltas = _balance_deltas_numpy(edges_info)
+    else:
+        deltas = {}
+        for edge in edges_info:
+            amount = edge["amount"]
+            source_key = (edge["from_address"], amount.symbol, amount.decimals)
+            target_key = (edge["to_address"], amount.symbol, amount.decimals)
+            deltas[source_key] = deltas.get(source_key, 0) - amount.raw
+            deltas[target_key] = deltas.get(target_key, 0) + amount.raw
+    if not include_zero:
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+    return deltas
+
+
+def _balance_deltas_numpy(edges_info):
+    np = load_numpy()
+    if not edges_info:
+        return {}
+
+    amounts = [edge["amount"] for edge in edges_info]
+    address_values = [edge["from_address"] for edge in edges_info] + [edge["to_address"] for edge in edges_info]
+    try:
+        # 주소는 pandas.factorize로 한 번에 정수 코드로 변환 (처음 등장한 순서)
+        import pandas as pd
+        address_codes, addresses = pd.factorize(np.array(address_values, dtype=object))
+    except ImportError:
+        interned = {}
+        address_codes = np.array([interned.setdefault(address, len(interned)) for address in address_values],
+                                 dtype=np.int64)
+        addresses = list(interned)
+    sources, targets = address_codes[:len(edges_info)], address_codes[len(edges_info):]
+    token_codes = {}
+    tokens = np.array([token_codes.setdefault((amount.symbol, amount.decimals), len(token_codes))
+                       for amount in amounts], dtype=np.int64)
+
+    out_of_range = []
+    try:
+        raw_bytes = b"".join([amount.raw.to_bytes(_RAW_WIDTH, "little") for amount in amounts])
+    except OverflowError:
+        # 음수 / uint256 범위를 벗어나는 값은 0으로 두고 Python 정수로 따로 더함
+        chunks = []
+        for edge, amount in zip(edges_info, amounts):
+            if 0 <= amount.raw and amount.raw.bit_length() <= _LIMB_BITS * _LIMB_COUNT:
+                chunks.append(amount.raw.to_bytes(_RAW_WIDTH, "little"))
+            else:
+                out_of_range.append(edge)
+                chunks.append(bytes(_RAW_WIDTH))
+        raw_bytes = b"".join(chunks)
+
+    limbs = np.frombuffer(raw_bytes, dtype="<u4").reshape(-1, _LIMB_COUNT)
+    totals = signed_limb_sums(sources.astype(np.int64), targets.astype(np.int64), tokens, limbs, len(token_codes))
+
+    token_values = list(token_codes)
+    deltas = {}
+    for (address_code, token_code), delta in totals.items():
+        symbol, decimals = token_values[token_code]
+        deltas[(addresses[address_code], symbol, decimals)] = delta
+
+    for edge in out_of_range:
+        amount = edge["amount"]
+        source_key = (edge["from_address"], amount.symbol, amount.decimals)
+        target_key = (edge["to_address"], amount.symbol, amount.decimals)
+        deltas[source_key] = deltas.get(source_key, 0) - amount.raw
+        deltas[target_key] = deltas.get(target_key, 0) + amount.raw
+
+    return deltas
+
+
+def signed_limb_sums(sources, targets, tokens, limbs, token_count):
+    """
+    정수 코드 배열과 (N, 8) uint32 limb 배열로 (주소 코드, 토큰 코드) -> 부호 있는 정수 합계 계산
+
+    (주소, 토큰, 방향) 키로 정렬한 뒤 limb을 reduceat으로 한 번에 합산하고,
+    carry와 유입 - 유출 borrow도 limb 단위로 한 번에 처리해서 키마다 Python 정수 변환만 한 번 함
+    """
+    np = load_numpy()
+    count = len(sources)
+    if not count:
+        return {}
+    # 키 = (주소 * 토큰 수 + 토큰) * 2 + 방향(0: 유입, 1: 유출)
+    keys = np.concatenate([(targets * token_count + tokens) * 2, (sources * token_count + tokens) * 2 + 1])
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    sums = _normalize_limbs(np.add.reduceat(limbs.astype(np.uint64)[order % count], starts, axis=0))
+
+    # (키, 방향) 합계를 (키) 별 유입 / 유출 배열로 나눔 (limb 9개째는 carry 자리)
+    group_keys = sorted_keys[starts]
+    pair_keys, positions = np.unique(group_keys >> 1, return_inverse=True)
+    outflow = (group_keys & 1).astype(bool)
+    sums_in = np.zeros((len(pair_keys), _LIMB_COUNT + 1), dtype=np.int64)
+    sums_out = np.zeros_like(sums_in)
+    sums_in[positions[~outflow]] = sums[~outflow]
+    sums_out[positions[outflow]] = sums[outflow]
+
+    # 유입 - 유출을 limb 단위 borrow로 계산 (마지막 borrow가 남으면 음수)
+    difference = sums_in - sums_out
+    for limb_index in range(_LIMB_COUNT):
+        borrow = difference[:, limb_index] < 0
+        difference[:, limb_index] += borrow.astype(np.int64) << _LIMB_BITS
+        difference[:, limb_index + 1] -= borrow
+    negative = (difference[:, -1] < 0).tolist()
+    difference[:, -1] &= _LIMB_MASK
+    unsigned = difference[:, :-1].astype(np.uint64)
+    words = (unsigned[:, 0::2] | (unsigned[:, 1::2] << np.uint64(_LIMB_BITS))).tolist()
+    top = difference[:, -1].tolist()
+
+    addresses, token_codes = np.divmod(pair_keys, token_count)
+    totals = {}
+    for address_code, token_code, (w0, w1, w2, w3), carry, is_negative in zip(
+            addresses.tolist(), token_codes.tolist(), words, top, negative):
+        value = w0 | (w1 << 64) | (w2 << 128) | (w3 << 192) | (carry << 256)
+        if is_negative:
+            value -= 1 << (_LIMB_BITS * (_LIMB_COUNT + 1))
+        totals[(address_code, token_code)] = value
+    return totals
+
+
+def _normalize_limbs(sums):
+    """uint64 limb 합계를 carry 정리된 (M, 9) int64 32bit limb 배열로 변환 (2^31개 엣지까지 overflow 없음)"""
+    np = load_numpy()
+    normalized = np.zeros((len(sums), _LIMB_COUNT + 1), dtype=np.int64)
+    carry = np.zeros(len(sums), dtype=np.uint64)
+    for limb_index in range(_LIMB_COUNT):
+        total = sums[:, limb_index] + carry
+        normalized[:, limb_index] = (total & np.uint64(_LIMB_MASK)).astype(np.int64)
+        carry = total >> np.uint64(_LIMB_BITS)
+    normalized[:, -1] = carry.astype(np.int64)
+    return normalized
+
+
+def deltas_by_address(deltas):
+    """(주소, symbol, decimals) -> 정수 변화량을 주소 -> [Amount] 로 묶음 (Amount.raw는 부호 있는 값)"""
+    grouped = {}
+    for (address, symbol, decimals), delta in deltas.items():
+        grouped.setdefault(address, []).append(Amount(delta, decimals, symbol))
+    return grouped
+
+
+def balance_delta_records(deltas):
+    """JSON 내보내기 형식의 레코드 목록으로 변환 (주소, 토큰 순으로 정렬)"""
+    return [
+        {
+            "address": address,
+            "token": symbol,
+            "decimals": decimals,
+            "raw_delta": str(delta),
+            "delta": format_amount(Amount(delta, decimals, symbol)),
+        }
+        for (address, symbol, decimals), delta in sorted(deltas.items(), key=lambda item: tuple(map(str, item[0])))
+    ]
+
+
+def balance_deltas_from_records(records):
+    """balance_delta_records 형식에서 (주소, symbol, decimals) -> 정수 변화량 복원"""
+    return {
+        (record["address"], record.get("token", ""), record.get("decimals", 0)): int(record["raw_delta"])
+        for record in records
+    }
@@ -0,0 +1,345 @@
+"""
+decoded_logs 디렉토리(또는 glob)의 트랜잭션들을 프로세스 풀에서 일괄 처리
+
+semantic 규칙은 부모 프로세스에서 한 번만 로드하고, 각 워커는 시작 시 한 번만 컴파일함.
+파일 단위로 에러를 격리하고 마지막에 요약 리포트를 출력함.
+
+실행 예: python batch_semantic.py ../decoded_logs -o ../output/graphs --workers 8
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+
+from address_labels import load_address_labels
+from extract_semantic import (
+    block_number,
+    collect_transaction_graph,
+    compile_semantic_index,
+    graph_from_parts,
+    graph_parts_to_dict,
+    graph_to_dict,
+    iter_transaction_events,
+    load_semantic_event,
+    transfer_records,
+)
+from graph_cache import GraphCache, rule_set_hash
+from graph_formats import DEFAULT_GRAPH_FORMAT, GRAPH_FORMATS, graph_output_suffix, write_graph_file
+from graph_store import GraphStore
+from html_emitter import copy_html_resources, write_graph_page
+from instrumentation import NULL_INSTRUMENTATION, Instrumentation, format_report, merge_reports
+from sequence_patterns import compile_sequence_patterns
+
+RULES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 워커 프로세스별 컴파일된 규칙과 캐시 (initializer에서 설정)
+_worker_semantic_index = None
+_worker_sequence_matcher = None
+_worker_cache = None
+_worker_rules_hash = None
+
+
+def collect_transaction_files(target):
+    """디렉토리면 tx_*.json / tx_*.jsonl, 아니면 glob 패턴으로 처리할 파일 목록 반환"""
+    if os.path.isdir(target):
+        patterns = [os.path.join(target, "tx_*.json"), os.path.join(target, "tx_*.jsonl")]
+    else:
+        patterns = [target]
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(pattern))
+    # 같은 디렉토리에 출력한 그래프(tx_*_graph.json / tx_*_graph.jsonl)는 입력이 아님
+    return sorted(path for path in files if not path.endswith(("_graph.json", "_graph.jsonl")))
+
+
+def _init_worker(semantic_events_list, cache_dir=None, label_registry=None):
+    global _worker_semantic_index, _worker_sequence_matcher, _worker_cache, _worker_rules_hash
+    _worker_semantic_index = compile_semantic_index(semantic_events_list, label_registry)
+    _worker_sequence_matcher = compile_sequence_patterns(semantic_events_list)
+    if cache_dir:
+        _worker_cache = GraphCache(cache_dir)
+        _worker_rules_hash = rule_set_hash(semantic_events_list, label_registry)
+
+
+def new_result(file_path, error=None):
+    """파일 하나의 결과 요약 (error를 주면 실패한 결과)"""
+    return {
+        "file": file_path,
+        "status": "ok" if error is None else "error",
+        "nodes": 0,
+        "edges": 0,
+        "outputs": [],
+        "cached": False,
+        "error": None if error is None else f"{type(error).__name__}: {error}",
+        "elapsed": 0.0,
+    }
+
+
+def process_transaction_file(file_path, output_dir, render_html=False, semantic_index=None, instrument=None,
+                             graph_format=DEFAULT_GRAPH_FORMAT, with_transfers=False):
+    """
+    트랜잭션 파일 하나를 처리하고 결과 요약을 반환 (예외는 요약에 기록)
+
+    graph_format: 그래프 내보내기 형식 (graph_formats.GRAPH_FORMATS 중 하나)
+    with_transfers: True이면 GraphStore에 저장할 개별 transfer 목록(transfer_records)을 result["transfers"]에,
+                    파일의 blockNumber(없으면 None)를 result["block"]에 담음
+
+    instrument에 Instrumentation 옵션 dict({"profile": bool, "trace_memory": bool, "detailed": bool})을 주면 계측 리포트를 result["instrumentation"]에 담음
+    """
+    started = time.perf_counter()
+    instrumentation = NULL_INSTRUMENTATION
+    if instrument is not None:
+        instrumentation = Instrumentation(os.path.basename(file_path), **instrument)
+    result = new_result(file_path)
+
+    try:
+        if semantic_index is None:
+            semantic_index = _worker_semantic_index
+
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        output_base = os.path.join(output_dir, base_name)
+        output_graph = output_base + graph_output_suffix(graph_format)
+
+        if _worker_cache is not None:
+            with instrumentation.stage("cache_lookup"):
+                # 형식마다 내보낸 파일이 다르므로 json 외의 형식은 캐시 키를 구분
+                cache_key = _worker_cache.key_for(file_path, _worker_rules_hash,
+                                                  None if graph_format == DEFAULT_GRAPH_FORMAT else graph_format)
+                restored = _worker_cache.restore(
+                    cache_key, output_graph, output_base + "_graph.html" if render_html else None, graph_format)
+                transfers = _worker_cache.load_transfers(cache_key) if restored is not None and with_transfers else None
+            if (restored is not None and (restored["html"] or not render_html)
+                    and (transfers is not None or not with_transfers)):
+                instrumentation.count("cache_hits")
+                result["cached"] = True
+                result["outputs"] = [path for path in (restored["html"], restored["json"]) if path]
+                if with_transfers:
+                    result["transfers"], result["block"] = transfers
+                result["elapsed"] = time.perf_counter() - started
+                if instrumentation.enabled:
+                    result["instrumentation"] = instrumentation.report()
+                return result
+
+        # blockNumber 등 events 외의 최상위 키 (이벤트를 모두 읽은 뒤 채워짐)
+        header = {}
+        events = iter_transaction_events(file_path, header=header)
+        parts = collect_transaction_graph(events, semantic_index, sequence_matcher=_worker_sequence_matcher,
+                                          instrumentation=instrumentation)
+        if with_transfers:
+            # DiGraph는 같은 주소 쌍의 transfer를 합치므로 저장용 transfer는 그래프를 만들기 전에 따로 보관
+            result["transfers"] = transfer_records(parts)
+            result["block"] = block_number(header.get("blockNumber"))
+        if render_html:
+            with instrumentation.stage("materialize"):
+                G = graph_from_parts(parts)
+            # graph_network_data 내부에서 prune_graph 수행. 페이지 템플릿은 워커 프로세스마다 한 번만 조립됨
+            with instrumentation.stage("render"):
+                output_html = write_graph_page(G, output_base + "_graph.html")
+            if output_html:
+                result["outputs"].append(output_html)
+            graph_data = graph_to_dict(G)
+        else:
+            # HTML이 필요 없으면 networkx 그래프를 만들지 않고 내보내기 데이터를 바로 생성
+            with instrumentation.stage("export_records"):
+                graph_data = graph_parts_to_dict(parts)
+
+        with instrumentation.stage("export"):
+            output_graph = write_graph_file(graph_data, output_graph, graph_format)
+        if output_graph is None:
+            raise IOError(f"failed to export graph for '{file_path}'")
+        result["outputs"].append(output_graph)
+
+        if _worker_cache is not None:
+            with instrumentation.stage("cache_store"):
+                _worker_cache.put(cache_key, output_graph, output_base + "_graph.html" if render_html else None,
+                                  graph_format)
+                if with_transfers:
+                    _worker_cache.put_transfers(cache_key, result["transfers"], result["block"])
+
+        result["nodes"] = len(graph_data["nodes"])
+        result["edges"] = len(graph_data["edges"])
+
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+
+    result["elapsed"] = time.perf_counter() - started
+    if instrumentation.enabled:
+        result["instrumentation"] = instrumentation.report()
+    return result
+
+
+def transaction_name(file_path):
+    """tx_<hash>.json -> <hash>"""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name[len("tx_"):] if name.startswith("tx_") else name
+
+
+def store_result(store, result):
+    """
+    처리에 성공한 트랜잭션의 개별 transfer를 GraphStore에 추가 (with_transfers=True로 처리한 결과)
+
+    내보낸 그래프는 같은 주소 쌍의 transfer가 하나로 합쳐져 있으므로 result["transfers"]를 사용하고,
+    리포트에 남지 않도록 결과에서 제거함. 블록 번호는 result["block"] (edges_block 인덱스 / block_range 조회에 사용)
+    """
+    transfers = result.pop("transfers", None)
+    if result["status"] != "ok" or transfers is None:
+        return 0
+    return store.add_edge_records(transfers, transaction_name(result["file"]), result.get("block"))
+
+
+def run_batch(target, output_dir=".", rules_dir=RULES_DIR, workers=None, max_pending=None, render_html=False,
+              cache_dir=None, store_path=None, instrument=None, graph_format=DEFAULT_GRAPH_FORMAT, labels_path=None):
+    """
+    target의 트랜잭션 파일들을 병렬 처리하고 요약 리포트 반환
+
+    max_pending: 동시에 제출해 둘 작업 수 상한 (기본값은 워커 수의 4배)
+    cache_dir: 주어지면 GraphCache로 변경되지 않은 트랜잭션의 빌드를 건너뜀
+    store_path: 주어지면 결과 엣지를 이 경로의 GraphStore(SQLite)에 누적함 (쓰기는 부모 프로세스에서만 수행)
+    instrument: Instrumentation 옵션 dict를 주면 파일별 계측 리포트와 합산 리포트를 포함함
+    graph_format: 그래프 내보내기 형식 (json / compact / jsonl / arrow)
+    labels_path: 주소 -> 라벨 파일(JSON / CSV)을 주면 프로토콜 규칙을 이벤트 주소의 라벨로 dispatch 함
+    """
+    files = collect_transaction_files(target)
+    os.makedirs(output_dir, exist_ok=True)
+    if render_html:
+        # HTML은 출력 디렉토리의 lib/ (vis-network, tom-select)를 공유함
+        copy_html_resources(output_dir)
+
+    semantic_events_list = load_semantic_event(rules_dir)
+    label_registry = load_address_labels(labels_path) if labels_path else None
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+
+    started = time.perf_counter()
+    results = []
+    store = GraphStore(store_path) if store_path else None
+
+    # 제출한 future -> 파일 경로
+    pending = {}
+
+    def collect(done):
+        # 함께 끝난 결과들은 GraphStore에 한 번의 commit으로 저장
+        with store.bulk() if store is not None else nullcontext():
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # process_transaction_file 밖의 실패 (워커 프로세스가 죽은 BrokenProcessPool, 결과 pickle 오류 등)
+                    result = new_result(file_path, e)
+                if store is not None:
+                    try:
+                        store_started = time.perf_counter()
+                        store_result(store, result)
+                        if result.get("instrumentation"):
+                            result["instrumentation"]["stages"]["store"] = {
+                                "seconds": time.perf_counter() - store_started, "calls": 1}
+                    except Exception as e:
+                        result["status"] = "error"
+                        result["error"] = f"store: {type(e).__name__}: {e}"
+                results.append(result)
+
+    def new_executor():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(semantic_events_list, cache_dir, label_registry))
+
+    executor = new_executor()
+    try:
+        for file_path in files:
+            # 대기 큐가 가득 차면 하나 이상 끝날 때까지 대기
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            task = (process_transaction_file, file_path, output_dir, render_html, None, instrument, graph_format,
+                    store is not None)
+            try:
+                future = executor.submit(*task)
+            except BrokenProcessPool:
+                # 워커가 죽으면 풀 전체를 쓸 수 없으므로 (대기 중이던 작업은 collect에서 실패로 기록됨) 새 풀에서 계속
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = new_executor()
+                future = executor.submit(*task)
+            pending[future] = file_path
+
+        done, _ = wait(pending)
+        collect(done)
+    finally:
+        executor.shutdown()
+        if store is not None:
+            store.close()
+
+    results.sort(key=lambda result: result["file"])
+    failed = [result for result in results if result["status"] != "ok"]
+
+    report = {
+        "total": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "cached": sum(1 for result in results if result["cached"]),
+        "elapsed": time.perf_counter() - started,
+        "results": results,
+    }
+    if instrument is not None:
+        report["instrumentation"] = merge_reports(
+            (result.get("instrumentation") for result in results), name=target)
+    return report
+
+
+def print_report(report):
+    print(f"Batch finished: {report['total']} files, {report['succeeded']} succeeded "
+          f"({report['cached']} from cache), {report['failed']} failed ({report['elapsed']:.2f}s)")
+    for result in report["results"]:
+        if result["status"] != "ok":
+            print(f"  error: {result['file']}: {result['error']}")
+    if report.get("instrumentation"):
+        print(format_report(report["instrumentation"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build semantic graphs for many decoded transaction logs")
+    parser.add_argument("target", help="directory of decoded_logs (tx_*.json) or a glob pattern")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for graph outputs")
+    parser.add_argument("--rules-dir", default=RULES_DIR, help="directory of semantic rule JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--max-pending", type=int, default=None, help="maximum number of queued tasks")
+    parser.add_argument("--html", action="store_true", help="also render HTML graphs")
+    parser.add_argument("--cache-dir", default=None, help="reuse graphs cached in this directory")
+    parser.add_argument("--format", default=DEFAULT_GRAPH_FORMAT, choices=GRAPH_FORMATS,
+                        help="graph export format (compact / jsonl / arrow drop derived fields and intern addresses)")
+    parser.add_argument("--labels", default=None,
+                        help="JSON / CSV file of address labels; dispatch protocol rules on the emitter's label")
+    parser.add_argument("--store", default=None, help="append graph edges to this SQLite graph store")
+    parser.add_argument("--report", default=None, help="write the summary report to this JSON file")
+    parser.add_argument("--instrument", action="store_true", help="record per-stage timings and counters")
+    parser.add_argument("--profile", action="store_true", help="also run cProfile per file (implies --instrument)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record tracemalloc peaks per stage (implies --instrument)")
+    parser.add_argument("--detailed-timing", action="store_true",
+                        help="also split the event loop into parse / extract / sequence timings (implies --instrument)")
+    args = parser.parse_args()
+
+    instrument = None
+    if args.instrument or args.profile or args.trace_memory or args.detailed_timing:
+        instrument = {"profile": args.profile, "trace_memory": args.trace_memory, "detailed": args.detailed_timing}
+
+    report = run_batch(args.target, args.output_dir, args.rules_dir, args.workers, args.max_pending, args.html,
+                       args.cache_dir, args.store, instrument, args.format, args.labels)
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Batch report written to {args.report}")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+src / dst / amount 추출 마이크로벤치마크
+
+기존 방식(호출마다 inputs를 선형 탐색)과 규칙 로드 시 컴파일한 extractor를 비교
+실행: semantic_graph 디렉토리에서 `python bench/bench_extractors.py [input 개수]`
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amounts import format_amount
+from extract_semantic import compile_amount_extractor, compile_node_extractor, index_event_inputs
+
+
+def linear_node_value(event, node_spec):
+    """비교용: 호출마다 inputs를 선형 탐색하던 기존 방식"""
+    field = node_spec.get('event_field')
+    if field == 'address':
+        return event['address']
+    if field == 'inputs':
+        for input_field in event.get('inputs', []):
+            if input_field.get('name') in node_spec['param_name']:
+                return input_field.get('displayValue') or input_field.get('rawValue')
+    return None
+
+
+def linear_amount_value(event, amount_spec):
+    """비교용: 호출마다 inputs를 선형 탐색하던 기존 방식"""
+    for input_field in event.get('inputs', []):
+        if input_field.get('name') in amount_spec['param_name']:
+            value = input_field.get('formattedValue') or input_field.get('rawValue')
+            if 'extract' in amount_spec and amount_spec['extract']['type'] == 'csv':
+                index = amount_spec['extract']['index']
+                if isinstance(value, str) and ',' in value:
+                    parts = value.split(',')
+                    if index < len(parts):
+                        value = parts[index]
+            symbol = input_field.get('symbol', '')
+            return f"{value} {symbol}".strip()
+    return None
+
+
+def make_event(n_inputs):
+    """뒤쪽에 실제 파라미터가 있는 큰 이벤트 생성"""
+    inputs = [
+        {"name": f"pad{i}", "type": "uint256", "rawValue": str(i)}
+        for i in range(n_inputs)
+    ]
+    inputs += [
+        {"name": "accountOwner", "type": "address", "rawValue": "attacker", "displayValue": "attacker"},
+        {"name": "to", "type": "address", "rawValue": "attacker contract", "displayValue": "attacker contract"},
+        {"name": "update", "type": "tuple", "rawValue": "false,10000000000000000000000,false,1"},
+    ]
+    return {"name": "LogWithdraw", "address": "dydx", "inputs": inputs}
+
+
+def main(n_inputs=200, number=2000):
+    event = make_event(n_inputs)
+    owner_spec = {"event_field": "inputs", "param_name": ["accountOwner"]}
+    to_spec = {"event_field": "inputs", "param_name": ["to"]}
+    addr_spec = {"event_field": "address"}
+    amount_spec = {"event_field": "inputs", "param_name": "update", "extract": {"type": "csv", "index": 1}}
+    # LogWithdraw 규칙과 같은 2개 transfer = 6번 추출
+    transfers = [(addr_spec, owner_spec, amount_spec), (owner_spec, to_spec, amount_spec)]
+    compiled = [
+        (compile_node_extractor(src), compile_node_extractor(dst), compile_amount_extractor(amount))
+        for src, dst, amount in transfers
+    ]
+
+    def run_linear():
+        return [
+            (linear_node_value(event, src), linear_node_value(event, dst), linear_amount_value(event, amount))
+            for src, dst, amount in transfers
+        ]
+
+    def run_compiled():
+        inputs_by_name = index_event_inputs(event['inputs'])
+        return [
+            (src(event, inputs_by_name), dst(event, inputs_by_name), amount(event, inputs_by_name))
+            for src, dst, amount in compiled
+        ]
+
+    assert run_linear() == [
+        (src, dst, f"{format_amount(amount)} {amount.symbol}".strip()) for src, dst, amount in run_compiled()
+    ]
+
+    linear_time = timeit.timeit(run_linear, number=number)
+    compiled_time = timeit.timeit(run_compiled, number=number)
+    print(f"inputs per event: {len(event['inputs'])}, iterations: {number}")
+    print(f"linear scan : {linear_time / number * 1e6:.2f} us/event")
+    print(f"compiled    : {compiled_time / number * 1e6:.2f} us/event")
+    print(f"speedup     : {linear_time / compiled_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,222 @@
+"""
+그래프 빌더 스케일링 벤치마크
+
+synthetic_logs로 1e2 ~ 1e6 이벤트 크기의 합성 트랜잭션을 만들고
+규칙 로드, build_transaction_graph(스트리밍 파싱 포함), visualize_graph, export_graph_to_json 단계별로
+시간, 처리량(events/s), tracemalloc 메모리 peak와 크기 사이의 스케일링 지수(log 시간 / log 크기)를 측정함.
+--baseline으로 이전 결과(--output JSON)를 주면 처리량이 tolerance 이상 떨어진 단계가 있을 때 종료 코드 1로 끝남.
+
+실행: semantic_graph 디렉토리에서
+    `python bench/bench_graph_builder.py [--sizes 100 1000 10000] [--addresses 1000] [--output bench.json]`
+기본 크기(1e2 ~ 1e6) 전체는 수 분 걸림 (1e6 이벤트 로그 파일은 임시 디렉토리에 약 400MB)
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_semantic import (build_transaction_graph, compile_semantic_index, export_graph_to_json,
+                              iter_transaction_events, load_semantic_event, visualize_graph)
+from sequence_patterns import compile_sequence_patterns
+from synthetic_logs import RULES_DIR, SyntheticLogGenerator, parse_rule_mix, write_synthetic_transaction
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+STAGES = ["rules", "build", "render", "export"]
+# 이벤트 수와 무관한 단계 (처리량 / 스케일링 지수를 계산하지 않음)
+FIXED_STAGES = {"rules"}
+# 이 크기 이상은 반복하지 않고 한 번만 측정
+SINGLE_RUN_EVENTS = 100000
+# 측정 전에 한 번 실행해 두는 크기 (LARGE_GRAPH_EDGE_THRESHOLD를 넘어 큰 그래프 렌더링 경로까지 로드)
+WARMUP_EVENTS = 2000
+
+
+def measure(func, repeat=1, memory=True):
+    """func를 repeat번 실행해서 (최소 시간, tracemalloc peak bytes, 마지막 반환값) 반환 (peak는 별도 실행 한 번)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = None
+    if memory:
+        # tracemalloc은 할당마다 비용이 커서 시간 측정과 분리
+        result = None
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def bench_size(event_count, generator_options, work_dir, repeat=3, memory=True, render=True):
+    """이벤트 event_count개 트랜잭션 하나에 대한 단계별 결과 목록"""
+    rules_dir = generator_options.pop("rules_dir", RULES_DIR)
+    semantic_events_list = load_semantic_event(rules_dir)
+    generator = SyntheticLogGenerator(semantic_events_list, **generator_options)
+    log_file = os.path.join(work_dir, f"tx_synthetic_{event_count}.jsonl")
+    started = time.perf_counter()
+    write_synthetic_transaction(log_file, event_count, generator)
+    generate_seconds = time.perf_counter() - started
+    if event_count >= SINGLE_RUN_EVENTS:
+        repeat = 1
+
+    def load_rules():
+        rules = load_semantic_event(rules_dir)
+        return compile_semantic_index(rules), compile_sequence_patterns(rules)
+
+    rows = []
+
+    def record(stage, seconds, peak, **extra):
+        throughput = event_count / seconds if seconds and stage not in FIXED_STAGES else None
+        rows.append({"events": event_count, "stage": stage, "seconds": seconds, "events_per_second": throughput,
+                     "peak_bytes": peak, **extra})
+
+    seconds, peak, (semantic_index, sequence_matcher) = measure(load_rules, repeat, memory)
+    record("rules", seconds, peak)
+
+    seconds, peak, (G, _) = measure(
+        lambda: build_transaction_graph(iter_transaction_events(log_file), semantic_index,
+                                        sequence_matcher=sequence_matcher), repeat, memory)
+    record("build", seconds, peak, nodes=G.number_of_nodes(), edges=G.number_of_edges(),
+           generate_seconds=generate_seconds, file_bytes=os.path.getsize(log_file))
+
+    if render:
+        html_file = os.path.join(work_dir, f"tx_synthetic_{event_count}_graph.html")
+
+        def render_html():
+            # compute_layout이 G.graph["layout"]에 캐시하므로 매번 지우고 layout 계산까지 포함해서 잼
+            G.graph.pop("layout", None)
+            return visualize_graph(G, html_file)
+
+        seconds, peak, _ = measure(render_html, repeat, memory)
+        record("render", seconds, peak)
+
+    json_file = os.path.join(work_dir, f"tx_synthetic_{event_count}_graph.json")
+    seconds, peak, _ = measure(lambda: export_graph_to_json(G, json_file), repeat, memory)
+    record("export", seconds, peak)
+
+    os.remove(log_file)
+    return rows
+
+
+def scaling_exponents(rows):
+    """단계별로 인접한 두 크기 사이의 스케일링 지수 log(t2 / t1) / log(n2 / n1) (1이면 선형)"""
+    exponents = {}
+    for stage in STAGES:
+        if stage in FIXED_STAGES:
+            continue
+        stage_rows = sorted((row for row in rows if row["stage"] == stage), key=lambda row: row["events"])
+        for previous, current in zip(stage_rows, stage_rows[1:]):
+            if previous["seconds"] > 0 and current["seconds"] > 0:
+                exponents.setdefault(stage, []).append({
+                    "from": previous["events"],
+                    "to": current["events"],
+                    "exponent": math.log(current["seconds"] / previous["seconds"])
+                                / math.log(current["events"] / previous["events"]),
+                })
+    return exponents
+
+
+def compare_with_baseline(rows, baseline_rows, tolerance):
+    """같은 (크기, 단계)의 처리량이 기준보다 tolerance 비율 이상 떨어진 항목의 메시지 목록"""
+    baseline = {(row["events"], row["stage"]): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        previous = baseline.get((row["events"], row["stage"]))
+        if not previous or not previous.get("events_per_second") or not row["events_per_second"]:
+            continue
+        ratio = row["events_per_second"] / previous["events_per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{row['stage']} @ {row['events']} events: "
+                               f"{row['events_per_second']:.0f} events/s vs {previous['events_per_second']:.0f} "
+                               f"baseline ({(1 - ratio) * 100:.0f}% slower)")
+    return regressions
+
+
+def print_rows(rows, exponents):
+    print(f"{'events':>9} {'stage':<7} {'seconds':>10} {'events/s':>12} {'peak MiB':>9}  graph")
+    for row in rows:
+        peak = f"{row['peak_bytes'] / 2 ** 20:.1f}" if row["peak_bytes"] is not None else "-"
+        graph = f"{row['nodes']} nodes, {row['edges']} edges" if "nodes" in row else ""
+        throughput = f"{row['events_per_second']:.0f}" if row["events_per_second"] else "-"
+        print(f"{row['events']:>9} {row['stage']:<7} {row['seconds']:>10.4f} {throughput:>12} {peak:>9}  {graph}")
+    print("scaling exponents (1.0 = linear):")
+    for stage, steps in exponents.items():
+        print(f"  {stage:<7} " + "  ".join(f"{step['from']}->{step['to']}: {step['exponent']:.2f}" for step in steps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the semantic graph builder on synthetic decoded logs")
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES, help="event counts to benchmark")
+    parser.add_argument("--rules-dir", default=RULES_DIR, help="directory of semantic rule JSON files")
+    parser.add_argument("--addresses", type=int, default=1000, help="number of distinct addresses")
+    parser.add_argument("--address-skew", type=float, default=0.0, help="Zipf exponent of address selection")
+    parser.add_argument("--tokens", type=int, default=4, help="number of distinct tokens")
+    parser.add_argument("--mix", nargs="*", default=None, help="rule mix as NAME=WEIGHT (rule file or event name)")
+    parser.add_argument("--unmatched-ratio", type=float, default=0.4, help="fraction of events without a rule")
+    parser.add_argument("--tuple-width", type=int, default=4, help="number of fields in CSV tuple amounts")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help=f"timed runs per stage (best is reported, sizes >= {SINGLE_RUN_EVENTS} run once)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory runs")
+    parser.add_argument("--no-render", action="store_true", help="skip visualize_graph")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="results JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput drop against the baseline")
+    args = parser.parse_args()
+
+    def generator_options():
+        return {
+            "rules_dir": args.rules_dir,
+            "address_count": args.addresses,
+            "address_skew": args.address_skew,
+            "token_count": args.tokens,
+            "rule_mix": parse_rule_mix(args.mix),
+            "unmatched_ratio": args.unmatched_ratio,
+            "tuple_width": args.tuple_width,
+            "seed": args.seed,
+        }
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench_graph_builder_") as work_dir:
+        # networkx / pyvis / layout(scipy) 등 지연 import 비용은 bench_import_time에서 따로 재므로
+        # 버리는 실행을 한 번 해서 첫 크기의 측정에 섞이지 않도록 함
+        bench_size(WARMUP_EVENTS, generator_options(), work_dir, 1, False, not args.no_render)
+        for event_count in sorted(args.sizes):
+            rows.extend(bench_size(event_count, generator_options(), work_dir, args.repeat, not args.no_memory,
+                                   not args.no_render))
+
+    exponents = scaling_exponents(rows)
+    print_rows(rows, exponents)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"options": vars(args), "results": rows, "scaling": exponents}, f, indent=2)
+        print(f"Benchmark results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(rows, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+그래프 HTML 대량 렌더링 벤치마크 (pyvis visualize_graph vs html_emitter 템플릿)
+
+synthetic_logs로 작은 합성 트랜잭션 그래프를 여러 개 만든 뒤 (빌드 시간은 따로 잼)
+같은 그래프들을 visualize_graph와 write_graph_pages로 각각 임시 디렉토리에 저장하는 시간과 페이지 크기를 비교함.
+
+실행: semantic_graph 디렉토리에서
+    `python bench/bench_html_render.py [--graphs 1000] [--events 50] [--addresses 40]`
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_semantic import build_transaction_graph, compile_semantic_index, load_semantic_event, visualize_graph
+from html_emitter import write_graph_pages
+from sequence_patterns import compile_sequence_patterns
+from synthetic_logs import RULES_DIR, SyntheticLogGenerator
+
+
+def build_graphs(graph_count, event_count, address_count, rules_dir, seed):
+    semantic_events_list = load_semantic_event(rules_dir)
+    semantic_index = compile_semantic_index(semantic_events_list)
+    sequence_matcher = compile_sequence_patterns(semantic_events_list)
+    generator = SyntheticLogGenerator(semantic_events_list, address_count, seed=seed)
+    graphs = []
+    # build_transaction_graph는 트랜잭션마다 처리 요약을 출력하므로 숨김
+    with contextlib.redirect_stdout(io.StringIO()):
+        for number in range(graph_count):
+            G, _ = build_transaction_graph(generator.transaction(event_count), semantic_index,
+                                           sequence_matcher=sequence_matcher)
+            graphs.append((f"tx_{number}", G))
+    return graphs
+
+
+def directory_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".html"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pyvis and template-based HTML rendering of many graphs")
+    parser.add_argument("--graphs", type=int, default=1000, help="number of graphs to render")
+    parser.add_argument("--events", type=int, default=50, help="events per synthetic transaction")
+    parser.add_argument("--addresses", type=int, default=40, help="distinct addresses per transaction")
+    parser.add_argument("--rules-dir", default=RULES_DIR, help="directory of semantic rule JSON files")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graphs = build_graphs(args.graphs, args.events, args.addresses, args.rules_dir, args.seed)
+    build_seconds = time.perf_counter() - started
+    edge_count = sum(G.number_of_edges() for _, G in graphs)
+    print(f"Built {len(graphs)} graphs ({edge_count / len(graphs):.1f} edges on average) in {build_seconds:.2f}s")
+
+    with tempfile.TemporaryDirectory(prefix="bench_html_render_") as work_dir:
+        pyvis_dir = os.path.join(work_dir, "pyvis")
+        template_dir = os.path.join(work_dir, "template")
+        os.makedirs(pyvis_dir)
+
+        # prune_graph는 pyvis 실행에서 이미 적용되므로 템플릿 실행에서는 제거할 노드가 없음 (같은 그래프를 그대로 사용)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, G in graphs:
+                visualize_graph(G, os.path.join(pyvis_dir, f"{name}_graph.html"))
+        pyvis_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        written = sum(1 for _ in write_graph_pages(graphs, template_dir))
+        template_seconds = time.perf_counter() - started
+
+        print(f"{'renderer':<10} {'seconds':>8} {'graphs/s':>9} {'avg KB':>7}")
+        for label, seconds, directory, count in (("pyvis", pyvis_seconds, pyvis_dir, len(graphs)),
+                                                 ("template", template_seconds, template_dir, written)):
+            print(f"{label:<10} {seconds:>8.2f} {count / seconds:>9.0f} {directory_size(directory) / count / 1024:>7.1f}")
+        print(f"speedup: {pyvis_seconds / template_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
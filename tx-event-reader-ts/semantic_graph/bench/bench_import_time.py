@@ -0,0 +1,79 @@
+"""
+모듈 import 시간 벤치마크 / 회귀 검사
+
+새 인터프리터에서 `python -X importtime -c "import <모듈>"`를 여러 번 실행해서 모듈의 누적 import 시간을 재고,
+추출 코어를 import 할 때 networkx / pandas / pyvis / numpy 같은 무거운 모듈이 같이 로드되지 않는지 확인함.
+예산을 넘거나 무거운 모듈이 로드되면 종료 코드 1로 끝남.
+
+실행: semantic_graph 디렉토리에서 `python bench/bench_import_time.py [--repeat 5] [--budget-ms 200]`
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SEMANTIC_GRAPH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 추출 코어(규칙 로드, 이벤트 매칭, 엣지 생성, JSON 내보내기)와 CLI / 워커 진입점
+CORE_MODULES = [
+    "extract_semantic",
+    "sequence_patterns",
+    "balance_deltas",
+    "log_decoder",
+    "batch_semantic",
+    "ingest_service",
+]
+
+# 코어 import 시 로드되면 안 되는 모듈 (그래프 생성 / 렌더링 / 벡터 연산 때만 로드)
+HEAVY_MODULES = ["networkx", "pandas", "pyvis", "numpy", "scipy", "matplotlib"]
+
+DEFAULT_BUDGET_MS = 200
+
+
+def measure_import(module, repeat=5):
+    """
+    새 인터프리터에서 모듈을 import 하고 (누적 import 시간 ms 목록, 같이 로드된 무거운 모듈 목록) 반환
+
+    -X importtime 출력의 마지막 줄이 해당 모듈의 누적 시간 (us)
+    """
+    check = f"import sys; import {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", check],
+            cwd=SEMANTIC_GRAPH_DIR, capture_output=True, text=True, check=True)
+        lines = [line for line in completed.stderr.splitlines() if line.startswith("import time:")]
+        cumulative_us = int(lines[-1].split("|")[1])
+        timings.append(cumulative_us / 1000)
+        loaded = [name for name in completed.stdout.strip().split(",") if name]
+    return timings, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the extraction core modules")
+    parser.add_argument("modules", nargs="*", default=CORE_MODULES, help="modules to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreter runs per module")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum median cumulative import time per module")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<20} {'median ms':>10} {'min ms':>8}  heavy modules")
+    for module in args.modules:
+        timings, loaded = measure_import(module, args.repeat)
+        median = statistics.median(timings)
+        print(f"{module:<20} {median:>10.1f} {min(timings):>8.1f}  {', '.join(loaded) or '-'}")
+        if median > args.budget_ms:
+            failures.append(f"{module}: {median:.1f} ms > {args.budget_ms:.0f} ms budget")
+        if loaded:
+            failures.append(f"{module}: imports {', '.join(loaded)} at import time")
+
+    for failure in failures:
+        print(f"regression: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
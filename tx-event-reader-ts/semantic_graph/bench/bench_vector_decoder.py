@@ -0,0 +1,96 @@
+"""
+원시 로그 디코딩 벤치마크 (decode_log 하나씩 vs vector_decoder 배치 디코딩)
+
+raw 로그 파일(logs/<hash>.json)을 두 방식으로 디코딩해서 결과가 같은지 먼저 확인하고 (다르면 종료 코드 1),
+같은 로그를 --repeat 번 이어 붙인 블록 범위(복사본마다 transactionHash가 다름)로 시간을 비교함.
+여러 트랜잭션에 걸친 value_tokens 처리도 같은지 작은 블록 범위로 먼저 확인함.
+
+실행: semantic_graph 디렉토리에서
+    `python bench/bench_vector_decoder.py [../logs/<hash>.json ...] [--repeat 2000]`
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decoder import ABI_DIR, build_event_index, iter_decoded_events, load_raw_logs, load_token_metadata
+from vector_decoder import decode_logs_vectorized
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "logs")
+
+
+def first_difference(expected, actual):
+    """두 이벤트 목록에서 처음 다른 위치의 설명 (같으면 None)"""
+    if len(expected) != len(actual):
+        return f"{len(expected)} events vs {len(actual)} events"
+    for scalar_event, vector_event in zip(expected, actual):
+        if scalar_event != vector_event:
+            return f"eventIndex {scalar_event.get('eventIndex')}: {scalar_event} != {vector_event}"
+    return None
+
+
+def check_logs(label, logs, event_index, token_metadata):
+    """두 방식의 디코딩 결과가 같은지 출력하고 같으면 True"""
+    expected = list(iter_decoded_events(logs, event_index, token_metadata))
+    actual = decode_logs_vectorized(logs, event_index, token_metadata)
+    difference = first_difference(expected, actual)
+    if difference is not None:
+        print(f"MISMATCH {label}: {difference}")
+        return False
+    print(f"ok {label}: {len(expected)} events")
+    return True
+
+
+def check_file(file_path, event_index, token_metadata):
+    logs = load_raw_logs(file_path)
+    return logs if check_logs(os.path.basename(file_path), logs, event_index, token_metadata) else None
+
+
+def block_range(logs, repeat):
+    """같은 트랜잭션 로그를 transactionHash만 바꿔 repeat 번 이어 붙임"""
+    blocks = []
+    for copy in range(repeat):
+        transaction = f"0x{copy:064x}"
+        blocks.extend(dict(log, transactionHash=transaction) for log in logs)
+    return blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time scalar vs vectorized raw log decoding")
+    parser.add_argument("log_files", nargs="*", help="raw log files (default: logs/*.json)")
+    parser.add_argument("--abi-dir", default=ABI_DIR, help="directory of ABI JSON files")
+    parser.add_argument("--tokens", default=None, help="JSON file of token metadata by address")
+    parser.add_argument("--repeat", type=int, default=2000, help="copies of each transaction in the timed run")
+    args = parser.parse_args()
+
+    event_index = build_event_index(args.abi_dir)
+    token_metadata = load_token_metadata(args.tokens)
+    log_files = args.log_files or sorted(glob.glob(os.path.join(LOGS_DIR, "*.json")))
+    checked = [check_file(file_path, event_index, token_metadata) for file_path in log_files]
+    if not log_files or any(logs is None for logs in checked):
+        return 1
+
+    file_logs = [log for logs in checked for log in logs]
+    # value_tokens가 트랜잭션마다 따로 유지되는지 (복사본끼리 금액이 같으므로 공유하면 결과가 달라짐)
+    if not check_logs("3 transactions", block_range(file_logs, 3), event_index, token_metadata):
+        return 1
+
+    logs = block_range(file_logs, args.repeat)
+    started = time.perf_counter()
+    scalar_count = len(list(iter_decoded_events(logs, event_index, token_metadata)))
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vector_count = len(decode_logs_vectorized(logs, event_index, token_metadata))
+    vector_seconds = time.perf_counter() - started
+
+    print(f"{len(logs)} logs: scalar {scalar_seconds:.2f}s ({scalar_count} events), "
+          f"vectorized {vector_seconds:.2f}s ({vector_count} events), speedup {scalar_seconds / vector_seconds:.1f}x")
+    return 0 if scalar_count == vector_count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+벤치마크용 합성 디코딩 로그 생성기
+
+semantic 규칙 파일(transfer.json, swap.json 등)의 src / dst / amount 스펙을 읽어서
+실제 decoded_logs와 같은 events / inputs / rawValue / formattedValue / symbol 형태의 이벤트를 만듦.
+이벤트 수, 주소 수(cardinality)와 분포, 규칙 파일 / 이벤트별 비율, 규칙에 없는 이벤트 비율,
+CSV tuple 필드 너비를 조절할 수 있음. 같은 seed면 항상 같은 로그를 생성함.
+
+실행: semantic_graph 디렉토리에서
+    `python bench/synthetic_logs.py 100000 -o /tmp/tx_synthetic.json [--addresses 5000] [--mix transfer.json=8 swap.json=1]`
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_semantic import load_semantic_event
+
+RULES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (symbol, decimals), token_count가 더 크면 TKN<n> (18 decimals)을 추가
+KNOWN_TOKENS = [("WETH", 18), ("USDC", 6), ("WBTC", 8), ("DAI", 18), ("cETH", 8), ("cWBTC", 8)]
+
+# 규칙에 없는 이벤트 (이름, [(input 이름, 타입)]), 규칙에 같은 이름이 있으면 사용하지 않음
+NOISE_EVENTS = [
+    ("Approval", [("owner", "address"), ("spender", "address"), ("value", "uint256")]),
+    ("Sync", [("reserve0", "uint256"), ("reserve1", "uint256")]),
+    ("LogOperation", [("sender", "address")]),
+    ("AccrueInterest", [("interestAccumulated", "uint256"), ("borrowIndex", "uint256"), ("totalBorrows", "uint256")]),
+]
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def event_templates(semantic_events_list):
+    """
+    규칙 정의를 이벤트 생성 템플릿 목록으로 변환
+
+    템플릿: {"name", "source", "transfers"} (프로토콜별로 하나씩)
+    이름이 여러 정의에 중복되면 compile_semantic_index와 같이 먼저 로드된 정의만 사용
+    """
+    templates = []
+    seen = set()
+    for position, semantic_event in enumerate(semantic_events_list):
+        source = semantic_event.get("source", f"rules[{position}]")
+        for event_def in semantic_event.get("events", []):
+            if "src" in event_def and "dst" in event_def and "amount" in event_def:
+                groups = [[event_def]]
+            elif "protocols" in event_def:
+                groups = [protocol.get("transfers", []) for protocol in event_def["protocols"]]
+            elif "transfers" in event_def:
+                groups = [event_def["transfers"]]
+            else:
+                continue
+            for name in _as_list(event_def.get("name")):
+                if name in seen:
+                    continue
+                seen.add(name)
+                for transfers in groups:
+                    if transfers:
+                        templates.append({"name": name, "source": source, "transfers": transfers})
+    return templates
+
+
+class SyntheticLogGenerator:
+    """
+    규칙 템플릿과 주소 / 토큰 pool로 합성 이벤트를 생성
+
+    address_count: 서로 다른 주소 수 (노드 수 상한)
+    address_skew: 주소 선택 분포의 Zipf 지수 (0이면 균등, 1 전후면 소수 주소에 거래가 몰림)
+    rule_mix: {규칙 파일 이름 또는 이벤트 이름: 가중치}, 주어지면 없는 템플릿은 생성하지 않음 (이벤트 이름이 우선)
+    unmatched_ratio: 규칙에 없는 이벤트의 비율
+    tuple_width: CSV 추출(extract.type == "csv") 금액이 들어가는 tuple 필드 수
+    """
+
+    def __init__(self, semantic_events_list, address_count=1000, address_skew=0.0, token_count=4, rule_mix=None,
+                 unmatched_ratio=0.4, tuple_width=4, seed=0):
+        if not 0 <= unmatched_ratio < 1:
+            raise ValueError("unmatched_ratio must be in [0, 1)")
+        self.rng = random.Random(seed)
+        self.templates = event_templates(semantic_events_list)
+        if rule_mix:
+            weights = [rule_mix.get(template["name"], rule_mix.get(template["source"], 0))
+                       for template in self.templates]
+        else:
+            weights = [1] * len(self.templates)
+        if not any(weights):
+            raise ValueError("rule mix does not select any semantic rule")
+
+        names = {template["name"] for template in self.templates}
+        self.noise = [(name, inputs) for name, inputs in NOISE_EVENTS if name not in names]
+        choices = [("rule", template) for template in self.templates]
+        if self.noise and unmatched_ratio > 0:
+            matched_weight = sum(weights)
+            noise_weight = matched_weight * unmatched_ratio / (1 - unmatched_ratio) / len(self.noise)
+            choices += [("noise", noise) for noise in self.noise]
+            weights += [noise_weight] * len(self.noise)
+        self.choices = choices
+        self.choice_cumulative = _cumulative(weights)
+
+        self.addresses = [f"0x{self.rng.getrandbits(160):040x}" for _ in range(address_count)]
+        self.address_cumulative = _cumulative([1 / (rank + 1) ** address_skew for rank in range(address_count)])
+        self.tokens = (KNOWN_TOKENS + [(f"TKN{i}", 18) for i in range(len(KNOWN_TOKENS), token_count)])[:token_count]
+        self.tuple_width = tuple_width
+
+    def pick_address(self):
+        return self.rng.choices(self.addresses, cum_weights=self.address_cumulative)[0]
+
+    def amount_input(self, name, csv_index=None):
+        symbol, decimals = self.rng.choice(self.tokens)
+        # 10^-2 ~ 10^6 토큰 범위의 정수 원시값
+        raw = self.rng.randrange(10 ** max(decimals - 2, 0), 10 ** (decimals + 6))
+        if csv_index is not None:
+            fields = [self.rng.choice(("true", "false")) if i % 2 == 0 else str(self.rng.getrandbits(64))
+                      for i in range(max(self.tuple_width, csv_index + 1))]
+            fields[csv_index] = str(raw)
+            return {"name": name, "type": "tuple", "rawValue": ",".join(fields)}
+        formatted_value = raw / 10 ** decimals
+        return {"name": name, "type": "uint256", "rawValue": str(raw), "formattedValue": formatted_value,
+                "symbol": symbol, "displayValue": f"{formatted_value:,.6f} {symbol}"}
+
+    def address_input(self, name):
+        address = self.pick_address()
+        return {"name": name, "type": "address", "rawValue": address, "displayValue": address}
+
+    def rule_event(self, template, event_index):
+        """템플릿의 모든 transfer가 추출될 수 있도록 src / dst / amount input을 채운 이벤트"""
+        inputs = {}
+        for transfer in template["transfers"]:
+            for role in ("src", "dst"):
+                spec = transfer[role]
+                if spec.get("event_field", spec.get("json_key")) == "inputs":
+                    names = _as_list(spec.get("param_name"))
+                    if names and names[0] not in inputs:
+                        inputs[names[0]] = self.address_input(names[0])
+            spec = transfer["amount"]
+            names = _as_list(spec.get("param_name"))
+            if names and names[0] not in inputs:
+                extract = spec.get("extract")
+                csv_index = extract["index"] if extract and extract.get("type") == "csv" else None
+                inputs[names[0]] = self.amount_input(names[0], csv_index)
+
+        # event_field가 address인 src / dst(프로토콜 컨트랙트)도 같은 주소 pool에서 선택 (노드 수 상한 유지)
+        return {"eventIndex": event_index, "name": template["name"], "address": self.pick_address(),
+                "inputs": list(inputs.values())}
+
+    def noise_event(self, noise, event_index):
+        name, fields = noise
+        inputs = [self.address_input(field) if field_type == "address" else self.amount_input(field)
+                  for field, field_type in fields]
+        return {"eventIndex": event_index, "name": name, "address": self.pick_address(), "inputs": inputs}
+
+    def iter_events(self, event_count):
+        """이벤트를 하나씩 생성 (큰 로그도 메모리에 올리지 않고 파일로 쓸 수 있음)"""
+        for event_index in range(event_count):
+            kind, choice = self.rng.choices(self.choices, cum_weights=self.choice_cumulative)[0]
+            if kind == "rule":
+                yield self.rule_event(choice, event_index)
+            else:
+                yield self.noise_event(choice, event_index)
+
+    def transaction(self, event_count):
+        """decoded_logs와 같은 형태의 트랜잭션 dict"""
+        return {"events": list(self.iter_events(event_count)), **self.transaction_metadata()}
+
+    def transaction_metadata(self):
+        return {"timestamp": "1970-01-01T00:00:00.000Z", "transactionHash": f"0x{self.rng.getrandbits(256):064x}"}
+
+
+def _cumulative(weights):
+    total = 0.0
+    cumulative = []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+
+def write_synthetic_transaction(output_file, event_count, generator):
+    """
+    합성 트랜잭션을 파일로 스트리밍 저장하고 경로 반환
+
+    .jsonl이면 한 줄에 이벤트 하나, 아니면 {"events": [...], "timestamp", "transactionHash"} 형식
+    """
+    with open(output_file, "w", encoding="utf-8") as f:
+        if output_file.endswith(".jsonl"):
+            for event in generator.iter_events(event_count):
+                f.write(json.dumps(event))
+                f.write("\n")
+            return output_file
+
+        f.write('{"events": [\n')
+        for position, event in enumerate(generator.iter_events(event_count)):
+            if position:
+                f.write(",\n")
+            f.write(json.dumps(event))
+        metadata = json.dumps(generator.transaction_metadata())
+        f.write(f"\n], {metadata[1:]}")
+    return output_file
+
+
+def parse_rule_mix(values):
+    """["transfer.json=8", "Borrow=1"] 형식을 {이름: 가중치}로 변환"""
+    rule_mix = {}
+    for value in values or []:
+        name, _, weight = value.partition("=")
+        rule_mix[name] = float(weight or 1)
+    return rule_mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic decoded transaction logs from the semantic rules")
+    parser.add_argument("events", type=int, help="number of events")
+    parser.add_argument("-o", "--output", required=True, help="output .json or .jsonl file")
+    parser.add_argument("--rules-dir", default=RULES_DIR, help="directory of semantic rule JSON files")
+    parser.add_argument("--addresses", type=int, default=1000, help="number of distinct addresses")
+    parser.add_argument("--address-skew", type=float, default=0.0, help="Zipf exponent of address selection")
+    parser.add_argument("--tokens", type=int, default=4, help="number of distinct tokens")
+    parser.add_argument("--mix", nargs="*", default=None,
+                        help="rule mix as NAME=WEIGHT (rule file or event name), e.g. transfer.json=8 swap.json=1")
+    parser.add_argument("--unmatched-ratio", type=float, default=0.4, help="fraction of events without a rule")
+    parser.add_argument("--tuple-width", type=int, default=4, help="number of fields in CSV tuple amounts")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    generator = SyntheticLogGenerator(load_semantic_event(args.rules_dir), args.addresses, args.address_skew,
+                                      args.tokens, parse_rule_mix(args.mix), args.unmatched_ratio, args.tuple_width,
+                                      args.seed)
+    write_synthetic_transaction(args.output, args.events, generator)
+    print(f"Synthetic transaction with {args.events} events written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
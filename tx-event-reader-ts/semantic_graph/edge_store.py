@@ -0,0 +1,306 @@
+"""
+배열 기반(columnar) transfer 엣지 저장소
+
+엣지마다 dict를 만들고 DiGraph 속성으로 복사하는 대신, 주소 / 이벤트 이름 / 토큰을 정수 ID로 intern 해서
+고정 폭 배열에 저장함. 거래량, degree, 중복 제거는 NumPy로 한 번에 계산하고
+networkx 그래프는 to_networkx()를 호출할 때만 만듦. 여러 트랜잭션 / 블록 단위 그래프용.
+"""
+from array import array
+
+import networkx as nx
+import numpy as np
+
+from amounts import Amount
+from balance_deltas import signed_limb_sums
+from extract_semantic import (
+    compile_semantic_index,
+    edge_attributes,
+    extract_event_edges,
+    node_attributes,
+)
+
+# 원시 금액은 uint256을 32bit limb 8개(32 bytes)로 저장
+_LIMB_BITS = 32
+_LIMB_COUNT = 8
+_RAW_WIDTH = _LIMB_BITS * _LIMB_COUNT // 8
+
+
+class _Interner:
+    """값 <-> 정수 코드 테이블 (처음 등장한 순서대로 코드 부여)"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _int64_column(values):
+    """
+    array('q')의 읽기 전용 NumPy 복사본
+
+    np.frombuffer 뷰는 array의 버퍼를 잡고 있어서 뷰가 살아 있는 동안 append가 BufferError를 내므로 복사함
+    """
+    column = np.array(values, dtype=np.int64)
+    column.setflags(write=False)
+    return column
+
+
+class EdgeStore:
+    """transfer 엣지를 정수 배열 컬럼으로 보관하는 저장소"""
+
+    def __init__(self):
+        self.addresses = _Interner()
+        self.events = _Interner()
+        # (symbol, decimals)
+        self.tokens = _Interner()
+        self.transactions = _Interner()
+        self._src = array('q')
+        self._dst = array('q')
+        self._event = array('q')
+        self._token = array('q')
+        self._transaction = array('q')
+        self._event_index = array('q')
+        self._raw = bytearray()
+        # uint256 범위를 벗어나는 금액 (행 번호 -> 정수)
+        self._raw_overflow = {}
+        # (행 수, columns() 결과): 엣지가 추가되지 않았으면 복사본을 재사용
+        self._columns = None
+
+    def __len__(self):
+        return len(self._src)
+
+    def append(self, source, target, event, amount, event_index, transaction=None):
+        """엣지 하나 추가 (amount는 Amount)"""
+        row = len(self._src)
+        self._src.append(self.addresses.code(source))
+        self._dst.append(self.addresses.code(target))
+        self._event.append(self.events.code(event))
+        self._token.append(self.tokens.code((amount.symbol, amount.decimals)))
+        self._transaction.append(self.transactions.code(transaction))
+        self._event_index.append(event_index)
+        if 0 <= amount.raw and amount.raw.bit_length() <= _LIMB_BITS * _LIMB_COUNT:
+            self._raw += amount.raw.to_bytes(_RAW_WIDTH, "little")
+        else:
+            self._raw += bytes(_RAW_WIDTH)
+            self._raw_overflow[row] = amount.raw
+
+    def extend_edges(self, edges_info, transaction=None):
+        """extract_event_edges 형식의 엣지 정보 목록 추가"""
+        for edge in edges_info:
+            self.append(edge["from_address"], edge["to_address"], edge["event"], edge["amount"],
+                        edge["event_index"], transaction)
+
+    def columns(self):
+        """
+        컬럼을 읽기 전용 NumPy 배열(내부 버퍼의 복사본)로 반환
+
+        반환된 배열을 들고 있어도 append를 계속할 수 있음 (배열은 호출 시점의 행까지만 포함).
+        엣지가 추가되지 않았으면 이전 호출의 복사본을 그대로 반환함
+        """
+        if self._columns is not None and self._columns[0] == len(self._src):
+            return self._columns[1]
+        raw_limbs = np.frombuffer(bytes(self._raw), dtype="<u4").reshape(-1, _LIMB_COUNT)
+        columns = {
+            "src": _int64_column(self._src),
+            "dst": _int64_column(self._dst),
+            "event": _int64_column(self._event),
+            "token": _int64_column(self._token),
+            "transaction": _int64_column(self._transaction),
+            "event_index": _int64_column(self._event_index),
+            "raw_limbs": raw_limbs,
+        }
+        self._columns = (len(self._src), columns)
+        return columns
+
+    def amount(self, row):
+        """행 하나의 Amount 복원"""
+        raw = self._raw_overflow.get(row)
+        if raw is None:
+            raw = int.from_bytes(self._raw[row * _RAW_WIDTH:(row + 1) * _RAW_WIDTH], "little")
+        symbol, decimals = self.tokens.values[self._token[row]]
+        return Amount(raw, decimals, symbol)
+
+    def float_amounts(self):
+        """
+        행별 금액을 토큰 decimals로 나눈 float64 배열 (가중치 / 근사 분석용, 정확한 값은 amount(row))
+
+        uint256 범위를 벗어나 limb에 넣지 못한 금액도 Python 정수로 나눠서 채움
+        """
+        columns = self.columns()
+        limbs = columns["raw_limbs"].astype(np.float64)
+        raw = limbs @ (2.0 ** (_LIMB_BITS * np.arange(_LIMB_COUNT)))
+        decimals = np.array([decimals for _, decimals in self.tokens.values], dtype=np.float64)
+        amounts = raw / 10.0 ** decimals[columns["token"]] if len(self) else raw
+        for row, value in self._raw_overflow.items():
+            _, token_decimals = self.tokens.values[self._token[row]]
+            amounts[row] = value / 10 ** token_decimals
+        return amounts
+
+    def unique_edge_mask(self):
+        """(트랜잭션, source, target, event_index) 기준으로 처음 등장한 엣지만 True"""
+        mask = np.zeros(len(self), dtype=bool)
+        if not len(self):
+            return mask
+        columns = self.columns()
+        # lexsort는 stable이므로 같은 키 구간의 첫 행이 처음 등장한 엣지
+        order = np.lexsort((columns["event_index"], columns["dst"], columns["src"], columns["transaction"]))
+        changed = np.zeros(len(self), dtype=bool)
+        changed[0] = True
+        for name in ("transaction", "src", "dst", "event_index"):
+            column = columns[name][order]
+            changed[1:] |= column[1:] != column[:-1]
+        mask[order[changed]] = True
+        return mask
+
+    def token_volumes(self):
+        """(주소, symbol, decimals) 별 유입 + 유출 정수 합계 (중복 엣지도 모두 합산)"""
+        if not len(self):
+            return {}
+        columns = self.columns()
+        token_count = len(self.tokens)
+        keys = np.concatenate([
+            columns["src"].astype(np.int64) * token_count + columns["token"],
+            columns["dst"].astype(np.int64) * token_count + columns["token"],
+        ])
+        limbs = columns["raw_limbs"].astype(np.uint64)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        sums = np.zeros((len(unique_keys), _LIMB_COUNT), dtype=np.uint64)
+        np.add.at(sums, inverse, np.concatenate([limbs, limbs]))
+
+        totals = {}
+        for key, limb_sums in zip(unique_keys.tolist(), sums.tolist()):
+            total = 0
+            for limb_index, limb_sum in enumerate(limb_sums):
+                total += limb_sum << (_LIMB_BITS * limb_index)
+            address_code, token_code = divmod(key, token_count)
+            symbol, decimals = self.tokens.values[token_code]
+            totals[(self.addresses.values[address_code], symbol, decimals)] = total
+
+        # limb 배열에 넣지 못한 금액은 Python 정수로 따로 더함
+        for row, raw in self._raw_overflow.items():
+            symbol, decimals = self.tokens.values[self._token[row]]
+            for address_code in (self._src[row], self._dst[row]):
+                key = (self.addresses.values[address_code], symbol, decimals)
+                totals[key] = totals.get(key, 0) + raw
+
+        return totals
+
+    def balance_deltas(self, transaction=None, include_zero=False):
+        """
+        (주소, symbol, decimals) 별 부호 있는 순 잔액 변화 (유입 - 유출, 정수)
+
+        build_transaction_graph와 같이 중복 엣지는 한 번만 셈. transaction을 주면 해당 트랜잭션의 엣지만 사용
+        """
+        if not len(self):
+            return {}
+        columns = self.columns()
+        mask = self.unique_edge_mask()
+        if transaction is not None:
+            code = self.transactions.codes.get(transaction)
+            if code is None:
+                return {}
+            mask &= columns["transaction"] == code
+        totals = signed_limb_sums(columns["src"][mask], columns["dst"][mask], columns["token"][mask],
+                                  columns["raw_limbs"][mask], len(self.tokens))
+
+        deltas = {}
+        for (address_code, token_code), delta in totals.items():
+            symbol, decimals = self.tokens.values[token_code]
+            deltas[(self.addresses.values[address_code], symbol, decimals)] = delta
+
+        # limb 배열에 넣지 못한 금액은 Python 정수로 따로 더함
+        for row, raw in self._raw_overflow.items():
+            if not mask[row]:
+                continue
+            symbol, decimals = self.tokens.values[self._token[row]]
+            source_key = (self.addresses.values[self._src[row]], symbol, decimals)
+            target_key = (self.addresses.values[self._dst[row]], symbol, decimals)
+            deltas[source_key] = deltas.get(source_key, 0) - raw
+            deltas[target_key] = deltas.get(target_key, 0) + raw
+
+        if not include_zero:
+            deltas = {key: delta for key, delta in deltas.items() if delta}
+        return deltas
+
+    def address_volumes(self):
+        """주소별 거래량 (표시 단위 float)"""
+        volumes = {}
+        for (address, _, decimals), total in self.token_volumes().items():
+            volumes[address] = volumes.get(address, 0.0) + total / 10 ** decimals
+        return volumes
+
+    def degrees(self):
+        """
+        주소 코드별 (in_degree, out_degree) 배열
+
+        DiGraph와 같이 서로 다른 (source, target) 쌍 기준으로 셈
+        """
+        address_count = len(self.addresses)
+        if not len(self):
+            return np.zeros(address_count, dtype=np.int64), np.zeros(address_count, dtype=np.int64)
+        columns = self.columns()
+        pairs = np.unique(columns["src"].astype(np.int64) * address_count + columns["dst"])
+        sources, targets = np.divmod(pairs, address_count)
+        in_degree = np.bincount(targets, minlength=address_count)
+        out_degree = np.bincount(sources, minlength=address_count)
+        return in_degree, out_degree
+
+    def to_networkx(self):
+        """build_transaction_graph와 같은 속성을 가진 nx.DiGraph로 변환"""
+        G = nx.DiGraph()
+        if not len(self):
+            return G
+
+        volumes = self.address_volumes()
+        for address in self.addresses.values:
+            G.add_node(address, **node_attributes(address, volumes.get(address, 0)))
+
+        for row in np.flatnonzero(self.unique_edge_mask()).tolist():
+            edge = {
+                "event": self.events.values[self._event[row]],
+                "amount": self.amount(row),
+                "event_index": self._event_index[row],
+            }
+            G.add_edge(self.addresses.values[self._src[row]], self.addresses.values[self._dst[row]],
+                       **edge_attributes(edge))
+        return G
+
+
+def build_edge_store(data, semantic_events_list, store=None, transaction=None):
+    """
+    트랜잭션 이벤트를 EdgeStore에 추가
+
+    store를 넘기면 기존 저장소에 이어서 추가하므로 여러 트랜잭션 / 블록을 한 저장소에 모을 수 있음.
+    transaction은 중복 제거 시 트랜잭션을 구분하는 값 (예: 트랜잭션 해시)
+    """
+    if isinstance(semantic_events_list, dict):
+        semantic_index = semantic_events_list
+    else:
+        semantic_index = compile_semantic_index(semantic_events_list)
+
+    if store is None:
+        store = EdgeStore()
+
+    if isinstance(data, dict):
+        if transaction is None:
+            transaction = data.get("transactionHash")
+        events = data["events"]
+    else:
+        events = data
+
+    for event_counter, event in enumerate(events):
+        event_edges = extract_event_edges(event, semantic_index, event_counter)
+        if event_edges:
+            store.extend_edges(event_edges, transaction)
+
+    return store
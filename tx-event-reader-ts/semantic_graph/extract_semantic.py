@@ -1,19 +1,34 @@
 import json
-import networkx as nx
+import math
 from collections import defaultdict
 import os
+import time
 import traceback
-import pandas as pd
-from pyvis.network import Network
 
-def load_semantic_event():
+# networkx / pyvis는 import 비용이 커서 그래프 생성 / 렌더링 함수 안에서만 import 함
+# (규칙 로드, 이벤트 매칭, 엣지 생성, JSON 내보내기는 collect_transaction_graph / build_graph_data로 가볍게 사용 가능)
+from address_labels import LabelDispatchIndex
+from amounts import Amount, amount_from_input, amount_to_float, format_amount, sum_raw_by_key
+from balance_deltas import balance_delta_records, balance_deltas_from_records, compute_balance_deltas
+from graph_cache import DEFAULT_CACHE_DIR, GraphCache, rule_set_hash
+from instrumentation import NULL_INSTRUMENTATION, format_report
+from sequence_patterns import compile_sequence_patterns, tag_edge_matches
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+def load_semantic_event(rules_dir="."):
     semantic_event = []
     
-    for file in os.listdir("."):
-        if file.endswith(".json"):
-            with open(f"{file}", "r", encoding="utf-8") as f:
+    for file in sorted(os.listdir(rules_dir)):
+        # 같은 디렉토리에 저장되는 그래프 출력(*_graph.json)은 규칙 파일이 아님
+        if file.endswith(".json") and not file.endswith("_graph.json"):
+            with open(os.path.join(rules_dir, file), "r", encoding="utf-8") as f:
                 data = json.load(f)
-                semantic_event.append(data)
+                # 단일 이벤트 규칙(events) 또는 시퀀스 패턴(sequences) 정의
+                if "events" in data or "sequences" in data:
+                    # 계측 리포트에서 규칙 파일별로 매칭 수를 집계하기 위한 출처
+                    data.setdefault("source", file)
+                    semantic_event.append(data)
     
     return semantic_event
 
@@ -44,16 +59,290 @@ def load_transaction_data(file_path, debug=False):
         return None
 
 
-def build_transaction_graph(data, semantic_events_list, debug=False):
+STREAM_CHUNK_SIZE = 1 << 16
+
+def iter_transaction_events(file_path, debug=False, chunk_size=STREAM_CHUNK_SIZE, header=None):
+    """
+    디코딩 된 이벤트 로그 파일에서 events 배열의 이벤트를 하나씩 yield
+    
+    전체 파일을 메모리에 올리지 않으므로 블록 단위로 합쳐진 큰 로그도 일정한 메모리로 처리 가능.
+    .jsonl 파일은 한 줄에 이벤트 하나가 있는 JSON-Lines 형식으로 읽음.
+    header에 dict를 주면 events 외의 최상위 키(transactionHash, blockNumber 등)를 채움
+    (events 뒤에 있는 키도 있으므로 이벤트를 끝까지 읽은 뒤에 사용)
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith(".jsonl"):
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"invalid JSON on line {line_number} of '{file_path}': {e}") from e
+            return
+        
+        event_count = 0
+        for event in _iter_json_array_items(f, "events", chunk_size, header):
+            event_count += 1
+            yield event
+        
+        if debug:
+            print(f"success: {event_count} events streamed from '{file_path}'")
+
+def block_number(value):
+    """blockNumber 값(정수, "0x..." 또는 10진수 문자열)을 정수로 변환 (없으면 None)"""
+    if isinstance(value, str):
+        if not value:
+            return None
+        return int(value, 16) if value.lower().startswith("0x") else int(value)
+    return value
+
+def _iter_json_array_items(f, array_key, chunk_size, other_keys=None):
+    """
+    최상위 JSON 객체의 array_key 배열 원소를 청크 단위로 읽으면서 하나씩 디코딩
+
+    other_keys에 dict를 주면 나머지 최상위 키의 값을 담음
+    """
+    decoder = json.JSONDecoder()
+    state = {"buffer": "", "pos": 0, "eof": False}
+    
+    def fill():
+        # 이미 처리한 앞부분은 버려서 버퍼 크기를 청크 수준으로 유지
+        if state["pos"] > chunk_size:
+            state["buffer"] = state["buffer"][state["pos"]:]
+            state["pos"] = 0
+        chunk = f.read(chunk_size)
+        if not chunk:
+            state["eof"] = True
+        state["buffer"] += chunk
+    
+    def skip_whitespace():
+        while True:
+            buffer, pos = state["buffer"], state["pos"]
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buffer) or state["eof"]:
+                return
+            fill()
+    
+    def expect(chars):
+        skip_whitespace()
+        if state["pos"] >= len(state["buffer"]):
+            raise ValueError(f"unexpected end of JSON, expected one of {chars!r}")
+        char = state["buffer"][state["pos"]]
+        if char not in chars:
+            raise ValueError(f"unexpected character {char!r} at offset {state['pos']}, expected one of {chars!r}")
+        state["pos"] += 1
+        return char
+    
+    def decode_value():
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(state["buffer"], state["pos"])
+                # 버퍼 끝에서 잘린 숫자 등을 완전한 값으로 오인하지 않도록 구분자까지 확인
+                if state["eof"] or (end < len(state["buffer"]) and state["buffer"][end] in " \t\r\n,:]}"):
+                    state["pos"] = end
+                    return value
+            except json.JSONDecodeError:
+                if state["eof"]:
+                    raise
+            fill()
+    
+    expect("{")
+    skip_whitespace()
+    if state["buffer"][state["pos"]:state["pos"] + 1] == "}":
+        return
+    
+    while True:
+        key = decode_value()
+        expect(":")
+        if key == array_key:
+            expect("[")
+            skip_whitespace()
+            if state["buffer"][state["pos"]:state["pos"] + 1] == "]":
+                state["pos"] += 1
+            else:
+                while True:
+                    yield decode_value()
+                    if expect(",]") == "]":
+                        break
+        else:
+            value = decode_value()
+            if other_keys is not None:
+                other_keys[key] = value
+        
+        if expect(",}") == "}":
+            return
+
+def compile_semantic_index(semantic_events_list, label_registry=None):
+    """
+    semantic 정의 파일들을 이벤트 이름 -> transfer 규칙 리스트 형태의 dispatch 테이블로 컴파일
+    
+    한 번 컴파일한 인덱스는 여러 트랜잭션에 재사용할 수 있음.
+    이름이 여러 정의에 중복되면 먼저 로드된 정의가 우선함.
+    label_registry(address_labels.AddressLabelRegistry)를 주면 이벤트 주소의 라벨로
+    (프로토콜, 이벤트 이름)에 맞는 프로토콜 규칙만 적용하는 LabelDispatchIndex를 반환함
+    """
+    semantic_index = {}
+    
+    for position, semantic_event in enumerate(semantic_events_list):
+        source = semantic_event.get('source', f"rules[{position}]")
+        for event_def in semantic_event.get('events', []):
+            event_def_name = event_def.get('name')
+            if isinstance(event_def_name, str):
+                names = [event_def_name]
+            elif isinstance(event_def_name, list):
+                names = event_def_name
+            else:
+                continue
+            
+            transfer_rules = []
+            # Transfer와 같은 단순 이벤트
+            if 'src' in event_def and 'dst' in event_def and 'amount' in event_def:
+                transfer_rules.append(_compile_transfer_rule(event_def, source=source))
+            # 프로토콜 기반 복잡한 이벤트 (Mint, Borrow 등)
+            elif 'protocols' in event_def:
+                for protocol in event_def['protocols']:
+                    for transfer in protocol.get('transfers', []):
+                        transfer_rules.append(_compile_transfer_rule(transfer, protocol.get('address_label'), source))
+            # 기본 transfers 배열 (Deposit 등)
+            elif 'transfers' in event_def:
+                for transfer in event_def['transfers']:
+                    transfer_rules.append(_compile_transfer_rule(transfer, source=source))
+            
+            for name in names:
+                if name not in semantic_index:
+                    semantic_index[name] = transfer_rules
+    
+    if label_registry is not None:
+        return LabelDispatchIndex(semantic_index, label_registry)
+    return semantic_index
+
+def _compile_transfer_rule(transfer, address_label=None, source=None):
+    return {
+        "address_label": address_label,
+        "source": source,
+        "src": compile_node_extractor(transfer['src']),
+        "dst": compile_node_extractor(transfer['dst']),
+        "amount": compile_amount_extractor(transfer['amount'])
+    }
+
+def build_transaction_graph(data, semantic_events_list, debug=False, vectorized=False, sequence_matcher=None,
+                            instrumentation=None):
+    """
+    data에는 events 키를 가진 트랜잭션 데이터 또는 iter_transaction_events 같은 이벤트 iterator를 전달
+    semantic_events_list에는 load_semantic_event 결과 또는 compile_semantic_index로 컴파일된 인덱스를 전달
+    vectorized=True이면 주소별 거래량과 잔액 변화를 NumPy로 합산
+    sequence_matcher에는 compile_sequence_patterns 결과를 전달 (semantic_events_list가 컴파일 전 목록이면 자동으로 컴파일)
+    instrumentation에는 instrumentation.Instrumentation을 전달하면 단계별 시간 / 카운터를 기록함
+    """
+    instrumentation = instrumentation or NULL_INSTRUMENTATION
+    parts = collect_transaction_graph(data, semantic_events_list, debug, vectorized, sequence_matcher, instrumentation)
+    with instrumentation.stage("materialize"):
+        G = graph_from_parts(parts)
+    
+    return G, parts["contains_weth_address"]  # WETH 주소 포함 여부와 함께 그래프 반환
+
+def graph_from_parts(parts):
+    """collect_transaction_graph 결과로 networkx DiGraph 생성"""
+    import networkx as nx
+    
     G = nx.DiGraph()
+    G.graph.update(parts["graph"])
+    for address, attrs in parts["nodes"].items():
+        G.add_node(address, **attrs)
+    for (source, target), attrs in parts["edges"].items():
+        G.add_edge(source, target, **attrs)
+    return G
+
+def build_graph_data(data, semantic_events_list, debug=False, vectorized=False, sequence_matcher=None, prune=True,
+                     instrumentation=None):
+    """
+    networkx 없이 graph_to_dict와 같은 형식의 내보내기 데이터를 바로 생성
+    
+    prune=True이면 prune_graph를 거친 그래프와 같은 결과 (HTML 렌더링이 필요 없는 batch / 서비스용)
+    """
+    instrumentation = instrumentation or NULL_INSTRUMENTATION
+    parts = collect_transaction_graph(data, semantic_events_list, debug, vectorized, sequence_matcher, instrumentation)
+    with instrumentation.stage("export_records"):
+        return graph_parts_to_dict(parts, prune)
+
+def graph_parts_to_dict(parts, prune=True):
+    """collect_transaction_graph 결과를 graph_to_dict 형식으로 변환 (prune=True이면 zero address 제거)"""
+    nodes, edges = parts["nodes"], parts["edges"]
+    if prune and ZERO_ADDRESS in nodes:
+        # 모든 노드는 엣지에서 만들어지므로 고립된 노드는 없고 zero address만 제거하면 됨
+        del nodes[ZERO_ADDRESS]
+        edges = {key: attrs for key, attrs in edges.items() if ZERO_ADDRESS not in key}
+    
+    # DiGraph.edges 순서와 같도록 source 노드 순서대로 묶음 (같은 source 안에서는 추가된 순서)
+    node_order = {address: position for position, address in enumerate(nodes)}
+    ordered_edges = sorted(edges.items(), key=lambda item: node_order[item[0][0]])
+    
+    graph_data = {
+        "nodes": [node_record(address, attrs) for address, attrs in nodes.items()],
+        "edges": [edge_record(source, target, attrs) for (source, target), attrs in ordered_edges]
+    }
+    graph = parts["graph"]
+    if "patterns" in graph:
+        graph_data["patterns"] = graph["patterns"]
+    if "balance_deltas" in graph:
+        graph_data["balance_deltas"] = balance_delta_records(graph["balance_deltas"])
+    return graph_data
+
+def collect_transaction_graph(data, semantic_events_list, debug=False, vectorized=False, sequence_matcher=None,
+                              instrumentation=None):
+    """
+    networkx 없이 트랜잭션 그래프의 노드 / 엣지 / 그래프 속성을 계산 (build_transaction_graph와 같은 인자)
+    
+    반환: {"nodes": {주소: 속성}, "edges": {(source, target): 속성}, "graph": 속성, "contains_weth_address": bool,
+           "transfers": (source, target, event_index)로 중복을 제거한 edge_info 목록}
+    같은 주소 쌍의 엣지가 여러 개면 DiGraph와 같이 처음 추가된 위치에 마지막 엣지의 속성이 남음
+    (주소 쌍마다 합쳐지지 않은 개별 transfer는 transfers에 이벤트 순서대로 남음)
+    """
+    instrumentation = instrumentation or NULL_INSTRUMENTATION
+    if isinstance(semantic_events_list, dict):
+        semantic_index = semantic_events_list
+    else:
+        with instrumentation.stage("compile_rules"):
+            semantic_index = compile_semantic_index(semantic_events_list)
+            if sequence_matcher is None:
+                sequence_matcher = compile_sequence_patterns(semantic_events_list)
+    sequence_scanner = sequence_matcher.scanner() if sequence_matcher is not None else None
+    # LabelDispatchIndex면 이벤트 주소의 프로토콜에 맞는 규칙만 적용됨
+    rules_for = getattr(semantic_index, "rules_for", None)
+    
+    # 계측: hot loop에서는 지역 변수로만 모으고 루프가 끝난 뒤 한 번만 반영
+    # 이벤트 단위 parse / extract / sequence 시간은 perf_counter 호출이 많아 detailed일 때만 잼
+    counting = instrumentation.enabled
+    clock = time.perf_counter if counting and instrumentation.detailed else None
+    parse_seconds = [0.0]
+    extract_seconds = 0.0
+    sequence_seconds = 0.0
+    matched_by_name = {}
+    events_without_name = 0
+    extraction_misses = 0
+    
+    nodes = {}
+    edges = {}
+    graph = {}
     edges_info = []
-    address_total_volume = defaultdict(float)
-    event_counter = 0
+    unique_edges = []
+    event_counter = -1
     processed_events = 0
     contains_weth_address = False  # WETH 주소 필터링용 플래그
     
-    for event_counter, event in enumerate(data['events']):
+    events = data['events'] if isinstance(data, dict) else data
+    if clock is not None:
+        events = _timed_events(events, parse_seconds)
+    scan_started = time.perf_counter()
+    
+    for event_counter, event in enumerate(events):
         if "name" not in event:
+            events_without_name += 1
             if debug:
                 print(f"warning: event #{event_counter} has no 'name' field.")
             continue
@@ -91,409 +380,747 @@ def build_transaction_graph(data, semantic_events_list, debug=False):
         if debug:
             print(f"#{event_index} {event_name}")
         
-        # 이벤트 정의 찾기
-        for semantic_event in semantic_events_list:
-            if 'events' in semantic_event:
-                for event_def in semantic_event['events']:
-                    event_def_name = event_def.get('name')
-                        
-                    if (isinstance(event_def_name, str) and event_def_name == event_name) or \
-                       (isinstance(event_def_name, list) and event_name in event_def_name):
-                        processed_events += 1
-                        
-                        # Transfer와 같은 단순 이벤트 처리
-                        if 'src' in event_def and 'dst' in event_def and 'amount' in event_def:
-                            src = extract_node_value(event, event_def['src'])
-                            dst = extract_node_value(event, event_def['dst'])
-                            amount = extract_amount_value(event, event_def['amount'])
-                            
-                            if src and dst and amount:
-                                edge_info = {
-                                    "from_address": src,
-                                    "to_address": dst,
-                                    "event": event_name,
-                                    "amount": amount,
-                                    "event_index": event_index
-                                }
-                                edges_info.append(edge_info)
-                                # 거래량 추적
-                                amount_value = 0
-                                try:
-                                    if isinstance(amount, str):
-                                        if ' ' in amount:
-                                            # "10000 WETH" 형식인 경우
-                                            amount_value = float(amount.split()[0])
-                                        else:
-                                            # 숫자 문자열만 있는 경우
-                                            amount_value = float(amount)
-                                    elif amount is not None:
-                                        amount_value = float(amount)
-                                except (ValueError, TypeError):
-                                    print(f"Warning: Could not convert amount '{amount}' to float")
-                                    amount_value = 0
-                                
-                                address_total_volume[src] += amount_value
-                                address_total_volume[dst] += amount_value
-                                
-                                if debug:
-                                    print(f"#{event_index} {event_name}: {src} -> {dst} ({amount})")
-                        
-                        # 프로토콜 기반 복잡한 이벤트 처리 (Mint, Borrow 등)
-                        elif 'protocols' in event_def:
-                            for protocol in event_def['protocols']:
-                                if 'transfers' in protocol:
-                                    for transfer in protocol['transfers']:
-                                        src = extract_node_value(event, transfer['src'])
-                                        dst = extract_node_value(event, transfer['dst'])
-                                        amount = extract_amount_value(event, transfer['amount'])
-                                        
-                                        if src and dst and amount:
-                                            edge_info = {
-                                                "from_address": src,
-                                                "to_address": dst,
-                                                "event": event_name,
-                                                "amount": amount,
-                                                "event_index": event_index
-                                            }
-                                            edges_info.append(edge_info)
-                                            # 거래량 추적
-                                            amount_value = 0
-                                            try:
-                                                if isinstance(amount, str):
-                                                    if ' ' in amount:
-                                                        # "10000 WETH" 형식인 경우
-                                                        amount_value = float(amount.split()[0])
-                                                    else:
-                                                        # 숫자 문자열만 있는 경우
-                                                        amount_value = float(amount)
-                                                elif amount is not None:
-                                                    amount_value = float(amount)
-                                            except (ValueError, TypeError):
-                                                print(f"Warning: Could not convert amount '{amount}' to float")
-                                                amount_value = 0
-                                            
-                                            address_total_volume[src] += amount_value
-                                            address_total_volume[dst] += amount_value
-                                            
-                                            if debug:
-                                                print(f"#{event_index} {event_name}: {src} -> {dst} ({amount})")
-                        
-                        # 기본 transfers 배열 처리 (Deposit 등)
-                        elif 'transfers' in event_def:
-                            for transfer in event_def['transfers']:
-                                src = extract_node_value(event, transfer['src'])
-                                dst = extract_node_value(event, transfer['dst'])
-                                amount = extract_amount_value(event, transfer['amount'])
-                                
-                                if src and dst and amount:
-                                    edge_info = {
-                                        "from_address": src,
-                                        "to_address": dst,
-                                        "event": event_name,
-                                        "amount": amount,
-                                        "event_index": event_index
-                                    }
-                                    edges_info.append(edge_info)
-                                    # 거래량 추적
-                                    amount_value = 0
-                                    try:
-                                        if isinstance(amount, str):
-                                            if ' ' in amount:
-                                                # "10000 WETH" 형식인 경우
-                                                amount_value = float(amount.split()[0])
-                                            else:
-                                                # 숫자 문자열만 있는 경우
-                                                amount_value = float(amount)
-                                        elif amount is not None:
-                                            amount_value = float(amount)
-                                    except (ValueError, TypeError):
-                                        print(f"Warning: Could not convert amount '{amount}' to float")
-                                        amount_value = 0
-                                    
-                                    address_total_volume[src] += amount_value
-                                    address_total_volume[dst] += amount_value
-                                    
-                                    if debug:
-                                        print(f"#{event_index} {event_name}: {src} -> {dst} ({amount})")
-                        break
-                
-                # 이벤트 처리가 완료되면 다음 이벤트로 넘어감
-                if processed_events > event_counter:
-                    break
+        # 시퀀스 패턴은 같은 이벤트 스트림에서 함께 진행
+        if sequence_scanner is not None:
+            started = clock() if clock else 0.0
+            for match in sequence_scanner.feed(event, event_counter):
+                if debug:
+                    print(f"Pattern {match['pattern']} matched events {match['events']}")
+            if clock:
+                sequence_seconds += clock() - started
+        
+        # 이벤트 정의 찾기 (컴파일된 인덱스에서 이름으로 한 번에 조회)
+        started = clock() if clock else 0.0
+        event_edges = extract_event_edges(event, semantic_index, event_counter)
+        if clock:
+            extract_seconds += clock() - started
+        if event_edges is None:
+            continue
+        processed_events += 1
+        edges_info.extend(event_edges)
+        if counting:
+            matched_by_name[event_name] = matched_by_name.get(event_name, 0) + 1
+            # 규칙은 있지만 src / dst / amount 중 하나를 찾지 못한 경우
+            applied_rules = rules_for(event) if rules_for is not None else semantic_index[event_name]
+            extraction_misses += len(applied_rules) - len(event_edges)
+        
+        if debug:
+            for edge in event_edges:
+                amount = edge["amount"]
+                print(f"#{event_index} {event_name}: {edge['from_address']} -> {edge['to_address']} "
+                      f"({format_amount(amount)} {amount.symbol})")
     
     print(f"Total {event_counter+1} events, {processed_events} processed")
     
+    if counting:
+        instrumentation.add_time("scan", time.perf_counter() - scan_started, event_counter + 1)
+        if clock:
+            instrumentation.add_time("parse", parse_seconds[0], event_counter + 1)
+            instrumentation.add_time("extract", extract_seconds, event_counter + 1 - events_without_name)
+            if sequence_scanner is not None:
+                instrumentation.add_time("sequence", sequence_seconds, event_counter + 1 - events_without_name)
+        instrumentation.count("events_seen", event_counter + 1)
+        instrumentation.count("events_without_name", events_without_name)
+        instrumentation.count("events_matched", processed_events)
+        instrumentation.count("edges_emitted", len(edges_info))
+        instrumentation.count("extraction_misses", extraction_misses)
+        instrumentation.count_many(matched_by_name, "events_matched.")
+        instrumentation.count_many(_matches_by_rule_file(matched_by_name, semantic_index), "rule_file.")
+    
     # 노드와 엣지 생성
     if edges_info:
-        # 모든 고유 주소 추출
-        all_addresses = set()
-        for edge in edges_info:
-            all_addresses.add(edge["from_address"])
-            all_addresses.add(edge["to_address"])
+        # 거래량 추적 (토큰별 정수 합산 후 표시 단위로 변환)
+        with instrumentation.stage("volumes"):
+            address_total_volume = compute_address_volumes(edges_info, vectorized)
         
-        # 노드 생성
-        for address in all_addresses:
-            volume = address_total_volume.get(address, 0)
-            size = max(15, min(50, 15 + volume / 1000))
+        with instrumentation.stage("nodes_edges"):
+            # 노드 생성 (주소는 처음 등장한 순서대로)
+            all_addresses = {}
+            for edge in edges_info:
+                all_addresses[edge["from_address"]] = None
+                all_addresses[edge["to_address"]] = None
             
-            if address == "External":
-                G.add_node(address, size=60, title="External", type="external")
-            else:
-                G.add_node(address, size=size, title=f"Address: {address}\nVolume: {volume:.2f}", type="address")
-        
-        # 중복 엣지 제거를 위한 세트
-        added_edges = set()
-        
-        # 엣지 생성
-        for edge in edges_info:
-            source = edge["from_address"]
-            target = edge["to_address"]
-            event = edge["event"]
-            amount = edge["amount"]
-            event_index = edge["event_index"]
+            for address in all_addresses:
+                nodes[address] = node_attributes(address, address_total_volume.get(address, 0))
             
-            edge_key = (source, target, event_index)
+            # 중복 엣지 제거를 위한 세트
+            added_edges = set()
             
-            if edge_key not in added_edges:
-                added_edges.add(edge_key)
+            # 엣지 생성
+            for edge in edges_info:
+                source = edge["from_address"]
+                target = edge["to_address"]
+                edge_key = (source, target, edge["event_index"])
                 
-                # 금액과 토큰 분리
-                if isinstance(amount, str) and ' ' in amount:
-                    amount_parts = amount.split(' ', 1)
-                    amount_value = amount_parts[0]
-                    token = amount_parts[1]
-                else:
-                    amount_value = amount
-                    token = ""
-                
-                G.add_edge(
-                    source, target,
-                    event=event,
-                    token=token,
-                    amount=amount_value,
-                    title=f"{event}: {amount}",
-                    weight=float(amount_value) if amount_value else 0,
-                    event_index=event_index
-                )
-    
-    return G, contains_weth_address  # WETH 주소 포함 여부와 함께 그래프 반환
+                if edge_key not in added_edges:
+                    added_edges.add(edge_key)
+                    unique_edges.append(edge)
+                    edges.setdefault((source, target), {}).update(edge_attributes(edge))
+        instrumentation.count("edges_unique", len(unique_edges))
+        
+        # 주소 x 토큰 순 잔액 변화 (같은 주소 쌍의 엣지는 하나만 남으므로 엣지 목록에서 계산)
+        with instrumentation.stage("balance_deltas"):
+            graph["balance_deltas"] = compute_balance_deltas(unique_edges, vectorized)
+    
+    # 매칭된 시퀀스 패턴을 그래프와 해당 이벤트의 엣지에 기록
+    if sequence_scanner is not None:
+        graph["patterns"] = sequence_scanner.matches
+        tag_edge_matches(edges.values(), sequence_scanner.matches)
+        instrumentation.count("sequence_matches", len(sequence_scanner.matches))
+    
+    return {"nodes": nodes, "edges": edges, "graph": graph, "contains_weth_address": contains_weth_address,
+            "transfers": unique_edges}
 
-def extract_node_value(event, node_spec):
-    """이벤트에서 노드 값을 추출하는 함수"""
-    if 'event_field' in node_spec:
-        field = node_spec['event_field']
-        if field == 'address':
-            return event['address']
-        elif field == 'inputs':
-            param_names = node_spec['param_name']
-            for input_field in event.get('inputs', []):
-                if input_field.get('name') in param_names:
-                    return input_field.get('displayValue') or input_field.get('rawValue') 
-    elif 'json_key' in node_spec:
-        field = node_spec['json_key']
-        if field == 'inputs':
-            param_names = node_spec['param_name']
-            for input_field in event.get('inputs', []):
-                if input_field.get('name') in param_names:
-                    return input_field.get('displayValue') or input_field.get('rawValue')
+def _timed_events(events, parse_seconds):
+    """이벤트 iterator에서 다음 이벤트를 꺼내는 시간(파일 읽기 / JSON 파싱)을 parse_seconds[0]에 누적"""
+    iterator = iter(events)
+    clock = time.perf_counter
+    while True:
+        started = clock()
+        try:
+            event = next(iterator)
+        except StopIteration:
+            parse_seconds[0] += clock() - started
+            return
+        parse_seconds[0] += clock() - started
+        yield event
+
+def _matches_by_rule_file(matched_by_name, semantic_index):
+    """이벤트 이름별 매칭 수를 규칙 파일별로 합산"""
+    by_file = {}
+    for name, count in matched_by_name.items():
+        rules = semantic_index.get(name)
+        source = rules[0].get("source") if rules else None
+        source = source or "unknown"
+        by_file[source] = by_file.get(source, 0) + count
+    return by_file
+
+def extract_event_edges(event, semantic_index, event_counter=0):
+    """
+    이벤트 하나에 매칭되는 규칙을 적용해서 엣지 정보 리스트 반환
+    
+    매칭되는 semantic 정의가 없으면 None 반환
+    semantic_index가 LabelDispatchIndex면 이벤트 주소의 프로토콜 라벨에 맞는 규칙만 적용
+    """
+    rules_for = getattr(semantic_index, "rules_for", None)
+    transfer_rules = rules_for(event) if rules_for is not None else semantic_index.get(event.get('name'))
+    if transfer_rules is None:
+        return None
+    
+    event_name = event['name']
+    event_index = event.get('eventIndex', event_counter)
+    edges = []
+    
+    # 이벤트당 한 번만 inputs 이름 맵 생성
+    inputs_by_name = index_event_inputs(event.get('inputs', []))
+    for rule in transfer_rules:
+        src = rule['src'](event, inputs_by_name)
+        dst = rule['dst'](event, inputs_by_name)
+        amount = rule['amount'](event, inputs_by_name)
+        
+        if src and dst and amount is not None:
+            edges.append({
+                "from_address": src,
+                "to_address": dst,
+                "event": event_name,
+                "amount": amount,
+                "event_index": event_index
+            })
+    
+    return edges
+
+def node_attributes(address, volume):
+    """주소와 거래량으로 그래프 노드 속성 생성"""
+    if address == "External":
+        return {"size": 60, "title": "External", "type": "external", "volume": volume}
+    size = max(15, min(50, 15 + volume / 1000))
+    return {"size": size, "title": f"Address: {address}\nVolume: {volume:.2f}", "type": "address", "volume": volume}
+
+def edge_attributes(edge):
+    """엣지 정보(edge_info)로 그래프 엣지 속성 생성"""
+    event = edge["event"]
+    amount = edge["amount"]
+    amount_value = format_amount(amount)
+    token = amount.symbol
+    return {
+        "event": event,
+        "token": token,
+        "amount": amount_value,
+        "raw_amount": amount.raw,
+        "decimals": amount.decimals,
+        "title": edge_title(event, amount_value, token),
+        "weight": amount_to_float(amount),
+        "event_index": edge["event_index"]
+    }
+
+def edge_title(event, amount_value, token):
+    """엣지 tooltip 문자열 (내보내기 형식에서 title을 저장하지 않은 경우에도 같은 값으로 복원)"""
+    return f"{event}: {amount_value} {token}".strip()
+
+def index_event_inputs(event_inputs):
+    """이벤트 inputs를 이름 -> (위치, input) 맵으로 변환 (같은 이름은 첫 번째 것만 유지)"""
+    inputs_by_name = {}
+    for position, input_field in enumerate(event_inputs):
+        name = input_field.get('name')
+        if name not in inputs_by_name:
+            inputs_by_name[name] = (position, input_field)
+    return inputs_by_name
+
+def _compile_input_lookup(param_names):
+    """param_name 목록에 대해 inputs 순서상 가장 먼저 나오는 input을 찾는 함수 생성"""
+    if isinstance(param_names, str):
+        param_names = [param_names]
+    param_names = tuple(param_names)
+    
+    if len(param_names) == 1:
+        param_name = param_names[0]
+        
+        def lookup(inputs_by_name):
+            found = inputs_by_name.get(param_name)
+            return found[1] if found else None
+        return lookup
+    
+    def lookup(inputs_by_name):
+        best = None
+        for param_name in param_names:
+            found = inputs_by_name.get(param_name)
+            if found and (best is None or found[0] < best[0]):
+                best = found
+        return best[1] if best else None
+    return lookup
+
+def _missing_value(event, inputs_by_name):
     return None
 
-def extract_amount_value(event, amount_spec):
-    """이벤트에서 금액 값을 추출하는 함수"""
+def compile_node_extractor(node_spec):
+    """src / dst 스펙을 (event, inputs_by_name) -> 노드 값 함수로 컴파일"""
+    field = node_spec.get('event_field')
+    if field is None:
+        # json_key 형식은 inputs만 지원
+        field = node_spec.get('json_key')
+        if field != 'inputs':
+            return _missing_value
+    
+    if field == 'address':
+        def extract(event, inputs_by_name):
+            return event['address']
+        return extract
+    
+    if field == 'inputs':
+        lookup = _compile_input_lookup(node_spec['param_name'])
+        
+        def extract(event, inputs_by_name):
+            input_field = lookup(inputs_by_name)
+            if input_field is None:
+                return None
+            return input_field.get('displayValue') or input_field.get('rawValue')
+        return extract
+    
+    return _missing_value
+
+def compile_amount_extractor(amount_spec):
+    """amount 스펙을 (event, inputs_by_name) -> Amount 함수로 컴파일"""
     if 'event_field' in amount_spec:
-        field = amount_spec['event_field']
-        if field == 'inputs':
-            param_names = amount_spec['param_name']
-            for input_field in event.get('inputs', []):
-                if input_field.get('name') in param_names:
-                    value = input_field.get('formattedValue') or input_field.get('rawValue')
-                    
-                    # CSV 형식 값에서 특정 인덱스 추출
-                    if 'extract' in amount_spec and amount_spec['extract']['type'] == 'csv':
-                        index = amount_spec['extract']['index']
-                        if isinstance(value, str) and ',' in value:
-                            parts = value.split(',')
-                            if index < len(parts):
-                                value = parts[index]
-                    
-                    symbol = input_field.get('symbol', '')
-                    return f"{value} {symbol}".strip()
-    elif 'json_key' in amount_spec:
-        field = amount_spec['json_key']
-        if field == 'inputs':
-            param_names = amount_spec['param_name']
-            for input_field in event.get('inputs', []):
-                if input_field.get('name') in param_names:
-                    value = input_field.get('formattedValue') or input_field.get('rawValue')
-                    symbol = input_field.get('symbol', '')
-                    return f"{value} {symbol}".strip()
-    return None
+        if amount_spec['event_field'] != 'inputs':
+            return _missing_value
+        extract_spec = amount_spec.get('extract')
+        csv_index = extract_spec['index'] if extract_spec and extract_spec['type'] == 'csv' else None
+    elif amount_spec.get('json_key') == 'inputs':
+        csv_index = None
+    else:
+        return _missing_value
+    
+    lookup = _compile_input_lookup(amount_spec['param_name'])
+    
+    def extract(event, inputs_by_name):
+        input_field = lookup(inputs_by_name)
+        if input_field is None:
+            return None
+        return amount_from_input(input_field, csv_index)
+    return extract
 
-def visualize_graph(G, output_file="transaction_graph.html", debug=False):
-    """그래프를 HTML 파일로 시각화"""
-    if G.number_of_nodes() == 0:
-        print("warning: no nodes in graph.")
-        return None
+def compute_address_volumes(edges_info, vectorized=False):
+    """
+    엣지 목록에서 주소별 거래량(유입 + 유출) 계산
     
-    # 고립된 노드 제거
+    (주소, 토큰, decimals) 별로 정수 합산한 뒤 마지막에만 표시 단위 float로 변환
+    """
+    keyed_raws = []
+    for edge in edges_info:
+        amount = edge["amount"]
+        keyed_raws.append(((edge["from_address"], amount.symbol, amount.decimals), amount.raw))
+        keyed_raws.append(((edge["to_address"], amount.symbol, amount.decimals), amount.raw))
+    
+    address_total_volume = defaultdict(float)
+    for (address, _, decimals), total in sum_raw_by_key(keyed_raws, vectorized).items():
+        address_total_volume[address] += total / 10 ** decimals
+    return address_total_volume
+
+def extract_node_value(event, node_spec):
+    """이벤트에서 노드 값을 추출하는 함수"""
+    inputs_by_name = index_event_inputs(event.get('inputs', []))
+    return compile_node_extractor(node_spec)(event, inputs_by_name)
+
+def extract_amount_value(event, amount_spec):
+    """이벤트에서 금액 값을 "값 심볼" 문자열로 추출하는 함수"""
+    inputs_by_name = index_event_inputs(event.get('inputs', []))
+    amount = compile_amount_extractor(amount_spec)(event, inputs_by_name)
+    if amount is None:
+        return None
+    return f"{format_amount(amount)} {amount.symbol}".strip()
+
+def prune_graph(G, debug=False):
+    """시각화 / 내보내기 전에 고립된 노드와 zero address 노드 제거"""
     isolated_nodes = [node for node in G.nodes() if G.degree(node) == 0]
     if isolated_nodes and debug:
         print(f"Isolated nodes {len(isolated_nodes)} removed")
     G.remove_nodes_from(isolated_nodes)
     
-    zero_address = "0x0000000000000000000000000000000000000000"
+    if ZERO_ADDRESS in G.nodes():
+        G.remove_node(ZERO_ADDRESS)
+    
+    return G
+
+def node_label(node_id):
+    """노드 표시용 라벨 (긴 주소는 축약)"""
+    if isinstance(node_id, str) and node_id.startswith("0x") and len(node_id) > 20:
+        return f"{node_id[:8]}...{node_id[-4:]}"
+    return str(node_id)
+
+def edge_color(event):
+    """이벤트 종류별 엣지 색상"""
+    if "Transfer" in event:
+        return "#48A6A7"
+    elif "Withdraw" in event:
+        return "#5F8B4C"
+    elif "Deposit" in event:
+        return "#FF9A9A"
+    elif "Borrow" in event:
+        return "#C68EFD"
+    elif "Mint" in event:
+        return "#FF9A9A"
+    return "#5F8B4C"
+
+# 엣지 수가 이보다 많으면 대형 그래프 모드로 렌더링
+LARGE_GRAPH_EDGE_THRESHOLD = 500
+# spring layout을 적용할 최대 노드 수 (초과하면 spectral layout 사용)
+LAYOUT_SPRING_MAX_NODES = 500
+# spectral layout을 적용할 최대 노드 수 (초과하면 circular layout 사용)
+LAYOUT_SPECTRAL_MAX_NODES = 10000
+# 같은 주소에 붙은 저거래량 leaf 노드가 이 개수 이상이면 cluster 노드로 묶음
+LEAF_CLUSTER_MIN_SIZE = 2
+# 집계 엣지 툴팁에 표시할 최대 transfer 수
+EDGE_DETAIL_MAX_LINES = 20
+
+def build_render_graph(G, leaf_volume_threshold=None):
+    """
+    대형 그래프 렌더링용으로 그래프를 축약
+    
+    - 같은 주소 쌍 사이의 엣지(양방향 포함)는 하나의 가중 엣지로 합치고 상세 내용은 툴팁에 표시
+    - 이웃이 하나뿐이고 거래량이 leaf_volume_threshold 이하인 leaf 주소는 이웃 주소별 cluster 노드로 묶음
+      (기본값은 전체 노드 거래량의 중앙값)
+    
+    반환값은 (nodes, edges): nodes는 id -> 노드 dict, edges는 집계 엣지 dict 목록
+    """
+    volumes = {node_id: attrs.get("volume", 0) for node_id, attrs in G.nodes(data=True)}
+    if leaf_volume_threshold is None:
+        ordered = sorted(volumes.values())
+        leaf_volume_threshold = ordered[len(ordered) // 2] if ordered else 0
+    
+    # leaf 노드를 이웃(hub) 기준으로 그룹화
+    leaf_groups = defaultdict(list)
+    for node_id in G.nodes():
+        if node_id == "External" or volumes[node_id] > leaf_volume_threshold:
+            continue
+        neighbors = set(G.predecessors(node_id)) | set(G.successors(node_id))
+        neighbors.discard(node_id)
+        if len(neighbors) == 1:
+            leaf_groups[next(iter(neighbors))].append(node_id)
+    
+    mapping = {}
+    nodes = {}
+    for hub, members in leaf_groups.items():
+        if len(members) < LEAF_CLUSTER_MIN_SIZE or hub in mapping:
+            continue
+        cluster_id = f"cluster:{hub}"
+        cluster_volume = sum(volumes[member] for member in members)
+        listed = "\n".join(str(member) for member in members[:EDGE_DETAIL_MAX_LINES])
+        if len(members) > EDGE_DETAIL_MAX_LINES:
+            listed += f"\n... {len(members) - EDGE_DETAIL_MAX_LINES} more"
+        nodes[cluster_id] = {
+            "label": f"{len(members)} addresses",
+            "size": max(15, min(50, 15 + len(members))),
+            "title": f"Cluster of {len(members)} low-volume addresses\nVolume: {cluster_volume:.2f}\n{listed}",
+            "color": "#E8E8E8",
+            "type": "cluster"
+        }
+        for member in members:
+            mapping[member] = cluster_id
+    
+    for node_id, attrs in G.nodes(data=True):
+        if node_id in mapping:
+            continue
+        nodes[node_id] = {
+            "label": node_label(node_id),
+            "size": attrs.get("size", 15),
+            "title": attrs.get("title", str(node_id)),
+            "color": "#9FB3DF" if node_id == "External" else "#BDDDE4",
+            "type": attrs.get("type", "address")
+        }
+    
+    # 주소 쌍 단위로 엣지 집계
+    aggregated = {}
+    for source, target, attrs in G.edges(data=True):
+        a, b = mapping.get(source, source), mapping.get(target, target)
+        key = (a, b) if str(a) <= str(b) else (b, a)
+        edge = aggregated.get(key)
+        if edge is None:
+            edge = aggregated[key] = {
+                "from": key[0], "to": key[1], "forward": False, "backward": False,
+                "weight": 0.0, "count": 0, "events": [], "details": []
+            }
+        edge["forward" if (a, b) == key else "backward"] = True
+        edge["weight"] += attrs.get("weight", 0) or 0
+        edge["count"] += 1
+        edge["events"].append(attrs.get("event", ""))
+        if len(edge["details"]) < EDGE_DETAIL_MAX_LINES:
+            edge["details"].append(f"#{attrs.get('event_index', -1)} {source} -> {target}: {attrs.get('title', '')}")
     
-    if zero_address in G.nodes():
-        G.remove_node(zero_address)
+    edges = []
+    for edge in aggregated.values():
+        if edge["count"] > len(edge["details"]):
+            edge["details"].append(f"... {edge['count'] - len(edge['details'])} more")
+        edges.append(edge)
+    
+    return nodes, edges
+
+def compute_layout(G, nodes, edges):
+    """
+    렌더링 노드 위치를 서버에서 미리 계산해서 G.graph["layout"]에 저장
+    
+    같은 노드 구성에 대해 이미 계산된 layout이 있으면 그대로 재사용함
+    (graph_to_dict / graph_from_dict를 통해 그래프와 함께 캐시됨)
+    """
+    layout = G.graph.get("layout")
+    if layout and all(node_id in layout for node_id in nodes):
+        return layout
+    
+    layout = layout_positions(nodes, ((edge["from"], edge["to"]) for edge in edges))
+    G.graph["layout"] = layout
+    return layout
+
+def layout_positions(nodes, pairs):
+    """
+    노드 id 목록과 (from, to) 쌍으로 {노드 id: [x, y]} 계산
+    
+    노드 수에 따라 spring / spectral / circular layout 중 하나를 사용 (compute_layout, graph_timeline에서 사용)
+    """
+    import networkx as nx
+    
+    H = nx.Graph()
+    H.add_nodes_from(nodes)
+    H.add_edges_from(pairs)
+    
+    scale = 150 * max(1.0, len(nodes) ** 0.5)
+    positions = None
+    if len(nodes) <= LAYOUT_SPRING_MAX_NODES:
+        positions = nx.spring_layout(H, seed=42, scale=scale)
+    elif len(nodes) <= LAYOUT_SPECTRAL_MAX_NODES:
+        try:
+            positions = nx.spectral_layout(H, scale=scale)
+        except Exception:
+            # scipy가 없거나 분해에 실패한 경우
+            positions = None
+    if positions is None:
+        positions = nx.circular_layout(H, scale=scale)
+    
+    return {node_id: [round(float(x), 2), round(float(y), 2)] for node_id, (x, y) in positions.items()}
+
+def visualize_large_graph(G, output_file="transaction_graph.html", debug=False, leaf_volume_threshold=None):
+    """
+    대형 그래프용 HTML 시각화
+    
+    build_large_network 참고
+    """
+    net = build_large_network(G, debug, leaf_volume_threshold)
+    return save_network(net, output_file)
+
+def build_large_network(G, debug=False, leaf_volume_threshold=None):
+    """
+    대형 그래프용 pyvis Network 생성
+    
+    브라우저 physics 시뮬레이션 없이 서버에서 계산한 위치를 사용하고,
+    엣지 라벨 없이 주소 쌍 단위로 집계된 엣지와 leaf cluster 노드를 그림
+    """
+    return _network_from_data(*large_network_data(G, debug, leaf_volume_threshold))
+
+def large_network_data(G, debug=False, leaf_volume_threshold=None):
+    """build_large_network가 그리는 vis.js 노드 / 엣지 dict 목록과 옵션 (nodes, edges, options)"""
+    nodes, edges = build_render_graph(G, leaf_volume_threshold)
+    layout = compute_layout(G, nodes, edges)
     
     if debug:
-        print(f"Visualization: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+        print(f"Large graph visualization: {len(nodes)} nodes, {len(edges)} aggregated edges")
     
-    # 네트워크 생성
-    net = Network(height="900px", width="100%", bgcolor="#ffffff", font_color="black", directed=True)
+    vis_nodes = []
+    for node_id, node in nodes.items():
+        x, y = layout[node_id]
+        vis_nodes.append({
+            "id": node_id,
+            "label": node["label"],
+            "size": node["size"],
+            "title": node["title"],
+            "color": node["color"],
+            "shape": "dot",
+            "x": x,
+            "y": y,
+            "borderWidth": 2,
+            "font": {"color": "black"}
+        })
     
-    # 노드 추가
-    for node in G.nodes(data=True):
-        node_id = node[0]
-        attrs = node[1]
-        
-        # 긴 주소 축약
-        if isinstance(node_id, str) and node_id.startswith("0x") and len(node_id) > 20:
-            label = f"{node_id[:8]}...{node_id[-4:]}"
-        else:
-            label = str(node_id)
-        
-        # 노드 속성
-        size = attrs.get("size", 15)
-        color = "#9FB3DF" if node_id == "External" else "#BDDDE4"
-        title = attrs.get("title", str(node_id))
-        
-        net.add_node(
-            node_id, 
-            label=label, 
-            size=size, 
-            title=title,
-            color=color,
-            borderWidth=2,
-            borderWidthSelected=4,
-            font={'color': 'black'}
-        )
-    
-    # 엣지 추가
-    for edge in G.edges(data=True):
-        source, target = edge[0], edge[1]
-        attrs = edge[2]
-        
-        event = attrs.get("event", "")
-        token = attrs.get("token", "")
-        amount = attrs.get("amount", 0)
-        event_index = attrs.get("event_index", -1)
-        
-        # 엣지 색상
-        if "Transfer" in event:
-            color = "#48A6A7"
-        elif "Withdraw" in event:
-            color = "#5F8B4C"
-        elif "Deposit" in event:
-            color = "#FF9A9A"
-        elif "Borrow" in event:
-            color = "#C68EFD"
-        elif "Mint" in event:
-            color = "#FF9A9A"
-        else:
-            color = "#5F8B4C"
-        
-        # 엣지 속성
-        title = attrs.get("title", f"{event}: {amount} {token}")
-        width = 1
-        # try:
-        #     width = max(1, min(5, 1 + float(amount) / 1000 if amount else 1))
-        # except (ValueError, TypeError):
-        #     width = 1
-        label = f"#{event_index}: {event}"
-        
-        net.add_edge(
-            source, 
-            target, 
-            title=title, 
-            width=width,
-            color=color,
-            label=label,
-            arrows={"to": {"enabled": True, "scaleFactor": 0.3}}
-        )
-    
-    # 레이아웃 설정
-    net.barnes_hut(
-        gravity=-3000,
-        central_gravity=0.05,
-        spring_length=300,
-        spring_strength=0.04,
-        damping=0.95,
-        overlap=0.2
-    )
-    
-    # 상호작용 옵션
-    net.set_options("""
-    {
-      "physics": {
+    vis_edges = []
+    for edge in edges:
+        arrows = ",".join(direction for direction, enabled in (("to", edge["forward"]), ("from", edge["backward"]))
+                          if enabled)
+        event_names = set(edge["events"])
+        vis_edges.append({
+            "from": edge["from"],
+            "to": edge["to"],
+            "title": f"{edge['count']} transfers\n" + "\n".join(edge["details"]),
+            "width": min(8, 1 + math.log2(edge["count"])),
+            "color": edge_color(next(iter(event_names))) if len(event_names) == 1 else "#888888",
+            "arrows": arrows
+        })
+    
+    return vis_nodes, vis_edges, LARGE_NETWORK_OPTIONS
+
+def visualize_graph(G, output_file="transaction_graph.html", debug=False, large=None):
+    """
+    그래프를 HTML 파일로 시각화
+    
+    large가 None이면 엣지 수가 LARGE_GRAPH_EDGE_THRESHOLD를 넘을 때 visualize_large_graph로 렌더링
+    (여러 그래프를 한 번에 렌더링할 때는 html_emitter.write_graph_page 사용)
+    """
+    net = build_graph_network(G, debug, large)
+    if net is None:
+        return None
+    return save_network(net, output_file)
+
+def render_graph_html(G, debug=False, large=None):
+    """visualize_graph와 같은 HTML을 파일에 쓰지 않고 문자열로 반환 (노드가 없으면 None)"""
+    net = build_graph_network(G, debug, large)
+    if net is None:
+        return None
+    return net.generate_html()
+
+def save_network(net, output_file):
+    """pyvis Network를 HTML 파일로 저장"""
+    try:
+        net.save_graph(output_file)
+        print(f"Graph saved to {output_file}")
+        return output_file
+    except Exception as e:
+        print(f"Graph saving error: {e}")
+        return None
+
+# 일반 그래프의 vis.js 옵션 (barnesHut physics로 배치)
+NETWORK_OPTIONS = {
+    "physics": {
         "barnesHut": {
-          "gravitationalConstant": -3000,
-          "centralGravity": 0.05,
-          "springLength": 300,
-          "springConstant": 0.04,
-          "damping": 0.95,
-          "avoidOverlap": 0.2
+            "gravitationalConstant": -3000,
+            "centralGravity": 0.05,
+            "springLength": 300,
+            "springConstant": 0.04,
+            "damping": 0.95,
+            "avoidOverlap": 0.2
         },
         "maxVelocity": 40,
         "minVelocity": 0.1,
         "solver": "barnesHut",
         "stabilization": {
-          "enabled": true,
-          "iterations": 1000,
-          "updateInterval": 25
+            "enabled": True,
+            "iterations": 1000,
+            "updateInterval": 25
         },
         "timestep": 0.5
-      },
-      "edges": {
+    },
+    "edges": {
         "smooth": {
-          "enabled": true,
-          "type": "dynamic",
-          "roundness": 0.5
+            "enabled": True,
+            "type": "dynamic",
+            "roundness": 0.5
         },
         "arrows": {
-          "to": {
-            "enabled": true,
-            "scaleFactor": 0.3
-          }
+            "to": {
+                "enabled": True,
+                "scaleFactor": 0.3
+            }
         },
         "font": {
-          "size": 12,
-          "strokeWidth": 0,
-          "align": "middle"
+            "size": 12,
+            "strokeWidth": 0,
+            "align": "middle"
         }
-      },
-      "interaction": {
-        "hover": true,
-        "navigationButtons": true,
-        "keyboard": true
-      },
-      "layout": {
-        "improvedLayout": true
-      }
+    },
+    "interaction": {
+        "hover": True,
+        "navigationButtons": True,
+        "keyboard": True
+    },
+    "layout": {
+        "improvedLayout": True
     }
-    """)
+}
+
+# 대형 그래프의 vis.js 옵션 (서버에서 계산한 위치 사용, physics 없음)
+LARGE_NETWORK_OPTIONS = {
+    "physics": {
+        "enabled": False
+    },
+    "edges": {
+        "smooth": False,
+        "arrows": {
+            "to": {
+                "scaleFactor": 0.3
+            },
+            "from": {
+                "scaleFactor": 0.3
+            }
+        }
+    },
+    "interaction": {
+        "hover": True,
+        "hideEdgesOnDrag": True,
+        "navigationButtons": True,
+        "keyboard": True
+    },
+    "layout": {
+        "improvedLayout": False
+    }
+}
+
+def build_graph_network(G, debug=False, large=None):
+    """
+    그래프를 pruning 한 뒤 시각화용 pyvis Network 생성 (노드가 없으면 None)
     
-    # 파일 저장
-    try:
-        net.save_graph(output_file)
-        print(f"Graph saved to {output_file}")
-        return output_file
-    except Exception as e:
-        print(f"Graph saving error: {e}")
+    large가 None이면 엣지 수가 LARGE_GRAPH_EDGE_THRESHOLD를 넘을 때 build_large_network 사용
+    """
+    network_data = graph_network_data(G, debug, large)
+    if network_data is None:
         return None
+    return _network_from_data(*network_data)
+
+def graph_network_data(G, debug=False, large=None):
+    """
+    그래프를 pruning 한 뒤 vis.js 노드 / 엣지 dict 목록과 옵션 (nodes, edges, options) 생성 (노드가 없으면 None)
     
-def export_graph_to_json(G, output_file="transaction_graph.json"):
-    """그래프를 JSON 파일로 내보내는 함수"""
+    pyvis Network(build_graph_network)와 템플릿 기반 출력(html_emitter)이 같은 데이터를 사용함
+    """
+    if G.number_of_nodes() == 0:
+        print("warning: no nodes in graph.")
+        return None
+    
+    prune_graph(G, debug)
+    
+    if large is None:
+        large = G.number_of_edges() > LARGE_GRAPH_EDGE_THRESHOLD
+    if large:
+        return large_network_data(G, debug)
+    
+    if debug:
+        print(f"Visualization: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+    
+    # 노드 (긴 주소는 축약해서 라벨로 사용)
+    nodes = []
+    for node_id, attrs in G.nodes(data=True):
+        nodes.append({
+            "id": node_id,
+            "label": node_label(node_id),
+            "size": attrs.get("size", 15),
+            "title": attrs.get("title", str(node_id)),
+            "color": "#9FB3DF" if node_id == "External" else "#BDDDE4",
+            "shape": "dot",
+            "borderWidth": 2,
+            "borderWidthSelected": 4,
+            "font": {"color": "black"}
+        })
+    
+    # 엣지 (라벨은 event_index와 이벤트 이름)
+    edges = []
+    for source, target, attrs in G.edges(data=True):
+        event = attrs.get("event", "")
+        token = attrs.get("token", "")
+        amount = attrs.get("amount", 0)
+        event_index = attrs.get("event_index", -1)
+        edges.append({
+            "from": source,
+            "to": target,
+            "title": attrs.get("title", f"{event}: {amount} {token}"),
+            "width": 1,
+            "color": edge_color(event),
+            "label": f"#{event_index}: {event}",
+            "arrows": {"to": {"enabled": True, "scaleFactor": 0.3}}
+        })
+    
+    return nodes, edges, NETWORK_OPTIONS
+
+def _network_from_data(nodes, edges, options):
+    """vis.js 노드 / 엣지 dict로 pyvis Network 생성"""
+    from pyvis.network import Network
+    
+    net = Network(height="900px", width="100%", bgcolor="#ffffff", font_color="black", directed=True)
+    
+    # 노드 / 엣지가 많으면 pyvis add_node / add_edge의 중복 검사 비용이 커서 직접 추가
+    for node in nodes:
+        net.nodes.append(node)
+        net.node_ids.append(node["id"])
+        net.node_map[node["id"]] = node
+    net.edges.extend(edges)
+    
+    net.set_options(json.dumps(options))
+    
+    return net
+    
+def node_record(node_id, attrs):
+    """노드를 JSON 내보내기 형식의 dict로 변환"""
+    return {
+        "id": node_id,
+        "size": attrs.get("size", 15),
+        "title": attrs.get("title", str(node_id)),
+        "type": attrs.get("type", "address"),
+        "volume": attrs.get("volume", 0)
+    }
+
+def edge_record(source, target, attrs):
+    """엣지를 JSON 내보내기 형식의 dict로 변환"""
+    record = {
+        "from": source,
+        "to": target,
+        "event": attrs.get("event", ""),
+        "token": attrs.get("token", ""),
+        "amount": attrs.get("amount", 0),
+        "raw_amount": str(attrs.get("raw_amount", "")),
+        "decimals": attrs.get("decimals", 0),
+        "event_index": attrs.get("event_index", -1),
+        "title": attrs.get("title", "")
+    }
+    # 시퀀스 패턴에 포함된 엣지만 패턴 이름 목록을 가짐
+    if attrs.get("patterns"):
+        record["patterns"] = attrs["patterns"]
+    return record
+
+def transfer_records(parts):
+    """
+    collect_transaction_graph 결과의 개별 transfer를 edge_record 형식의 dict 목록으로 변환
+
+    DiGraph / graph_to_dict는 같은 주소 쌍의 엣지를 하나로 합치므로 GraphStore에는 이 목록을 저장함
+    (zero address를 포함한 모든 transfer, 이벤트 순서)
+    """
+    return [edge_record(edge["from_address"], edge["to_address"], edge_attributes(edge))
+            for edge in parts["transfers"]]
+
+def graph_to_dict(G):
+    """그래프를 JSON 내보내기 형식의 dict로 변환"""
     graph_data = {
         "nodes": [],
         "edges": []
@@ -501,28 +1128,26 @@ def export_graph_to_json(G, output_file="transaction_graph.json"):
     
     # 노드 정보 추출
     for node_id, attrs in G.nodes(data=True):
-        node_data = {
-            "id": node_id,
-            "size": attrs.get("size", 15),
-            "title": attrs.get("title", str(node_id)),
-            "type": attrs.get("type", "address")
-        }
-        graph_data["nodes"].append(node_data)
+        graph_data["nodes"].append(node_record(node_id, attrs))
     
     # 엣지 정보 추출
     for source, target, attrs in G.edges(data=True):
-        edge_data = {
-            "from": source,
-            "to": target,
-            "event": attrs.get("event", ""),
-            "token": attrs.get("token", ""),
-            "amount": attrs.get("amount", 0),
-            "event_index": attrs.get("event_index", -1),
-            "title": attrs.get("title", "")
-        }
-        graph_data["edges"].append(edge_data)
+        graph_data["edges"].append(edge_record(source, target, attrs))
     
-    # JSON 파일로 저장
+    # 대형 그래프 모드에서 계산된 노드 위치
+    if "layout" in G.graph:
+        graph_data["layout"] = G.graph["layout"]
+    # 매칭된 시퀀스 패턴
+    if "patterns" in G.graph:
+        graph_data["patterns"] = G.graph["patterns"]
+    # 주소 x 토큰 순 잔액 변화
+    if "balance_deltas" in G.graph:
+        graph_data["balance_deltas"] = balance_delta_records(G.graph["balance_deltas"])
+    
+    return graph_data
+
+def write_graph_data(graph_data, output_file):
+    """graph_to_dict 형식의 데이터를 JSON 파일로 저장"""
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(graph_data, f, indent=2, ensure_ascii=False)
@@ -532,31 +1157,107 @@ def export_graph_to_json(G, output_file="transaction_graph.json"):
         print(f"JSON export error: {e}")
         return None
 
-def main(file_path, debug=True):
+def graph_from_dict(graph_data):
+    """graph_to_dict / export_graph_to_json 형식의 데이터로 그래프 복원"""
+    import networkx as nx
+    
+    G = nx.DiGraph()
+    if "layout" in graph_data:
+        G.graph["layout"] = graph_data["layout"]
+    if "patterns" in graph_data:
+        G.graph["patterns"] = graph_data["patterns"]
+    if "balance_deltas" in graph_data:
+        G.graph["balance_deltas"] = balance_deltas_from_records(graph_data["balance_deltas"])
+    
+    for node in graph_data.get("nodes", []):
+        G.add_node(node["id"], size=node.get("size", 15), title=node.get("title", str(node["id"])),
+                   type=node.get("type", "address"), volume=node.get("volume", 0))
+    
+    for edge in graph_data.get("edges", []):
+        raw_amount = edge.get("raw_amount", "")
+        attrs = {
+            "event": edge.get("event", ""),
+            "token": edge.get("token", ""),
+            "amount": edge.get("amount", 0),
+            "title": edge.get("title", ""),
+            "event_index": edge.get("event_index", -1)
+        }
+        if raw_amount != "":
+            amount = Amount(int(raw_amount), edge.get("decimals", 0), attrs["token"])
+            attrs.update(raw_amount=amount.raw, decimals=amount.decimals, weight=amount_to_float(amount))
+        if edge.get("patterns"):
+            attrs["patterns"] = edge["patterns"]
+        G.add_edge(edge["from"], edge["to"], **attrs)
+    
+    return G
+
+def export_graph_to_json(G, output_file="transaction_graph.json"):
+    """그래프를 JSON 파일로 내보내는 함수"""
+    return write_graph_data(graph_to_dict(G), output_file)
+
+def main(file_path, debug=True, cache_dir=DEFAULT_CACHE_DIR, instrumentation=None, label_registry=None):
+    """
+    트랜잭션 하나의 그래프를 만들어 HTML / JSON으로 저장
+    
+    cache_dir가 주어지면 로그 내용과 규칙 집합이 같은 경우 캐시된 결과를 재사용함 (None이면 캐시 사용 안 함)
+    instrumentation을 주면 단계별 시간 / 카운터를 기록함 (instrumentation.report()로 리포트 생성)
+    label_registry를 주면 프로토콜 규칙을 이벤트 주소의 라벨로 dispatch 함 (address_labels.load_address_labels)
+    """
+    instrumentation = instrumentation or NULL_INSTRUMENTATION
     if not os.path.exists(file_path):
         print(f"error: file '{file_path}' not found.")
         return None
     
     output_file = os.path.basename(file_path)
+    output_html = os.path.splitext(output_file)[0] + "_graph.html"
+    output_json = os.path.splitext(output_file)[0] + "_graph.json"
     
-    semantic_events_list = load_semantic_event()
+    with instrumentation.stage("load_rules"):
+        semantic_events_list = load_semantic_event()
     
-    data = load_transaction_data(file_path, debug)
-    if data:
-        # 그래프 생성 및 WETH 확인
-        G, contains_weth_address = build_transaction_graph(data, semantic_events_list, debug)
-        output_html = os.path.splitext(output_file)[0] + "_graph.html"
-        output_json = os.path.splitext(output_file)[0] + "_graph.json"
-        
-        visualize_graph(G, output_html, debug)
-        export_graph_to_json(G, output_json)
-        
-        return G
-    else:
-        print("warning: failed to load transaction data.")
+    cache = None
+    if cache_dir:
+        with instrumentation.stage("cache_lookup"):
+            cache = GraphCache(cache_dir)
+            cache_key = cache.key_for(file_path, rule_set_hash(semantic_events_list, label_registry))
+            restored = cache.restore(cache_key, output_json, output_html)
+        if restored is not None and restored["html"]:
+            instrumentation.count("cache_hits")
+            print(f"Cached graph restored to {output_html}, {output_json}")
+            with open(output_json, 'r', encoding='utf-8') as f:
+                return graph_from_dict(json.load(f))
+    
+    with instrumentation.stage("compile_rules"):
+        semantic_index = compile_semantic_index(semantic_events_list, label_registry)
+        sequence_matcher = compile_sequence_patterns(semantic_events_list)
+    
+    try:
+        # 그래프 생성 및 WETH 확인 (이벤트는 파일에서 스트리밍으로 읽음)
+        events = iter_transaction_events(file_path, debug)
+        G, contains_weth_address = build_transaction_graph(events, semantic_index, debug,
+                                                           sequence_matcher=sequence_matcher,
+                                                           instrumentation=instrumentation)
+    except Exception as e:
+        print(f"error: failed to build graph from '{file_path}': {e}")
+        traceback.print_exc()
         return None
+    
+    with instrumentation.stage("render"):
+        html_saved = visualize_graph(G, output_html, debug)
+    with instrumentation.stage("export"):
+        json_saved = export_graph_to_json(G, output_json)
+    
+    if cache is not None and json_saved:
+        with instrumentation.stage("cache_store"):
+            cache.put(cache_key, json_saved, html_saved)
+    
+    return G
 
 if __name__ == "__main__":
+    from instrumentation import Instrumentation
+    
     debug_mode = True
     file_path = "../decoded_logs/tx_0xb5c8bd9430b6cc87a0e2fe110ece6bf527fa4f170a4bc8cd032f768fc5219838.json"
-    G = main(file_path, debug_mode)
\ No newline at end of file
+    instrumentation = Instrumentation(os.path.basename(file_path), detailed=True)
+    G = main(file_path, debug_mode, instrumentation=instrumentation)
+    print(format_report(instrumentation.report()))
\ No newline at end of file
@@ -0,0 +1,461 @@
+"""
+SciPy 희소 행렬 기반 자금 흐름 분석
+
+트랜잭션 그래프(EdgeStore / nx.DiGraph / 내보낸 그래프 데이터)의 엣지를 정수 배열로 바꾸고
+토큰별 금액 가중 희소 인접 행렬(CSR)을 만들어 다음을 계산함.
+- 시간 순서(블록, event_index)를 지키는 자금 경로 추적 (flash loan 출처 -> 상환 등).
+  여러 트랜잭션에 걸친 추적은 모든 트랜잭션의 블록 번호가 있어야 함 (event_index는 블록 안의 로그 번호).
+  블록 번호가 없으면 트랜잭션 하나씩만 추적함
+- strongly connected component와 순환에 포함된 주소, 주소를 지나는 최단 순환
+- 두 주소 사이의 최대 유량 (토큰별)
+여러 트랜잭션을 모은 EdgeStore의 수백만 엣지도 NumPy / scipy.sparse.csgraph로 수 초 안에 처리함.
+
+실행 예:
+    python flow_analytics.py ../decoded_logs --cycles
+    python flow_analytics.py ../decoded_logs/tx_<hash>.json --trace dydx --to dydx
+    python flow_analytics.py ../decoded_logs --trace attacker --transaction tx_<hash>
+    python flow_analytics.py ../decoded_logs/tx_<hash>.json --max-flow dydx "bzx Fulcrum" --token WETH
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+# maximum_flow는 정수 용량만 받으므로 금액을 int32 범위로 스케일링
+_CAPACITY_LIMIT = np.iinfo(np.int32).max
+
+
+def _codes(values, codes, table):
+    """값 목록을 정수 코드 배열로 변환 (table / codes에 처음 등장한 순서대로 추가)"""
+    result = np.empty(len(values), dtype=np.int64)
+    for position, value in enumerate(values):
+        code = codes.get(value)
+        if code is None:
+            code = len(table)
+            codes[value] = code
+            table.append(value)
+        result[position] = code
+    return result
+
+
+class FlowGraph:
+    """
+    엣지를 컬럼 배열로 가진 자금 흐름 그래프
+
+    src / dst / token / event / transaction은 각각 addresses / tokens / events / transactions의 코드,
+    weight는 표시 단위 금액(float), event_index는 로그 번호(블록 안의 순서),
+    transaction_blocks는 transactions와 같은 순서의 블록 번호 (모르면 None)
+    """
+
+    def __init__(self, addresses, tokens, events, src, dst, token, event, event_index, weight, transaction=None,
+                 transactions=None, transaction_blocks=None):
+        self.addresses = list(addresses)
+        self.address_codes = {address: code for code, address in enumerate(self.addresses)}
+        self.tokens = list(tokens)
+        self.events = list(events)
+        self.transactions = list(transactions) if transactions is not None else [None]
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.token = np.asarray(token, dtype=np.int64)
+        self.event = np.asarray(event, dtype=np.int64)
+        self.event_index = np.asarray(event_index, dtype=np.int64)
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self.transaction = (np.asarray(transaction, dtype=np.int64) if transaction is not None
+                            else np.zeros(len(self.src), dtype=np.int64))
+        self.transaction_blocks = (list(transaction_blocks) if transaction_blocks is not None
+                                   else [None] * len(self.transactions))
+        self._time_order = None
+
+    def __len__(self):
+        return len(self.src)
+
+    @property
+    def node_count(self):
+        return len(self.addresses)
+
+    @classmethod
+    def from_records(cls, records):
+        """(from, to, event, token, weight, event_index) 튜플 목록에서 생성 (단일 트랜잭션)"""
+        records = list(records)
+        addresses, address_codes = [], {}
+        tokens, token_codes = [], {}
+        events, event_codes = [], {}
+        src = _codes([record[0] for record in records], address_codes, addresses)
+        dst = _codes([record[1] for record in records], address_codes, addresses)
+        event = _codes([record[2] for record in records], event_codes, events)
+        token = _codes([record[3] for record in records], token_codes, tokens)
+        weight = np.array([record[4] for record in records], dtype=np.float64)
+        event_index = np.array([record[5] for record in records], dtype=np.int64)
+        return cls(addresses, tokens, events, src, dst, token, event, event_index, weight)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """build_transaction_graph 결과(nx.DiGraph)에서 생성"""
+        return cls.from_records(
+            (source, target, attrs.get("event", ""), attrs.get("token", ""), attrs.get("weight", 0.0),
+             attrs.get("event_index", -1))
+            for source, target, attrs in G.edges(data=True))
+
+    @classmethod
+    def from_graph_data(cls, graph_data):
+        """graph_to_dict / graph_formats.read_graph_file 형식의 그래프 데이터에서 생성"""
+        def weight(edge):
+            raw_amount = edge.get("raw_amount")
+            if raw_amount:
+                return int(raw_amount) / 10 ** edge.get("decimals", 0)
+            return float(edge.get("amount") or 0)
+
+        return cls.from_records(
+            (edge["from"], edge["to"], edge.get("event", ""), edge.get("token", ""), weight(edge),
+             edge.get("event_index", -1))
+            for edge in graph_data["edges"])
+
+    @classmethod
+    def from_edge_store(cls, store, unique=True, blocks=None):
+        """
+        EdgeStore(여러 트랜잭션)의 컬럼에서 복사 없이 가까운 형태로 생성
+
+        unique=True이면 build_transaction_graph와 같이 (트랜잭션, source, target, event_index)가 같은 엣지는 한 번만 사용
+        토큰은 symbol 기준으로 묶음. blocks는 트랜잭션 -> 블록 번호 dict (여러 트랜잭션의 시간 순서 추적에 필요)
+        """
+        columns = store.columns()
+        rows = np.flatnonzero(store.unique_edge_mask()) if unique else np.arange(len(store))
+
+        weight = store.float_amounts()[rows]
+        token = columns["token"][rows]
+
+        symbols, symbol_codes = [], {}
+        token_symbol = _codes([symbol for symbol, _ in store.tokens.values], symbol_codes, symbols)
+        return cls(store.addresses.values, symbols, store.events.values, columns["src"][rows], columns["dst"][rows],
+                   token_symbol[token] if len(rows) else token, columns["event"][rows], columns["event_index"][rows],
+                   weight, columns["transaction"][rows], store.transactions.values,
+                   [(blocks or {}).get(transaction) for transaction in store.transactions.values])
+
+    def code(self, address):
+        """주소의 노드 코드 (없으면 KeyError)"""
+        try:
+            return self.address_codes[address]
+        except KeyError:
+            raise KeyError(f"address '{address}' is not in the graph") from None
+
+    def token_mask(self, token=None):
+        """token(symbol)의 엣지만 True인 마스크 (None이면 None)"""
+        if token is None:
+            return None
+        if token not in self.tokens:
+            return np.zeros(len(self), dtype=bool)
+        return self.token == self.tokens.index(token)
+
+    def edge(self, row):
+        """엣지 행 하나를 dict로 반환"""
+        return {
+            "from": self.addresses[self.src[row]],
+            "to": self.addresses[self.dst[row]],
+            "event": self.events[self.event[row]],
+            "token": self.tokens[self.token[row]],
+            "amount": float(self.weight[row]),
+            "event_index": int(self.event_index[row]),
+            "transaction": self.transactions[self.transaction[row]],
+        }
+
+    def adjacency(self, token=None, weighted=True):
+        """
+        노드 x 노드 CSR 인접 행렬 (같은 주소 쌍의 엣지는 합산)
+
+        token을 주면 해당 토큰 엣지만, weighted=False이면 금액 대신 엣지 수
+        """
+        mask = self.token_mask(token)
+        src, dst = (self.src, self.dst) if mask is None else (self.src[mask], self.dst[mask])
+        if weighted:
+            data = self.weight if mask is None else self.weight[mask]
+        else:
+            data = np.ones(len(src), dtype=np.float64)
+        size = self.node_count
+        return sparse.coo_matrix((data, (src, dst)), shape=(size, size)).tocsr()
+
+    def token_adjacency(self):
+        """토큰(symbol) -> 금액 가중 CSR 인접 행렬"""
+        return {token: self.adjacency(token) for token in self.tokens}
+
+    def strongly_connected_components(self, token=None):
+        """strongly connected component 목록 (주소 리스트, 큰 component부터)"""
+        count, labels = csgraph.connected_components(self.adjacency(token, weighted=False), directed=True,
+                                                     connection="strong")
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        components = [[self.addresses[code] for code in group.tolist()] for group in np.split(order, boundaries)]
+        components.sort(key=len, reverse=True)
+        return components
+
+    def cycle_components(self, token=None):
+        """순환에 포함된 주소들의 component 목록 (크기 2 이상 또는 self-loop가 있는 주소)"""
+        mask = self.token_mask(token)
+        src, dst = (self.src, self.dst) if mask is None else (self.src[mask], self.dst[mask])
+        self_loops = set(src[src == dst].tolist())
+        return [component for component in self.strongly_connected_components(token)
+                if len(component) > 1 or self.address_codes[component[0]] in self_loops]
+
+    def find_cycle(self, address, token=None):
+        """address에서 출발해서 돌아오는 최단 순환의 주소 목록 ([address, ..., address], 없으면 None)"""
+        start = self.code(address)
+        adjacency = self.adjacency(token, weighted=False)
+        predecessors_of_start = adjacency.getcol(start).nonzero()[0]
+        if len(predecessors_of_start) == 0:
+            return None
+        if adjacency[start, start]:
+            return [address, address]
+
+        order, predecessors = csgraph.breadth_first_order(adjacency, start, directed=True, return_predecessors=True)
+        # BFS 순서에서 가장 먼저 방문된 start의 선행 노드가 최단 순환을 만듦
+        rank = np.full(self.node_count, -1, dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        reached = predecessors_of_start[rank[predecessors_of_start] >= 0]
+        if len(reached) == 0:
+            return None
+        node = int(reached[np.argmin(rank[reached])])
+        path = [start]
+        while node != start:
+            path.append(node)
+            node = int(predecessors[node])
+        path.append(start)
+        return [self.addresses[code] for code in reversed(path)]
+
+    def time_order(self):
+        """
+        시간 순서로 정렬한 엣지 행 번호
+
+        모든 트랜잭션의 블록 번호가 있으면 (블록, event_index, 추가 순서) 순서이고,
+        없으면 (트랜잭션, event_index, 추가 순서) 순서라 트랜잭션 안에서만 시간 순서가 맞음 (파일을 읽은 순서는 시간이 아님)
+        """
+        if self._time_order is None:
+            if self.has_block_order():
+                blocks = np.array(self.transaction_blocks, dtype=np.int64)
+                self._time_order = np.lexsort((self.event_index, blocks[self.transaction]))
+            else:
+                self._time_order = np.lexsort((self.event_index, self.transaction))
+        return self._time_order
+
+    def has_block_order(self):
+        """모든 트랜잭션의 블록 번호가 있어서 트랜잭션 사이의 시간 순서를 알 수 있는지"""
+        return all(block is not None for block in self.transaction_blocks)
+
+    def trace_funds(self, source, target=None, token=None, transaction=None, start_index=None):
+        """
+        source에서 시간 순서를 지키며 자금이 도달할 수 있는 주소와 가장 이른 도달 시점을 계산
+
+        엣지는 (블록, event_index) 순서로 한 번만 훑고, 주소에 도달한 뒤(같은 event_index 포함)의 엣지만 따라감.
+        target을 주면 가장 이르게 도달하는 경로를 엣지 dict 목록으로 반환하고, target == source이면
+        source를 떠난 자금이 source로 처음 돌아오는 경로(flash loan 상환 등)를 찾음.
+        transaction으로 트랜잭션 하나만, start_index로 그 이후 이벤트만 사용할 수 있음.
+        여러 트랜잭션의 엣지를 쓰는데 블록 번호가 없는 트랜잭션이 있으면 ValueError
+
+        반환: {"reached": {주소: event_index}, "path": [엣지 dict] 또는 None}
+        """
+        start = self.code(source)
+        target_code = self.code(target) if target is not None else None
+
+        rows = self.time_order()
+        mask = self.token_mask(token)
+        if transaction is not None:
+            if transaction not in self.transactions:
+                return {"reached": {}, "path": None if target is not None else []}
+            transaction_mask = self.transaction == self.transactions.index(transaction)
+            mask = transaction_mask if mask is None else mask & transaction_mask
+        if mask is not None:
+            rows = rows[mask[rows]]
+        if start_index is not None:
+            rows = rows[self.event_index[rows] >= start_index]
+        if not self.has_block_order() and len(rows) and np.any(self.transaction[rows] != self.transaction[rows[0]]):
+            raise ValueError("tracing funds across transactions needs the block number of every transaction; "
+                             "pass transaction= to trace a single transaction")
+
+        # 트랜잭션이 여러 개여도 비교할 수 있도록 정렬된 (트랜잭션, event_index) 순위를 시간으로 사용
+        changed = (np.diff(self.transaction[rows]) != 0) | (np.diff(self.event_index[rows]) != 0)
+        group_starts = np.concatenate([np.zeros(min(len(rows), 1), dtype=np.int64), np.flatnonzero(changed) + 1])
+        group_ends = np.append(group_starts[1:], len(rows))
+        src_list = self.src[rows].tolist()
+        dst_list = self.dst[rows].tolist()
+
+        unreached = len(rows)
+        arrival = [unreached] * self.node_count
+        arrival[start] = -1
+        arrived_by = [-1] * self.node_count
+        return_position = -1
+        for time, (group_start, group_end) in enumerate(zip(group_starts.tolist(), group_ends.tolist())):
+            # 같은 시점(한 이벤트의 여러 transfer 등)의 엣지끼리는 순서와 무관하게 이어지도록 더 바뀌지 않을 때까지 반복
+            while True:
+                progress = False
+                for position in range(group_start, group_end):
+                    u = src_list[position]
+                    if arrival[u] > time:
+                        continue
+                    v = dst_list[position]
+                    if v == start:
+                        if return_position < 0 and u != start:
+                            return_position = position
+                    elif time < arrival[v]:
+                        arrival[v] = time
+                        arrived_by[v] = position
+                        progress = True
+                if not progress or group_end - group_start == 1:
+                    break
+
+        reached = {self.addresses[code]: int(self.event_index[rows[position]])
+                   for code, position in enumerate(arrived_by) if position >= 0}
+        if target_code is None:
+            return {"reached": reached, "path": None}
+
+        if target_code == start:
+            if return_position < 0:
+                return {"reached": reached, "path": None}
+            positions = [return_position]
+            node = src_list[return_position]
+        else:
+            if arrived_by[target_code] < 0:
+                return {"reached": reached, "path": None}
+            positions = []
+            node = target_code
+        while node != start:
+            position = arrived_by[node]
+            positions.append(position)
+            node = src_list[position]
+        return {"reached": reached, "path": [self.edge(rows[position]) for position in reversed(positions)]}
+
+    def max_flow(self, source, target, token):
+        """
+        token 엣지 금액을 용량으로 하는 source -> target 최대 유량 (시간 순서는 고려하지 않음)
+
+        반환: {"value": 최대 유량, "flows": [(from, to, 유량)] (큰 순서)}
+        """
+        start, sink = self.code(source), self.code(target)
+        if start == sink:
+            raise ValueError("source and target must be different addresses")
+        capacity = self.adjacency(token)
+        capacity.setdiag(0)
+        capacity.eliminate_zeros()
+        if capacity.nnz == 0:
+            return {"value": 0.0, "flows": []}
+
+        # 최대 유량과 엣지마다의 유량은 source의 유출 합을 넘지 않으므로 용량을 그 값으로 자른 뒤 int32로 스케일링
+        # (다른 주소 사이의 아주 큰 엣지 때문에 스케일이 작아져 실제 경로의 용량이 0으로 잘리지 않도록)
+        bound = capacity.getrow(start).sum()
+        if bound <= 0:
+            return {"value": 0.0, "flows": []}
+        scale = _CAPACITY_LIMIT / bound
+        scaled = capacity.copy()
+        scaled.data = np.floor(np.minimum(scaled.data, bound) * scale).astype(np.int32)
+        scaled.eliminate_zeros()
+        result = csgraph.maximum_flow(scaled, start, sink)
+
+        flow = result.flow.tocoo()
+        positive = flow.data > 0
+        flows = sorted(((self.addresses[u], self.addresses[v], value / scale) for u, v, value in
+                        zip(flow.row[positive].tolist(), flow.col[positive].tolist(), flow.data[positive].tolist())),
+                       key=lambda item: item[2], reverse=True)
+        return {"value": result.flow_value / scale, "flows": flows}
+
+
+def read_block_number(file_path):
+    """
+    디코딩 된 트랜잭션 파일의 blockNumber (log_decoder.decode_logs 출력에 있음, 없거나 .jsonl이면 None)
+
+    TypeScript 디코더 출력의 timestamp는 디코딩 시각이므로 순서 키로 쓰지 않음
+    """
+    if file_path.endswith(".jsonl"):
+        return None
+    from extract_semantic import block_number
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return block_number(json.load(f).get("blockNumber"))
+
+
+def load_flow_graph(paths, rules_dir=None, blocks=None):
+    """
+    디코딩 된 트랜잭션 파일들의 엣지를 한 EdgeStore에 모아서 FlowGraph 생성 (트랜잭션은 파일 이름으로 구분)
+
+    blocks는 파일 이름(tx_<hash>) -> 블록 번호 dict. 여러 트랜잭션의 시간 순서 추적에 필요 (read_block_number 참고)
+    """
+    from edge_store import build_edge_store
+    from extract_semantic import compile_semantic_index, iter_transaction_events, load_semantic_event
+
+    semantic_index = compile_semantic_index(load_semantic_event(rules_dir or os.path.dirname(os.path.abspath(__file__))))
+    store = None
+    for file_path in paths:
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        store = build_edge_store(iter_transaction_events(file_path), semantic_index, store, name)
+    if store is None:
+        return FlowGraph.from_records([])
+    return FlowGraph.from_edge_store(store, blocks=blocks)
+
+
+def print_path(path):
+    for edge in path:
+        print(f"  #{edge['event_index']} {edge['event']}: {edge['from']} -> {edge['to']} "
+              f"({edge['amount']:.6g} {edge['token']})")
+
+
+def main():
+    from batch_semantic import collect_transaction_files
+
+    parser = argparse.ArgumentParser(description="Trace fund flows, cycles and max flows in semantic graphs")
+    parser.add_argument("target", help="decoded log file, directory of decoded logs (tx_*.json) or a glob pattern")
+    parser.add_argument("--rules-dir", default=None, help="directory of semantic rule JSON files")
+    parser.add_argument("--token", default=None, help="only use edges of this token symbol")
+    parser.add_argument("--cycles", action="store_true", help="list addresses that sit on a cycle")
+    parser.add_argument("--trace", default=None, metavar="ADDRESS", help="trace funds from this address in event order")
+    parser.add_argument("--to", default=None, metavar="ADDRESS", help="print the earliest path to this address")
+    parser.add_argument("--transaction", default=None, metavar="NAME",
+                        help="trace within this transaction only (file name, e.g. tx_<hash>)")
+    parser.add_argument("--max-flow", nargs=2, default=None, metavar=("SOURCE", "SINK"),
+                        help="maximum flow of --token between two addresses")
+    args = parser.parse_args()
+
+    files = [args.target] if os.path.isfile(args.target) else collect_transaction_files(args.target)
+    blocks = None
+    if args.trace and not args.transaction and len(files) > 1:
+        # 여러 트랜잭션을 시간 순서로 추적하려면 블록 번호가 필요 (파일 순서는 시간 순서가 아님)
+        blocks = {os.path.splitext(os.path.basename(file_path))[0]: read_block_number(file_path) for file_path in files}
+        missing = [name for name, block in blocks.items() if block is None]
+        if missing:
+            parser.error(f"--trace over {len(files)} transactions needs blockNumber in every decoded file "
+                         f"(missing in {missing[0]}{' and others' if len(missing) > 1 else ''}); "
+                         f"pass --transaction to trace one transaction")
+    flow_graph = load_flow_graph(files, args.rules_dir, blocks)
+    print(f"Flow graph: {len(files)} transactions, {flow_graph.node_count} addresses, {len(flow_graph)} edges")
+
+    if args.cycles or not (args.trace or args.max_flow):
+        components = flow_graph.cycle_components(args.token)
+        print(f"{len(components)} cyclic components")
+        for component in components:
+            cycle = flow_graph.find_cycle(component[0], args.token)
+            print(f"  {len(component)} addresses: {', '.join(component[:10])}" + (" ..." if len(component) > 10 else ""))
+            if cycle:
+                print(f"    e.g. {' -> '.join(cycle)}")
+
+    if args.trace:
+        result = flow_graph.trace_funds(args.trace, args.to, args.token, args.transaction)
+        print(f"Funds from {args.trace} reach {len(result['reached'])} addresses")
+        if args.to:
+            if result["path"]:
+                print(f"Earliest path to {args.to}:")
+                print_path(result["path"])
+            else:
+                print(f"No time-ordered path to {args.to}")
+        else:
+            for address, event_index in sorted(result["reached"].items(), key=lambda item: item[1]):
+                print(f"  #{event_index} {address}")
+
+    if args.max_flow:
+        if not args.token:
+            parser.error("--max-flow needs --token")
+        result = flow_graph.max_flow(args.max_flow[0], args.max_flow[1], args.token)
+        print(f"Max {args.token} flow {args.max_flow[0]} -> {args.max_flow[1]}: {result['value']:.6g}")
+        for source, target, value in result["flows"][:20]:
+            print(f"  {source} -> {target}: {value:.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+빌드된 그래프의 content-addressed 디스크 캐시
+
+키는 디코딩 된 로그 파일 내용의 해시 + semantic 규칙 집합의 해시로 만들기 때문에
+로그나 규칙 JSON이 바뀌지 않았다면 그래프 빌드와 HTML 렌더링을 건너뛸 수 있음.
+캐시 디렉토리 전체 크기가 상한을 넘으면 가장 오래 사용되지 않은 항목부터 삭제함 (mtime 기준 LRU).
+batch 워커 여러 개가 같은 디렉토리를 공유하므로 크기는 프로세스별 누적값이 아니라 디렉토리를 다시 스캔해서 판단함.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from graph_formats import DEFAULT_GRAPH_FORMAT, graph_format_from_path, graph_output_suffix, read_graph_file
+
+# 그래프 / 내보내기 형식이 바뀌면 올려서 기존 캐시를 무효화
+CACHE_FORMAT_VERSION = 5
+DEFAULT_CACHE_DIR = ".graph_cache"
+DEFAULT_MAX_CACHE_BYTES = 512 * 1024 * 1024
+_HASH_CHUNK_SIZE = 1 << 20
+# 이 프로세스가 max_bytes의 1/N 이상 쓰면 디렉토리를 다시 스캔해서 전체 크기 확인
+# (다른 워커가 쓴 양은 스캔해야 알 수 있으므로 워커 W개일 때 초과량은 최대 W * max_bytes / N)
+RESCAN_FRACTION = 16
+# 캐시 파일 이름의 항목 구분 접미사 (<key>_graph.<ext>, <key>_edges.json)
+_ENTRY_TAGS = ("_graph", "_edges")
+
+
+def _entry_key(file_name):
+    """캐시 파일 이름 -> 항목 key (이전 버전의 <key>.json / <key>.html 포함)"""
+    stem = file_name.split(".", 1)[0]
+    for tag in _ENTRY_TAGS:
+        if stem.endswith(tag):
+            return stem[:-len(tag)]
+    return stem
+
+
+def file_content_hash(file_path):
+    """파일 내용의 sha256 (청크 단위로 읽음)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rule_set_hash(semantic_events_list, label_registry=None):
+    """
+    load_semantic_event 결과(규칙 JSON 목록)의 해시. 파일 로드 순서와 무관함
+
+    label_registry(address_labels.AddressLabelRegistry)를 주면 라벨 dispatch 결과가 달라지므로 레지스트리 내용도 포함
+    """
+    canonical = sorted(json.dumps(semantic_event, sort_keys=True, ensure_ascii=False)
+                       for semantic_event in semantic_events_list)
+    digest = hashlib.sha256(f"v{CACHE_FORMAT_VERSION}".encode())
+    for text in canonical:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    if label_registry is not None:
+        digest.update(f"labels:{label_registry.fingerprint()}".encode())
+    return digest.hexdigest()
+
+
+class GraphCache:
+    """
+    <key><graph_output_suffix> (내보낸 그래프) / <key>_graph.html (렌더링 결과) 형태로 저장하는 LRU 디스크 캐시
+
+    내보낸 그래프가 json 외의 형식이면 key_for의 variant로 구분하고 파일 내용은 그 형식 그대로,
+    형식의 확장자(_graph.jsonl, _graph.arrow 등)로 저장함
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = self._scan()[1]
+        # 마지막 스캔 이후 이 프로세스가 쓴 바이트 수
+        self._written_since_scan = 0
+
+    def key_for(self, file_path, rules_hash, variant=None):
+        """variant는 같은 입력의 다른 출력(예: 그래프 내보내기 형식)을 구분할 때 사용"""
+        key = f"{file_content_hash(file_path)[:32]}_{rules_hash[:16]}"
+        return f"{key}_{variant}" if variant else key
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, key, graph_format=DEFAULT_GRAPH_FORMAT):
+        """
+        캐시 항목의 파일 경로 반환 ({"json": 그래프 파일 경로, "html": 경로 또는 None}, 없으면 None)
+        
+        "json" 키는 이전 API와 같은 이름이며 graph_format 형식의 파일을 가리킴. 조회 시 LRU 순서를 갱신함
+        """
+        graph_path = self._path(key, graph_output_suffix(graph_format))
+        if not os.path.exists(graph_path):
+            return None
+        html_path = self._path(key, "_graph.html")
+        self._touch(key, graph_format)
+        return {"json": graph_path, "html": html_path if os.path.exists(html_path) else None}
+
+    def load_graph_data(self, key, graph_format=DEFAULT_GRAPH_FORMAT):
+        """캐시된 그래프를 graph_to_dict 형식으로 로드 (없거나 손상된 경우 None)"""
+        entry = self.get(key, graph_format)
+        if entry is None:
+            return None
+        try:
+            return read_graph_file(entry["json"])
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, graph_file, html_file=None, graph_format=None):
+        """
+        내보낸 그래프 파일과 (있다면) 렌더링된 HTML 파일을 그대로 캐시에 복사
+
+        graph_format이 없으면 graph_file의 확장자로 추정 (.json은 json)
+        """
+        graph_format = graph_format or graph_format_from_path(graph_file)
+        self._copy_atomic(graph_file, self._path(key, graph_output_suffix(graph_format)))
+        if html_file and os.path.exists(html_file):
+            self._copy_atomic(html_file, self._path(key, "_graph.html"))
+        self.evict()
+
+    def restore(self, key, graph_output, html_output=None, graph_format=None):
+        """
+        캐시된 파일을 출력 경로로 복사
+        
+        그래프 파일은 항상, HTML은 html_output이 주어지고 캐시에 있을 때만 복사함.
+        반환값은 {"json": 경로, "html": 경로 또는 None}, 캐시 미스면 None
+        """
+        entry = self.get(key, graph_format or graph_format_from_path(graph_output))
+        if entry is None:
+            return None
+        shutil.copyfile(entry["json"], graph_output)
+        restored = {"json": graph_output, "html": None}
+        if html_output and entry["html"]:
+            shutil.copyfile(entry["html"], html_output)
+            restored["html"] = html_output
+        return restored
+
+    def put_transfers(self, key, records, block=None):
+        """GraphStore에 저장할 개별 transfer 목록(transfer_records)과 블록 번호를 <key>_edges.json으로 저장"""
+        data = json.dumps({"block": block, "transfers": records}, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+        self._write_atomic(self._path(key, "_edges.json"), lambda dst: dst.write(data))
+        self.evict()
+
+    def load_transfers(self, key):
+        """put_transfers로 저장한 (transfer 목록, 블록 번호) (없거나 손상된 경우 None)"""
+        try:
+            with open(self._path(key, "_edges.json"), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data["transfers"], data["block"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _touch(self, key, graph_format=DEFAULT_GRAPH_FORMAT):
+        for suffix in (graph_output_suffix(graph_format), "_graph.html", "_edges.json"):
+            try:
+                os.utime(self._path(key, suffix))
+            except OSError:
+                pass
+
+    def _copy_atomic(self, source, path):
+        def copy(dst):
+            with open(source, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+        self._write_atomic(path, copy)
+
+    def _write_atomic(self, path, write):
+        """임시 파일에 write(파일 객체)로 쓴 뒤 교체하고 크기 변화를 기록"""
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                write(dst)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size_change = os.path.getsize(path) - previous_size
+        self._total_bytes += size_change
+        self._written_since_scan += max(size_change, 0)
+
+    def _scan(self):
+        """디렉토리의 항목별 (마지막 사용 시각, 크기, 파일 경로 목록)과 전체 크기"""
+        entries = {}
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:
+                # 다른 프로세스가 스캔 중에 삭제한 경우
+                continue
+            total += stat.st_size
+            key = _entry_key(entry.name)
+            last_used, size, paths = entries.get(key, (0, 0, []))
+            paths.append(entry.path)
+            entries[key] = (max(last_used, stat.st_mtime), size + stat.st_size, paths)
+        return entries, total
+
+    def evict(self):
+        """
+        전체 크기가 max_bytes 이하가 될 때까지 가장 오래 사용되지 않은 항목 삭제
+
+        삭제 여부는 디렉토리를 다시 스캔한 크기로 판단함 (다른 워커 프로세스가 쓴 항목 포함).
+        스캔 비용을 줄이기 위해 이 프로세스 기준으로도 상한 이하이고 마지막 스캔 이후 쓴 양이 적으면 건너뜀
+        """
+        if (self._total_bytes <= self.max_bytes
+                and self._written_since_scan < self.max_bytes // RESCAN_FRACTION):
+            return
+
+        entries, total = self._scan()
+        self._written_since_scan = 0
+
+        for key, (_, size, paths) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # 다른 프로세스가 먼저 삭제한 경우
+                    pass
+            total -= size
+
+        self._total_bytes = total
@@ -0,0 +1,349 @@
+"""
+그래프 내보내기 형식 (json / compact / jsonl / arrow)
+
+- json: 기존 graph_to_dict 형식 (indent=2, 노드 / 엣지마다 title / amount 문자열 포함)
+- compact: 들여쓰기 없는 JSON. 주소 / 이벤트 이름 / 토큰을 한 번만 저장하고(interning) 엣지는 컬럼 배열로 저장.
+  title, amount, size처럼 volume / raw_amount / decimals에서 다시 계산할 수 있는 값은 저장하지 않음
+- jsonl: 한 줄에 레코드 하나인 JSON-Lines 스트림 (graph 헤더 -> node -> edge 순서, 파생 값 없음)
+- arrow: Arrow IPC 파일. 엣지는 컬럼(from / to는 주소 테이블 인덱스, event / token은 dictionary 인코딩)으로,
+  주소 테이블 / volume / layout 등은 스키마 메타데이터로 저장. 압축하지 않으므로 memory map으로 바로 읽을 수 있음
+
+read_graph_file은 형식에 관계없이 graph_to_dict와 같은 dict를 반환하므로 graph_from_dict 등 기존 코드를 그대로 사용 가능.
+orjson / pyarrow는 선택 의존성 (orjson이 없으면 json 모듈 사용, arrow 형식만 pyarrow 필요)
+"""
+import json
+
+from amounts import format_raw_amount
+
+GRAPH_FORMATS = ("json", "compact", "jsonl", "arrow")
+DEFAULT_GRAPH_FORMAT = "json"
+GRAPH_FORMAT_VERSION = 1
+
+# 형식별 출력 파일 접미사 (compact도 JSON이라 같은 확장자, 내용의 "format" 키로 구분)
+GRAPH_FORMAT_SUFFIXES = {
+    "json": "_graph.json",
+    "compact": "_graph.json",
+    "jsonl": "_graph.jsonl",
+    "arrow": "_graph.arrow",
+}
+
+# 노드 / 엣지 외에 그대로 보관하는 그래프 속성
+GRAPH_EXTRA_KEYS = ("layout", "patterns", "balance_deltas")
+
+# Arrow 스키마 메타데이터 키
+ARROW_METADATA_KEY = b"semantic_graph"
+
+_EDGE_COLUMNS = ("from", "to", "event", "token", "raw_amount", "decimals", "event_index")
+
+
+def _dumps(value):
+    """JSON 직렬화 (bytes). orjson이 있으면 사용"""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(value)
+
+
+def _loads(data):
+    try:
+        import orjson
+    except ImportError:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def _load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ImportError("the 'arrow' graph format requires pyarrow (use 'compact' or 'jsonl' instead)") from None
+    return pyarrow
+
+
+def graph_output_suffix(graph_format=DEFAULT_GRAPH_FORMAT):
+    """형식별 출력 파일 접미사 (tx_<hash> 뒤에 붙임)"""
+    if graph_format not in GRAPH_FORMAT_SUFFIXES:
+        raise ValueError(f"unknown graph format '{graph_format}' (expected one of {', '.join(GRAPH_FORMATS)})")
+    return GRAPH_FORMAT_SUFFIXES[graph_format]
+
+
+def graph_format_from_path(file_path):
+    """확장자로 형식 추정 (.json은 내용을 읽을 때 json / compact를 구분)"""
+    if file_path.endswith(".jsonl"):
+        return "jsonl"
+    if file_path.endswith(".arrow"):
+        return "arrow"
+    return "json"
+
+
+# --- 직렬화 ---
+
+def compact_graph_data(graph_data):
+    """graph_to_dict 형식을 compact 형식 dict로 변환 (주소 / 이벤트 / 토큰 interning, 엣지는 컬럼 배열)"""
+    nodes = graph_data.get("nodes", [])
+    address_ids = {}
+    for node in nodes:
+        address_ids.setdefault(node["id"], len(address_ids))
+    event_ids = {}
+    token_ids = {}
+    columns = {name: [] for name in _EDGE_COLUMNS}
+    edge_patterns = {}
+
+    for position, edge in enumerate(graph_data.get("edges", [])):
+        columns["from"].append(address_ids.setdefault(edge["from"], len(address_ids)))
+        columns["to"].append(address_ids.setdefault(edge["to"], len(address_ids)))
+        columns["event"].append(event_ids.setdefault(edge.get("event", ""), len(event_ids)))
+        columns["token"].append(token_ids.setdefault(edge.get("token", ""), len(token_ids)))
+        columns["raw_amount"].append(str(edge.get("raw_amount", "")))
+        columns["decimals"].append(edge.get("decimals", 0))
+        columns["event_index"].append(edge.get("event_index", -1))
+        if edge.get("patterns"):
+            edge_patterns[str(position)] = edge["patterns"]
+
+    compact = {
+        "format": "compact",
+        "version": GRAPH_FORMAT_VERSION,
+        # 앞의 node_count개 주소가 노드 (엣지에만 나오는 주소는 뒤에 추가됨)
+        "node_count": len(nodes),
+        "addresses": list(address_ids),
+        "volumes": [node.get("volume", 0) for node in nodes],
+        "events": list(event_ids),
+        "tokens": list(token_ids),
+        "edges": columns,
+    }
+    if edge_patterns:
+        compact["edge_patterns"] = edge_patterns
+    for key in GRAPH_EXTRA_KEYS:
+        if key in graph_data:
+            compact[key] = graph_data[key]
+    return compact
+
+
+def iter_graph_jsonl_records(graph_data):
+    """graph_to_dict 형식을 jsonl 레코드(dict)로 하나씩 변환 (graph 헤더, node, edge 순서)"""
+    header = {"type": "graph", "format": "jsonl", "version": GRAPH_FORMAT_VERSION}
+    for key in GRAPH_EXTRA_KEYS:
+        if key in graph_data:
+            header[key] = graph_data[key]
+    yield header
+    for node in graph_data.get("nodes", []):
+        yield {"type": "node", "id": node["id"], "volume": node.get("volume", 0)}
+    for edge in graph_data.get("edges", []):
+        record = {"type": "edge", "from": edge["from"], "to": edge["to"], "event": edge.get("event", ""),
+                  "token": edge.get("token", ""), "raw_amount": str(edge.get("raw_amount", "")),
+                  "decimals": edge.get("decimals", 0), "event_index": edge.get("event_index", -1)}
+        if edge.get("patterns"):
+            record["patterns"] = edge["patterns"]
+        yield record
+
+
+def graph_data_to_arrow_table(graph_data):
+    """graph_to_dict 형식을 Arrow 테이블로 변환 (엣지 컬럼 + 주소 테이블 등은 스키마 메타데이터)"""
+    pa = _load_pyarrow()
+    compact = compact_graph_data(graph_data)
+    columns = compact.pop("edges")
+    edge_patterns = compact.pop("edge_patterns", {})
+    events = compact.pop("events")
+    tokens = compact.pop("tokens")
+    compact["format"] = "arrow"
+
+    patterns = [None] * len(columns["from"])
+    for position, names in edge_patterns.items():
+        patterns[int(position)] = names
+
+    table = pa.table({
+        "from": pa.array(columns["from"], pa.int32()),
+        "to": pa.array(columns["to"], pa.int32()),
+        "event": pa.DictionaryArray.from_arrays(pa.array(columns["event"], pa.int32()), pa.array(events, pa.string())),
+        "token": pa.DictionaryArray.from_arrays(pa.array(columns["token"], pa.int32()), pa.array(tokens, pa.string())),
+        # uint256 원시값은 64bit 정수에 들어가지 않으므로 10진수 문자열로 저장
+        "raw_amount": pa.array(columns["raw_amount"], pa.string()),
+        "decimals": pa.array(columns["decimals"], pa.int16()),
+        "event_index": pa.array(columns["event_index"], pa.int64()),
+        "patterns": pa.array(patterns, pa.list_(pa.string())),
+    })
+    return table.replace_schema_metadata({ARROW_METADATA_KEY: _dumps(compact)})
+
+
+def serialize_graph_data(graph_data, graph_format=DEFAULT_GRAPH_FORMAT):
+    """graph_to_dict 형식의 데이터를 형식에 맞는 bytes로 직렬화"""
+    if graph_format == "json":
+        return json.dumps(graph_data, indent=2, ensure_ascii=False).encode("utf-8")
+    if graph_format == "compact":
+        return _dumps(compact_graph_data(graph_data))
+    if graph_format == "jsonl":
+        return b"".join(_dumps(record) + b"\n" for record in iter_graph_jsonl_records(graph_data))
+    if graph_format == "arrow":
+        pa = _load_pyarrow()
+        table = graph_data_to_arrow_table(graph_data)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"unknown graph format '{graph_format}' (expected one of {', '.join(GRAPH_FORMATS)})")
+
+
+def write_graph_file(graph_data, output_file, graph_format=None):
+    """
+    graph_to_dict 형식의 데이터를 파일로 저장 (graph_format이 None이면 확장자로 결정, .json은 기존 json 형식)
+
+    실패하면 None 반환 (write_graph_data와 같음)
+    """
+    graph_format = graph_format or graph_format_from_path(output_file)
+    try:
+        data = serialize_graph_data(graph_data, graph_format)
+        with open(output_file, 'wb') as f:
+            f.write(data)
+        print(f"Graph data exported to {output_file}")
+        return output_file
+    except Exception as e:
+        print(f"{graph_format} export error: {e}")
+        return None
+
+
+# --- 읽기 ---
+
+def expand_compact_graph_data(compact):
+    """compact 형식을 graph_to_dict 형식으로 복원 (title / amount / size는 다시 계산)"""
+    from extract_semantic import edge_title, node_attributes, node_record
+
+    addresses = compact["addresses"]
+    node_count = compact.get("node_count", len(compact["volumes"]))
+    graph_data = {
+        "nodes": [node_record(address, node_attributes(address, volume))
+                  for address, volume in zip(addresses[:node_count], compact["volumes"])],
+        "edges": [],
+    }
+    events = compact["events"]
+    tokens = compact["tokens"]
+    columns = compact["edges"]
+    edge_patterns = compact.get("edge_patterns", {})
+    for position, (source, target, event, token, raw_amount, decimals, event_index) in enumerate(
+            zip(*(columns[name] for name in _EDGE_COLUMNS))):
+        patterns = edge_patterns.get(str(position))
+        graph_data["edges"].append(_expand_edge(addresses[source], addresses[target], events[event], tokens[token],
+                                                raw_amount, decimals, event_index, patterns, edge_title))
+    for key in GRAPH_EXTRA_KEYS:
+        if key in compact:
+            graph_data[key] = compact[key]
+    return graph_data
+
+
+def _expand_edge(source, target, event, token, raw_amount, decimals, event_index, patterns, edge_title):
+    """edge_record와 같은 레코드 생성 (amount / title을 raw_amount, decimals로 다시 계산)"""
+    if raw_amount != "":
+        amount = format_raw_amount(raw_amount, decimals)
+        title = edge_title(event, amount, token)
+    else:
+        amount, title = 0, ""
+    record = {
+        "from": source,
+        "to": target,
+        "event": event,
+        "token": token,
+        "amount": amount,
+        "raw_amount": raw_amount,
+        "decimals": decimals,
+        "event_index": event_index,
+        "title": title
+    }
+    if patterns:
+        record["patterns"] = patterns
+    return record
+
+
+def iter_graph_jsonl(file_path):
+    """jsonl 그래프 파일의 레코드(graph / node / edge)를 하나씩 읽음 (파생 값은 복원하지 않음)"""
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
+
+
+def read_graph_jsonl(file_path):
+    """jsonl 그래프 파일을 graph_to_dict 형식으로 읽음"""
+    return graph_data_from_jsonl_records(iter_graph_jsonl(file_path))
+
+
+def graph_data_from_jsonl_records(records):
+    """jsonl 레코드(graph / node / edge)들을 graph_to_dict 형식으로 복원 (title / amount / size는 다시 계산)"""
+    from extract_semantic import edge_title, node_attributes, node_record
+
+    graph_data = {"nodes": [], "edges": []}
+    for record in records:
+        record_type = record.get("type")
+        if record_type == "node":
+            graph_data["nodes"].append(node_record(record["id"], node_attributes(record["id"], record["volume"])))
+        elif record_type == "edge":
+            graph_data["edges"].append(_expand_edge(
+                record["from"], record["to"], record["event"], record["token"], record["raw_amount"],
+                record["decimals"], record["event_index"], record.get("patterns"), edge_title))
+        elif record_type == "graph":
+            for key in GRAPH_EXTRA_KEYS:
+                if key in record:
+                    graph_data[key] = record[key]
+    return graph_data
+
+
+def read_graph_arrow(file_path, memory_map=True):
+    """
+    arrow 그래프 파일을 Arrow 테이블로 읽음 (memory_map=True이면 파일을 복사하지 않고 mmap으로 참조)
+
+    주소 테이블 등은 arrow_graph_metadata(table)로 꺼냄
+    """
+    pa = _load_pyarrow()
+    source = pa.memory_map(file_path, 'r') if memory_map else pa.OSFile(file_path, 'rb')
+    return pa.ipc.open_file(source).read_all()
+
+
+def arrow_graph_metadata(table):
+    """Arrow 테이블의 그래프 메타데이터 (addresses, volumes, node_count, layout 등)"""
+    return _loads(table.schema.metadata[ARROW_METADATA_KEY])
+
+
+def arrow_table_to_graph_data(table):
+    """read_graph_arrow 결과를 graph_to_dict 형식으로 변환"""
+    compact = arrow_graph_metadata(table)
+    event_column = table.column("event").combine_chunks()
+    token_column = table.column("token").combine_chunks()
+    compact["events"] = event_column.dictionary.to_pylist()
+    compact["tokens"] = token_column.dictionary.to_pylist()
+    compact["edges"] = {
+        "from": table.column("from").to_pylist(),
+        "to": table.column("to").to_pylist(),
+        "event": event_column.indices.to_pylist(),
+        "token": token_column.indices.to_pylist(),
+        "raw_amount": table.column("raw_amount").to_pylist(),
+        "decimals": table.column("decimals").to_pylist(),
+        "event_index": table.column("event_index").to_pylist(),
+    }
+    compact["edge_patterns"] = {str(position): names
+                                for position, names in enumerate(table.column("patterns").to_pylist()) if names}
+    return expand_compact_graph_data(compact)
+
+
+def read_graph_file(file_path):
+    """형식에 관계없이 그래프 파일을 graph_to_dict 형식으로 읽음"""
+    graph_format = graph_format_from_path(file_path)
+    if graph_format == "jsonl":
+        return read_graph_jsonl(file_path)
+    if graph_format == "arrow":
+        return arrow_table_to_graph_data(read_graph_arrow(file_path))
+    with open(file_path, 'rb') as f:
+        return deserialize_graph_data(f.read(), "json")
+
+
+def deserialize_graph_data(data, graph_format=DEFAULT_GRAPH_FORMAT):
+    """serialize_graph_data 결과(bytes)를 graph_to_dict 형식으로 복원"""
+    if graph_format == "arrow":
+        pa = _load_pyarrow()
+        return arrow_table_to_graph_data(pa.ipc.open_file(pa.BufferReader(data)).read_all())
+    if graph_format == "jsonl":
+        return graph_data_from_jsonl_records(_loads(line) for line in data.splitlines() if line.strip())
+    graph_data = _loads(data)
+    # json / compact는 내용의 "format" 키로 구분
+    if graph_data.get("format") == "compact":
+        return expand_compact_graph_data(graph_data)
+    return graph_data
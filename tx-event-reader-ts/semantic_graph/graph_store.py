@@ -0,0 +1,328 @@
+"""
+여러 트랜잭션의 transfer 엣지를 모아두는 SQLite 저장소
+
+collect_transaction_graph가 만든 개별 transfer(transfer_records)를 트랜잭션 단위로 추가하고, 주소 / 토큰 / 이벤트 / 블록 인덱스로
+"주소 X와 관련된 모든 흐름", "attacker contract의 주요 상대 주소" 같은 질의를 JSON 파일을 다시 읽지 않고 처리함.
+주소는 정수 ID로 intern 해서 저장하고, uint256 원시 금액은 정확도를 위해 문자열로 저장함
+(정렬 / 순위용 근사값은 amount 컬럼에 float로 따로 저장).
+
+사용 예:
+    with GraphStore("graphs.db") as store:
+        store.add_edge_records(transfer_records(collect_transaction_graph(events, semantic_index)), tx_hash,
+                               block=9484688)
+        store.flows("attacker contract", token="WETH")
+"""
+import sqlite3
+from contextlib import contextmanager, nullcontext
+
+from amounts import Amount, amount_to_float, format_amount
+
+DEFAULT_STORE_PATH = "graphs.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    block INTEGER,
+    timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS addresses (
+    id INTEGER PRIMARY KEY,
+    address TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS edges (
+    id INTEGER PRIMARY KEY,
+    tx_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    src_id INTEGER NOT NULL REFERENCES addresses(id),
+    dst_id INTEGER NOT NULL REFERENCES addresses(id),
+    event TEXT NOT NULL,
+    token TEXT NOT NULL,
+    raw_amount TEXT NOT NULL,
+    decimals INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    event_index INTEGER NOT NULL,
+    block INTEGER
+);
+CREATE INDEX IF NOT EXISTS edges_src ON edges(src_id, token);
+CREATE INDEX IF NOT EXISTS edges_dst ON edges(dst_id, token);
+CREATE INDEX IF NOT EXISTS edges_token ON edges(token);
+CREATE INDEX IF NOT EXISTS edges_event ON edges(event);
+CREATE INDEX IF NOT EXISTS edges_block ON edges(block);
+CREATE INDEX IF NOT EXISTS edges_tx ON edges(tx_id);
+"""
+
+_EDGE_COLUMNS = """
+    t.hash, t.block, s.address, d.address, e.event, e.token, e.raw_amount, e.decimals, e.amount, e.event_index
+"""
+
+
+def _edge_row_record(row):
+    transaction, block, source, target, event, token, raw_amount, decimals, amount, event_index = row
+    return {
+        "transaction": transaction,
+        "block": block,
+        "from": source,
+        "to": target,
+        "event": event,
+        "token": token,
+        "amount": format_amount(Amount(int(raw_amount), decimals, token)),
+        "raw_amount": raw_amount,
+        "decimals": decimals,
+        "weight": amount,
+        "event_index": event_index,
+    }
+
+
+class GraphStore:
+    """트랜잭션별 transfer 엣지를 누적하는 SQLite 저장소"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        # 대량 추가 시 쓰기 성능을 위해 WAL 사용 (읽기는 쓰기와 동시에 가능)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self._address_ids = {}
+        self._bulk_depth = 0
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def bulk(self):
+        """
+        블록 안의 add_edges / add_graph를 하나의 SQLite 트랜잭션으로 묶음
+
+        트랜잭션마다 commit 하는 비용이 추가 시간의 대부분이므로 여러 그래프를 한 번에 저장할 때 사용
+        """
+        if self._bulk_depth:
+            self._bulk_depth += 1
+            try:
+                yield self
+            finally:
+                self._bulk_depth -= 1
+            return
+
+        self._bulk_depth = 1
+        try:
+            with self._transaction():
+                yield self
+        finally:
+            self._bulk_depth = 0
+
+    @contextmanager
+    def _transaction(self):
+        try:
+            with self.connection:
+                yield
+        except BaseException:
+            # rollback 된 주소 ID가 캐시에 남지 않도록 비움
+            self._address_ids.clear()
+            raise
+
+    def _write(self):
+        return nullcontext() if self._bulk_depth else self._transaction()
+
+    def _address_id(self, address):
+        address = str(address)
+        address_id = self._address_ids.get(address)
+        if address_id is None:
+            self.connection.execute("INSERT OR IGNORE INTO addresses(address) VALUES (?)", (address,))
+            address_id = self.connection.execute(
+                "SELECT id FROM addresses WHERE address = ?", (address,)).fetchone()[0]
+            self._address_ids[address] = address_id
+        return address_id
+
+    def _lookup_address_id(self, address):
+        """질의용 주소 ID 조회 (없으면 None, 새로 만들지 않음)"""
+        address = str(address)
+        address_id = self._address_ids.get(address)
+        if address_id is None:
+            row = self.connection.execute("SELECT id FROM addresses WHERE address = ?", (address,)).fetchone()
+            if row is None:
+                return None
+            address_id = self._address_ids[address] = row[0]
+        return address_id
+
+    def has_transaction(self, transaction):
+        row = self.connection.execute("SELECT 1 FROM transactions WHERE hash = ?", (transaction,)).fetchone()
+        return row is not None
+
+    def add_edges(self, edges, transaction, block=None, timestamp=None):
+        """
+        (source, target, 엣지 속성) 목록을 트랜잭션 하나의 엣지로 저장
+
+        엣지 속성은 edge_attributes 형식 (event, token, raw_amount, decimals, event_index).
+        같은 트랜잭션이 이미 저장되어 있으면 기존 엣지를 지우고 다시 저장함. 저장한 엣지 수 반환
+        """
+        with self._write():
+            self.connection.execute("DELETE FROM transactions WHERE hash = ?", (transaction,))
+            tx_id = self.connection.execute(
+                "INSERT INTO transactions(hash, block, timestamp) VALUES (?, ?, ?)",
+                (transaction, block, timestamp)).lastrowid
+
+            rows = []
+            for source, target, attrs in edges:
+                raw_amount = attrs.get("raw_amount")
+                if raw_amount is None or raw_amount == "":
+                    continue
+                amount = Amount(int(raw_amount), attrs.get("decimals", 0), attrs.get("token", ""))
+                rows.append((
+                    tx_id, self._address_id(source), self._address_id(target), attrs.get("event", ""),
+                    amount.symbol, str(amount.raw), amount.decimals, amount_to_float(amount),
+                    attrs.get("event_index", -1), block,
+                ))
+            self.connection.executemany(
+                "INSERT INTO edges(tx_id, src_id, dst_id, event, token, raw_amount, decimals, amount, event_index, block)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def add_edge_records(self, records, transaction, block=None, timestamp=None):
+        """edge_record 형식 dict 목록(extract_semantic.transfer_records, 내보낸 그래프의 edges)을 저장"""
+        return self.add_edges(((record["from"], record["to"], record) for record in records),
+                              transaction, block, timestamp)
+
+    def add_graph(self, G, transaction, block=None, timestamp=None):
+        """
+        build_transaction_graph / graph_from_dict 결과 그래프의 엣지를 저장
+
+        DiGraph는 같은 주소 쌍의 transfer를 하나만 남기므로 흐름이 빠짐.
+        개별 transfer를 모두 저장하려면 add_edge_records(transfer_records(parts))를 사용
+        """
+        return self.add_edges(G.edges(data=True), transaction, block, timestamp)
+
+    def remove_transaction(self, transaction):
+        with self._write():
+            self.connection.execute("DELETE FROM transactions WHERE hash = ?", (transaction,))
+
+    def _filters(self, token=None, event=None, block_range=None, transaction=None):
+        clauses = []
+        params = []
+        if token is not None:
+            clauses.append("e.token = ?")
+            params.append(token)
+        if event is not None:
+            clauses.append("e.event = ?")
+            params.append(event)
+        if block_range is not None:
+            start, end = block_range
+            if start is not None:
+                clauses.append("e.block >= ?")
+                params.append(start)
+            if end is not None:
+                clauses.append("e.block <= ?")
+                params.append(end)
+        if transaction is not None:
+            clauses.append("t.hash = ?")
+            params.append(transaction)
+        return clauses, params
+
+    def flows(self, address, token=None, event=None, block_range=None, direction="both", limit=None):
+        """
+        주소와 관련된 엣지 목록 (트랜잭션 / 블록 / event_index 순)
+
+        direction은 "out" (address가 source), "in" (address가 target), "both"
+        block_range는 (시작, 끝) 블록 (양끝 포함, None이면 제한 없음)
+        """
+        address_id = self._lookup_address_id(address)
+        if address_id is None:
+            return []
+
+        clauses, params = self._filters(token, event, block_range)
+        # OR 조건 대신 방향별 질의를 UNION ALL로 합쳐서 각각 src / dst 인덱스를 사용
+        selects = []
+        select_params = []
+        for column, enabled in (("e.src_id", direction in ("out", "both")), ("e.dst_id", direction in ("in", "both"))):
+            if not enabled:
+                continue
+            where = " AND ".join([f"{column} = ?"] + clauses)
+            exclude_self = " AND e.src_id != e.dst_id" if column == "e.dst_id" and direction == "both" else ""
+            selects.append(
+                f"SELECT {_EDGE_COLUMNS} FROM edges e"
+                " JOIN transactions t ON t.id = e.tx_id"
+                " JOIN addresses s ON s.id = e.src_id"
+                " JOIN addresses d ON d.id = e.dst_id"
+                f" WHERE {where}{exclude_self}")
+            select_params += [address_id] + params
+        if not selects:
+            raise ValueError(f"unknown direction: {direction}")
+
+        query = " UNION ALL ".join(selects) + " ORDER BY 2, 1, 10"
+        if limit is not None:
+            query += " LIMIT ?"
+            select_params.append(limit)
+        return [_edge_row_record(row) for row in self.connection.execute(query, select_params)]
+
+    def top_counterparties(self, address, limit=10, token=None, event=None, block_range=None):
+        """
+        주소와 엣지를 주고받은 상대 주소를 transfer 수 기준으로 정렬해 반환
+
+        각 항목: {"address", "transfers", "outgoing", "incoming", "volume"} (volume은 표시 단위 float 합계)
+        """
+        address_id = self._lookup_address_id(address)
+        if address_id is None:
+            return []
+
+        clauses, params = self._filters(token, event, block_range)
+        extra = "".join(f" AND {clause}" for clause in clauses)
+        query = f"""
+            SELECT a.address, COUNT(*) AS transfers, SUM(c.outgoing), SUM(1 - c.outgoing), SUM(c.amount) AS volume
+            FROM (
+                SELECT e.dst_id AS counterparty, 1 AS outgoing, e.amount FROM edges e
+                JOIN transactions t ON t.id = e.tx_id WHERE e.src_id = ?{extra}
+                UNION ALL
+                SELECT e.src_id AS counterparty, 0 AS outgoing, e.amount FROM edges e
+                JOIN transactions t ON t.id = e.tx_id WHERE e.dst_id = ?{extra}
+            ) c
+            JOIN addresses a ON a.id = c.counterparty
+            WHERE c.counterparty != ?
+            GROUP BY c.counterparty
+            ORDER BY transfers DESC, volume DESC
+            LIMIT ?
+        """
+        rows = self.connection.execute(query, [address_id] + params + [address_id] + params + [address_id, limit])
+        return [
+            {"address": row[0], "transfers": row[1], "outgoing": row[2], "incoming": row[3], "volume": row[4]}
+            for row in rows
+        ]
+
+    def transactions_touching(self, address, block_range=None):
+        """주소가 관련된 트랜잭션 해시 목록 (블록 순)"""
+        address_id = self._lookup_address_id(address)
+        if address_id is None:
+            return []
+
+        clauses, params = self._filters(block_range=block_range)
+        extra = "".join(f" AND {clause}" for clause in clauses)
+        query = f"""
+            SELECT t.hash, t.block FROM transactions t WHERE t.id IN (
+                SELECT e.tx_id FROM edges e WHERE e.src_id = ?{extra}
+                UNION
+                SELECT e.tx_id FROM edges e WHERE e.dst_id = ?{extra}
+            )
+            ORDER BY t.block, t.hash
+        """
+        return [row[0] for row in self.connection.execute(query, [address_id] + params + [address_id] + params)]
+
+    def transaction_edges(self, transaction):
+        """트랜잭션 하나의 엣지 목록 (event_index 순)"""
+        query = (f"SELECT {_EDGE_COLUMNS} FROM edges e"
+                 " JOIN transactions t ON t.id = e.tx_id"
+                 " JOIN addresses s ON s.id = e.src_id"
+                 " JOIN addresses d ON d.id = e.dst_id"
+                 " WHERE t.hash = ? ORDER BY e.event_index")
+        return [_edge_row_record(row) for row in self.connection.execute(query, (transaction,))]
+
+    def stats(self):
+        counts = {}
+        for table in ("transactions", "addresses", "edges"):
+            counts[table] = self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
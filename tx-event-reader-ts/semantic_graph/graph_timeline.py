@@ -0,0 +1,463 @@
+"""
+event_index 순서의 그래프 타임라인 (단계별 snapshot / diff)
+
+최종 그래프(DiGraph)는 같은 주소 쌍의 엣지를 하나로 합치기 때문에 flash loan 공격의 진행 순서를 따라가기 어려움.
+EdgeStore의 고유 엣지를 event_index 순서로 한 번 정렬해 두고, 단계 i의 그래프는
+"정렬된 엣지 배열의 앞 edge_end[i]개 + 처음 등장 순서로 정렬한 노드 배열의 앞 node_end[i]개"로 표현함.
+모든 단계가 같은 배열을 공유하므로 단계마다 그래프를 복사하지 않고, 두 단계의 차이도 배열의 한 구간임.
+
+render_timeline_html은 전체 노드 / 엣지를 고정 위치로 한 번만 그린 뒤 슬라이더가 구간의 hidden만 바꾸는 HTML을 만듦
+(단계마다 pyvis Network를 다시 만들지 않으므로 수백 단계도 바로 이동 가능).
+vis-network는 html_emitter와 같이 CDN 대신 출력 디렉토리의 lib/를 참조함
+(상대 경로를 쓸 수 없는 곳, 예: streamlit components.html은 inline_assets=True로 스크립트를 페이지에 포함).
+
+실행 예:
+    python graph_timeline.py ../decoded_logs/tx_<hash>.json
+"""
+import argparse
+import html
+import json
+import os
+
+import numpy as np
+
+from amounts import Amount, format_amount
+from edge_store import EdgeStore, build_edge_store
+from extract_semantic import (
+    ZERO_ADDRESS,
+    edge_color,
+    edge_title,
+    iter_transaction_events,
+    layout_positions,
+    load_semantic_event,
+    node_attributes,
+    node_label,
+)
+from html_emitter import LIB_DIR, copy_html_resources
+
+RULES_DIR = os.path.dirname(os.path.abspath(__file__))
+# 재생 버튼의 단계 간격 (ms)
+PLAY_INTERVAL_MS = 500
+# 같은 주소 쌍의 엣지가 겹치지 않도록 곡률을 이 값씩 늘림
+PARALLEL_EDGE_ROUNDNESS = 0.15
+
+
+class GraphTimeline:
+    """
+    EdgeStore의 고유 엣지를 event_index 순서로 정렬한 타임라인
+
+    단계(step)는 서로 다른 event_index 하나. 배열은 모두 정렬된 엣지 위치(position) 기준이며
+    노드는 처음 등장한 순서의 위치(node_order의 index)로 다룸
+    """
+
+    def __init__(self, store, transaction=None):
+        self.store = store
+        columns = store.columns()
+        # build_transaction_graph와 같이 (트랜잭션, source, target, event_index)가 같은 엣지는 한 번만, zero address 제외
+        mask = store.unique_edge_mask()
+        if transaction is not None:
+            mask &= columns["transaction"] == store.transactions.codes.get(transaction, -1)
+        zero = store.addresses.codes.get(ZERO_ADDRESS)
+        if zero is not None:
+            mask &= (columns["src"] != zero) & (columns["dst"] != zero)
+        rows = np.flatnonzero(mask)
+
+        # 같은 event_index 안에서는 추출된 순서 유지
+        self.rows = rows[np.argsort(columns["event_index"][rows], kind="stable")]
+        self.src = columns["src"][self.rows]
+        self.dst = columns["dst"][self.rows]
+        self.event = columns["event"][self.rows]
+        self.event_index = columns["event_index"][self.rows]
+
+        # 단계별 누적 엣지 수
+        self.steps, step_start = np.unique(self.event_index, return_index=True)
+        self.edge_end = np.append(step_start[1:], len(self.rows)).astype(np.int64)
+
+        # 주소 코드별 처음 등장한 엣지 위치 -> 처음 등장한 단계 순서의 노드 배열과 단계별 누적 노드 수
+        edge_count = len(self.rows)
+        first = np.full(len(store.addresses), edge_count, dtype=np.int64)
+        positions = np.arange(edge_count, dtype=np.int64)
+        np.minimum.at(first, self.src, positions)
+        np.minimum.at(first, self.dst, positions)
+        appeared = np.flatnonzero(first < edge_count)
+        self.node_order = appeared[np.argsort(first[appeared], kind="stable")]
+        node_step = np.searchsorted(self.edge_end, first[self.node_order], side="right")
+        self.node_end = np.searchsorted(node_step, np.arange(len(self.steps)), side="right").astype(np.int64)
+        # 주소 코드 -> 노드 위치
+        self.node_position = np.full(len(store.addresses), -1, dtype=np.int64)
+        self.node_position[self.node_order] = np.arange(len(self.node_order))
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def edge_count(self):
+        return len(self.rows)
+
+    @property
+    def node_count(self):
+        return len(self.node_order)
+
+    def address(self, node):
+        """노드 위치의 주소"""
+        return self.store.addresses.values[self.node_order[node]]
+
+    def step_of(self, event_index):
+        """event_index 시점까지 반영된 마지막 단계 (첫 단계 이전이면 -1)"""
+        return int(np.searchsorted(self.steps, event_index, side="right")) - 1
+
+    def edge_range(self, step):
+        """단계에서 새로 추가되는 엣지 위치 구간"""
+        start = int(self.edge_end[step - 1]) if step > 0 else 0
+        return range(start, int(self.edge_end[step]))
+
+    def node_range(self, step):
+        """단계에서 처음 등장하는 노드 위치 구간"""
+        start = int(self.node_end[step - 1]) if step > 0 else 0
+        return range(start, int(self.node_end[step]))
+
+    def snapshot(self, step):
+        """단계까지의 그래프 (배열을 공유하는 view, step은 음수 index 가능)"""
+        if not -len(self) <= step < len(self):
+            raise IndexError(f"step {step} is out of range for {len(self)} steps")
+        return TimelineSnapshot(self, step % len(self))
+
+    def diff(self, from_step, to_step):
+        """
+        from_step 그래프를 to_step 그래프로 바꾸는 차이 (-1은 빈 그래프)
+
+        반환: {"added_edges", "removed_edges", "added_nodes", "removed_nodes"} 위치 range
+        단계 그래프는 앞부분 구간이라 항상 한쪽 방향의 구간 하나만 바뀜
+        """
+        edges_from = int(self.edge_end[from_step]) if from_step >= 0 else 0
+        edges_to = int(self.edge_end[to_step]) if to_step >= 0 else 0
+        nodes_from = int(self.node_end[from_step]) if from_step >= 0 else 0
+        nodes_to = int(self.node_end[to_step]) if to_step >= 0 else 0
+        return {
+            "added_edges": range(edges_from, edges_to),
+            "removed_edges": range(edges_to, edges_from),
+            "added_nodes": range(nodes_from, nodes_to),
+            "removed_nodes": range(nodes_to, nodes_from),
+        }
+
+    def edge_record(self, position):
+        """엣지 위치의 graph_to_dict 형식 엣지 dict"""
+        row = int(self.rows[position])
+        amount = self.store.amount(row)
+        amount_value = format_amount(amount)
+        event = self.store.events.values[self.event[position]]
+        return {
+            "from": self.store.addresses.values[self.src[position]],
+            "to": self.store.addresses.values[self.dst[position]],
+            "event": event,
+            "token": amount.symbol,
+            "amount": amount_value,
+            "raw_amount": str(amount.raw),
+            "decimals": amount.decimals,
+            "event_index": int(self.event_index[position]),
+            "title": edge_title(event, amount_value, amount.symbol),
+        }
+
+    def step_summaries(self):
+        """단계별 (event_index, 이벤트 이름, 추가된 엣지 수, 누적 엣지 수, 누적 노드 수)"""
+        events = self.store.events.values
+        summaries = []
+        for step in range(len(self)):
+            added = self.edge_range(step)
+            names = dict.fromkeys(events[code] for code in self.event[added.start:added.stop].tolist())
+            summaries.append((int(self.steps[step]), ", ".join(names), len(added), added.stop,
+                              int(self.node_end[step])))
+        return summaries
+
+
+class TimelineSnapshot:
+    """GraphTimeline의 한 단계 그래프 (타임라인 배열의 앞부분을 가리키기만 함)"""
+
+    __slots__ = ("timeline", "step")
+
+    def __init__(self, timeline, step):
+        self.timeline = timeline
+        self.step = step
+
+    @property
+    def event_index(self):
+        return int(self.timeline.steps[self.step])
+
+    @property
+    def edge_positions(self):
+        return range(int(self.timeline.edge_end[self.step]))
+
+    @property
+    def node_positions(self):
+        return range(int(self.timeline.node_end[self.step]))
+
+    @property
+    def added_edge_positions(self):
+        return self.timeline.edge_range(self.step)
+
+    @property
+    def added_node_positions(self):
+        return self.timeline.node_range(self.step)
+
+    def nodes(self):
+        return [self.timeline.address(node) for node in self.node_positions]
+
+    def edges(self):
+        return [self.timeline.edge_record(position) for position in self.edge_positions]
+
+    def to_networkx(self):
+        """단계까지의 엣지로 build_transaction_graph와 같은 속성의 nx.DiGraph 생성 (같은 주소 쌍은 마지막 엣지)"""
+        import networkx as nx
+
+        from extract_semantic import edge_attributes
+
+        timeline = self.timeline
+        store = timeline.store
+        G = nx.DiGraph()
+        volumes = {}
+        edges = []
+        for position in self.edge_positions:
+            row = int(timeline.rows[position])
+            amount = store.amount(row)
+            source = store.addresses.values[timeline.src[position]]
+            target = store.addresses.values[timeline.dst[position]]
+            # 표시용 거래량 (compute_address_volumes와 같이 유입 + 유출)
+            value = amount.raw / 10 ** amount.decimals
+            volumes[source] = volumes.get(source, 0) + value
+            volumes[target] = volumes.get(target, 0) + value
+            edges.append((source, target, {
+                "event": store.events.values[timeline.event[position]],
+                "amount": amount,
+                "event_index": int(timeline.event_index[position]),
+            }))
+        for address in self.nodes():
+            G.add_node(address, **node_attributes(address, volumes.get(address, 0)))
+        for source, target, edge in edges:
+            G.add_edge(source, target, **edge_attributes(edge))
+        return G
+
+
+def timeline_from_events(data, semantic_events_list, transaction=None):
+    """트랜잭션 데이터 / 이벤트 iterator에서 타임라인 생성 (build_edge_store와 같은 인자)"""
+    return GraphTimeline(build_edge_store(data, semantic_events_list, transaction=transaction))
+
+
+def timeline_from_graph_data(graph_data):
+    """
+    graph_to_dict / graph_formats.read_graph_file 형식의 그래프 데이터에서 타임라인 생성
+
+    내보낸 그래프는 같은 주소 쌍의 엣지가 하나로 합쳐져 있으므로, 원본 로그가 있으면 timeline_from_events를 사용
+    """
+    store = EdgeStore()
+    for edge in graph_data.get("edges", []):
+        raw_amount = edge.get("raw_amount") or "0"
+        store.append(edge["from"], edge["to"], edge.get("event", ""),
+                     Amount(int(raw_amount), edge.get("decimals", 0), edge.get("token", "")),
+                     edge.get("event_index", -1))
+    return GraphTimeline(store)
+
+
+def load_timeline(file_path, rules_dir=None):
+    """디코딩 된 트랜잭션 파일의 타임라인"""
+    semantic_events_list = load_semantic_event(rules_dir or RULES_DIR)
+    return timeline_from_events(iter_transaction_events(file_path), semantic_events_list)
+
+
+def timeline_payload(timeline):
+    """타임라인 HTML에 넣는 노드 / 엣지 / 단계 데이터 (노드 / 엣지 id는 타임라인 위치)"""
+    store = timeline.store
+    addresses = [timeline.address(node) for node in range(timeline.node_count)]
+    src = timeline.node_position[timeline.src].tolist()
+    dst = timeline.node_position[timeline.dst].tolist()
+    # 전체 그래프 기준으로 위치를 한 번만 계산해서 단계가 바뀌어도 노드가 움직이지 않음
+    layout = layout_positions(range(timeline.node_count), zip(src, dst))
+    volumes = store.address_volumes()
+
+    nodes = []
+    for node, address in enumerate(addresses):
+        x, y = layout[node]
+        nodes.append({
+            "id": node,
+            "label": node_label(address),
+            "title": address,
+            "size": node_attributes(address, volumes.get(address, 0))["size"],
+            "color": "#9FB3DF" if address == "External" else "#BDDDE4",
+            "x": x,
+            "y": y,
+            "hidden": True,
+        })
+
+    edges = []
+    parallel = {}
+    for position in range(timeline.edge_count):
+        record = timeline.edge_record(position)
+        pair = (min(src[position], dst[position]), max(src[position], dst[position]))
+        count = parallel[pair] = parallel.get(pair, -1) + 1
+        edges.append({
+            "id": position,
+            "from": src[position],
+            "to": dst[position],
+            "label": f"#{record['event_index']}: {record['event']}",
+            "title": record["title"],
+            "color": edge_color(record["event"]),
+            "smooth": {"type": "curvedCW", "roundness": count * PARALLEL_EDGE_ROUNDNESS} if count else False,
+            "hidden": True,
+        })
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "steps": timeline.steps.tolist(),
+        "stepEvents": [events for _, events, _, _, _ in timeline.step_summaries()],
+        "edgeEnd": timeline.edge_end.tolist(),
+        "nodeEnd": timeline.node_end.tolist(),
+    }
+
+
+_TIMELINE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+__VIS_NETWORK__
+<style>
+  body { margin: 0; font-family: sans-serif; }
+  #controls { display: flex; align-items: center; gap: 8px; padding: 6px 8px; border-bottom: 1px solid #ddd; }
+  #step { flex: 1; }
+  #step-label { min-width: 240px; font-size: 13px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+  #network { width: 100%; height: __HEIGHT__; }
+</style>
+</head>
+<body>
+<div id="controls">
+  <button id="play">Play</button>
+  <input id="step" type="range" min="0" max="0" value="0">
+  <span id="step-label"></span>
+</div>
+<div id="network"></div>
+<script>
+var timeline = __PAYLOAD__;
+var nodes = new vis.DataSet(timeline.nodes);
+var edges = new vis.DataSet(timeline.edges);
+var network = new vis.Network(document.getElementById("network"), {nodes: nodes, edges: edges}, {
+  physics: {enabled: false},
+  layout: {improvedLayout: false},
+  edges: {arrows: {to: {enabled: true, scaleFactor: 0.3}}, font: {size: 12, strokeWidth: 0, align: "middle"}},
+  interaction: {hover: true, navigationButtons: true, keyboard: true}
+});
+var slider = document.getElementById("step");
+var label = document.getElementById("step-label");
+var playButton = document.getElementById("play");
+var current = -1;
+var highlighted = {start: 0, end: 0};
+var timer = null;
+
+function end(counts, step) { return step < 0 ? 0 : counts[step]; }
+
+// [start, end) 구간의 항목만 한 번에 갱신 (단계 이동 비용은 바뀐 엣지 / 노드 수에 비례)
+function updateRange(dataSet, start, stop, fields) {
+  var items = [];
+  for (var id = start; id < stop; id++) {
+    var item = {id: id};
+    for (var key in fields) { item[key] = fields[key]; }
+    items.push(item);
+  }
+  if (items.length) { dataSet.update(items); }
+}
+
+function show(step) {
+  var edgeFrom = end(timeline.edgeEnd, current), edgeTo = end(timeline.edgeEnd, step);
+  var nodeFrom = end(timeline.nodeEnd, current), nodeTo = end(timeline.nodeEnd, step);
+  if (edgeTo > edgeFrom) { updateRange(edges, edgeFrom, edgeTo, {hidden: false}); }
+  else { updateRange(edges, edgeTo, edgeFrom, {hidden: true}); }
+  if (nodeTo > nodeFrom) { updateRange(nodes, nodeFrom, nodeTo, {hidden: false}); }
+  else { updateRange(nodes, nodeTo, nodeFrom, {hidden: true}); }
+
+  // 현재 단계에서 추가된 엣지만 굵게 표시
+  updateRange(edges, highlighted.start, highlighted.end, {width: 1});
+  highlighted = {start: end(timeline.edgeEnd, step - 1), end: edgeTo};
+  updateRange(edges, highlighted.start, highlighted.end, {width: 4});
+
+  current = step;
+  slider.value = step;
+  label.textContent = "Step " + (step + 1) + "/" + timeline.steps.length + "  #" + timeline.steps[step] +
+    ": " + timeline.stepEvents[step];
+}
+
+function stop() {
+  clearInterval(timer);
+  timer = null;
+  playButton.textContent = "Play";
+}
+
+slider.max = Math.max(0, timeline.steps.length - 1);
+slider.addEventListener("input", function () { show(parseInt(slider.value, 10)); });
+playButton.addEventListener("click", function () {
+  if (timer !== null) { stop(); return; }
+  if (current >= timeline.steps.length - 1) { show(0); }
+  playButton.textContent = "Pause";
+  timer = setInterval(function () {
+    if (current >= timeline.steps.length - 1) { stop(); return; }
+    show(current + 1);
+  }, __INTERVAL__);
+});
+if (timeline.steps.length) { show(0); } else { label.textContent = "No edges"; }
+</script>
+</body>
+</html>
+"""
+
+
+_VIS_NETWORK_LINKS = """<link rel="stylesheet" href="__ASSETS__/vis-9.1.2/vis-network.css" type="text/css">
+<script src="__ASSETS__/vis-9.1.2/vis-network.min.js"></script>"""
+
+
+def vis_network_tags(asset_dir="lib", inline_assets=False):
+    """
+    vis-network를 불러오는 head 태그
+
+    기본은 asset_dir의 lib/ 파일 참조 (copy_html_resources), inline_assets=True면 lib/의 스크립트를 그대로 포함
+    """
+    if not inline_assets:
+        return _VIS_NETWORK_LINKS.replace("__ASSETS__", asset_dir.rstrip("/"))
+    with open(os.path.join(LIB_DIR, "vis-9.1.2", "vis-network.min.js"), 'r', encoding='utf-8') as f:
+        script = f.read().replace("</script", "<\\/script")
+    return f"<script>{script}</script>"
+
+
+def render_timeline_html(timeline, title="Transaction timeline", height="750px", asset_dir="lib",
+                         inline_assets=False):
+    """
+    슬라이더 / 재생 버튼으로 단계를 이동하는 vis-network HTML 문자열
+
+    파일로 저장할 때는 같은 디렉토리에 asset_dir(lib/)가 있어야 함 (copy_html_resources)
+    """
+    # </script>가 데이터에 들어 있어도 script 블록이 끝나지 않도록 escape
+    payload = json.dumps(timeline_payload(timeline), ensure_ascii=False).replace("</", "<\\/")
+    return (_TIMELINE_TEMPLATE
+            .replace("__VIS_NETWORK__", vis_network_tags(asset_dir, inline_assets))
+            .replace("__TITLE__", html.escape(title))
+            .replace("__HEIGHT__", height)
+            .replace("__INTERVAL__", str(PLAY_INTERVAL_MS))
+            .replace("__PAYLOAD__", payload))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render an event-index timeline of a transaction graph")
+    parser.add_argument("file_path", help="decoded log file (tx_<hash>.json)")
+    parser.add_argument("-o", "--output", default=None, help="output HTML file (default: <tx name>_timeline.html)")
+    parser.add_argument("--rules-dir", default=None, help="directory of semantic rule JSON files")
+    args = parser.parse_args()
+
+    timeline = load_timeline(args.file_path, args.rules_dir)
+    name = os.path.splitext(os.path.basename(args.file_path))[0]
+    output = args.output or f"{name}_timeline.html"
+    copy_html_resources(os.path.dirname(os.path.abspath(output)))
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(render_timeline_html(timeline, title=name))
+    print(f"Timeline saved to {output}: {len(timeline)} steps, {timeline.edge_count} edges, "
+          f"{timeline.node_count} nodes")
+
+
+if __name__ == "__main__":
+    main()
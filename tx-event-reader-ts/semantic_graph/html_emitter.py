@@ -0,0 +1,172 @@
+"""
+템플릿 기반 그래프 HTML 출력 (대량 렌더링용)
+
+visualize_graph(pyvis)는 그래프마다 Network를 만들고 options 문자열을 다시 파싱한 뒤 jinja 템플릿을 렌더링함.
+수만 개 트랜잭션을 렌더링하면 그래프를 만드는 시간보다 이 과정이 더 오래 걸려서,
+페이지를 한 번만 조립해 두고(GraphPageTemplate) 그래프마다 노드 / 엣지 / 옵션 JSON만 끼워서 파일에 바로 씀.
+노드 / 엣지 / 옵션은 graph_network_data가 pyvis 경로와 같은 값으로 만듦.
+
+페이지는 CDN 대신 출력 디렉토리의 lib/ (vis-network 9.1.2, tom-select, pyvis bindings/utils.js)를 참조하므로
+copy_html_resources로 출력 디렉토리마다 한 번만 복사하면 모든 페이지가 같은 파일을 공유함 (브라우저 캐시도 공유).
+tom-select는 노드 검색 상자에 사용 (선택한 노드의 이웃을 강조).
+"""
+import json
+import os
+import shutil
+
+from extract_semantic import graph_network_data
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+
+_PAGE = """<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="__ASSETS__/vis-9.1.2/vis-network.css" type="text/css">
+<link rel="stylesheet" href="__ASSETS__/tom-select/tom-select.css" type="text/css">
+<script src="__ASSETS__/vis-9.1.2/vis-network.min.js"></script>
+<script src="__ASSETS__/tom-select/tom-select.complete.min.js"></script>
+<script src="__ASSETS__/bindings/utils.js"></script>
+<style type="text/css">
+  body { margin: 0; }
+  #select-menu { padding: 6px; }
+  #mynetwork { width: 100%; height: __HEIGHT__; background-color: #ffffff; border: 1px solid lightgray; position: relative; }
+</style>
+</head>
+<body>
+<div id="select-menu"><select id="select-node" placeholder="Select a node by ID"></select></div>
+<div id="mynetwork"></div>
+<script type="text/javascript">
+// utils.js(neighbourhoodHighlight)가 사용하는 전역 변수
+var nodes, edges, allNodes, nodeColors, network, highlightActive = false;
+
+function drawGraph() {
+  nodes = new vis.DataSet(__NODES__);
+  edges = new vis.DataSet(__EDGES__);
+  var options = __OPTIONS__;
+
+  nodeColors = {};
+  allNodes = nodes.get({returnType: "Object"});
+  for (var nodeId in allNodes) {
+    nodeColors[nodeId] = allNodes[nodeId].color;
+  }
+  network = new vis.Network(document.getElementById("mynetwork"), {nodes: nodes, edges: edges}, options);
+  network.on("click", neighbourhoodHighlight);
+
+  // 노드 검색 상자 (옵션은 노드 데이터에서 만들어서 페이지마다 따로 쓰지 않음)
+  new TomSelect("#select-node", {
+    options: nodes.getIds().map(function (id) { return {value: id, text: String(id)}; }),
+    maxOptions: 100,
+    onChange: function (value) { if (value !== "") { selectNode([value]); } }
+  });
+  return network;
+}
+drawGraph();
+</script>
+</body>
+</html>
+"""
+
+
+def _dumps(value):
+    """JSON bytes (orjson이 있으면 사용). 데이터 안의 </script>가 script 블록을 끝내지 않도록 </ 를 escape"""
+    try:
+        import orjson
+    except ImportError:
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    else:
+        data = orjson.dumps(value)
+    return data.replace(b"</", b"<\\/")
+
+
+class GraphPageTemplate:
+    """
+    미리 조립한 그래프 페이지
+
+    페이지를 노드 / 엣지 / 옵션 자리에서 잘라 bytes 조각으로 보관하고, write는 조각과 JSON만 순서대로 씀.
+    옵션은 NETWORK_OPTIONS / LARGE_NETWORK_OPTIONS 두 가지라 직렬화 결과를 캐시함
+    """
+
+    def __init__(self, asset_dir="lib", height="900px"):
+        page = _PAGE.replace("__ASSETS__", asset_dir.rstrip("/")).replace("__HEIGHT__", height).encode("utf-8")
+        self._head, rest = page.split(b"__NODES__")
+        self._between, rest = rest.split(b"__EDGES__")
+        self._before_options, self._tail = rest.split(b"__OPTIONS__")
+        self._options = {}
+
+    def _options_json(self, options):
+        # 옵션 dict는 모듈 상수이므로 id로 캐시 (상수 객체는 프로세스가 끝날 때까지 유지됨)
+        cached = self._options.get(id(options))
+        if cached is None or cached[0] is not options:
+            cached = self._options[id(options)] = (options, _dumps(options))
+        return cached[1]
+
+    def write(self, f, nodes, edges, options):
+        """바이너리 파일 객체에 페이지 쓰기"""
+        f.write(self._head)
+        f.write(_dumps(nodes))
+        f.write(self._between)
+        f.write(_dumps(edges))
+        f.write(self._before_options)
+        f.write(self._options_json(options))
+        f.write(self._tail)
+
+    def render(self, nodes, edges, options):
+        """페이지 HTML 문자열"""
+        return b"".join((self._head, _dumps(nodes), self._between, _dumps(edges), self._before_options,
+                         self._options_json(options), self._tail)).decode("utf-8")
+
+
+DEFAULT_TEMPLATE = GraphPageTemplate()
+
+
+def copy_html_resources(output_dir):
+    """HTML이 참조하는 lib/ (vis-network, tom-select, bindings) 를 출력 디렉토리에 복사 (이미 있으면 그대로 둠)"""
+    target = os.path.join(output_dir, "lib")
+    if os.path.isdir(LIB_DIR) and not os.path.exists(target):
+        shutil.copytree(LIB_DIR, target)
+
+
+def render_graph_page(G, template=DEFAULT_TEMPLATE, debug=False, large=None):
+    """
+    render_graph_html과 같은 그래프 페이지 문자열 (노드가 없으면 None)
+
+    G는 graph_network_data에서 pruning 됨 (visualize_graph와 같음)
+    """
+    network_data = graph_network_data(G, debug, large)
+    if network_data is None:
+        return None
+    return template.render(*network_data)
+
+
+def write_graph_page(G, output_file, template=DEFAULT_TEMPLATE, debug=False, large=None):
+    """
+    visualize_graph 대신 템플릿으로 그래프 HTML 파일 저장 (실패하거나 노드가 없으면 None)
+
+    output_file과 같은 디렉토리에 lib/가 있어야 함 (copy_html_resources)
+    """
+    network_data = graph_network_data(G, debug, large)
+    if network_data is None:
+        return None
+    try:
+        with open(output_file, 'wb') as f:
+            template.write(f, *network_data)
+    except OSError as e:
+        print(f"Graph saving error: {e}")
+        return None
+    if debug:
+        print(f"Graph saved to {output_file}")
+    return output_file
+
+
+def write_graph_pages(graphs, output_dir, template=DEFAULT_TEMPLATE, large=None):
+    """
+    (이름, 그래프) iterator를 하나씩 받아 output_dir/<이름>_graph.html로 저장하고 저장된 경로를 yield
+
+    그래프를 모두 메모리에 올리지 않고 만들어지는 대로 렌더링할 수 있음 (lib/는 처음 한 번만 복사)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    copy_html_resources(output_dir)
+    for name, G in graphs:
+        output_file = write_graph_page(G, os.path.join(output_dir, f"{name}_graph.html"), template, large=large)
+        if output_file is not None:
+            yield output_file
@@ -0,0 +1,248 @@
+"""
+증분 그래프 빌더
+
+로그 / 트랜잭션 / 블록 단위로 들어오는 디코딩 된 이벤트를 받아 그래프를 제자리에서 갱신하고,
+변경분(delta)만 반환함. build_transaction_graph와 같은 규칙으로 노드 거래량과 엣지를 만들기 때문에
+같은 이벤트를 모두 넣으면 같은 그래프가 나옴. 주소 x 토큰 순 잔액 변화(balance_deltas)는 엣지마다 갱신하고
+시퀀스 패턴(patterns)은 SequenceScanner에 이벤트를 하나씩 넣어서 찾음.
+
+사용 예:
+    builder = IncrementalGraphBuilder(compile_semantic_index(load_semantic_event()))
+    for block_events in stream:
+        delta = builder.add_events(block_events)
+        apply_graph_delta(graph_data, delta)
+"""
+import networkx as nx
+
+from balance_deltas import balance_delta_records
+from extract_semantic import (
+    compile_semantic_index,
+    edge_attributes,
+    edge_record,
+    extract_event_edges,
+    node_attributes,
+    node_record,
+    visualize_graph,
+    write_graph_data,
+)
+from sequence_patterns import compile_sequence_patterns
+
+
+def empty_delta():
+    return {
+        "nodes_added": [],
+        "nodes_updated": [],
+        "edges_added": [],
+        "edges_updated": [],
+        "patterns_added": [],
+        "balance_deltas_updated": [],
+    }
+
+
+class IncrementalGraphBuilder:
+    """
+    이벤트가 도착할 때마다 그래프를 갱신하는 빌더
+
+    sequence_matcher에는 compile_sequence_patterns 결과를 전달 (semantic_index가 컴파일 전 목록이면 자동으로 컴파일)
+    """
+
+    def __init__(self, semantic_index, sequence_matcher=None):
+        if not isinstance(semantic_index, dict):
+            if sequence_matcher is None:
+                sequence_matcher = compile_sequence_patterns(semantic_index)
+            semantic_index = compile_semantic_index(semantic_index)
+        self.semantic_index = semantic_index
+        self.G = nx.DiGraph()
+        self.event_count = 0
+        self.processed_events = 0
+        # (주소) -> {(symbol, decimals): 정수 합계}
+        self._token_totals = {}
+        self._added_edges = set()
+        # (주소, symbol, decimals) -> 부호 있는 정수 변화량 (중복 엣지는 한 번만 셈, 0이 된 항목도 유지)
+        self.balance_deltas = {}
+        self._balance_records_stale = False
+        self._scanner = sequence_matcher.scanner() if sequence_matcher is not None else None
+        # event_index -> 매칭된 패턴 이름 목록 / 그 이벤트의 속성을 가진 (source, target)
+        self._patterns_by_event = {}
+        self._edges_by_event = {}
+        # 내보내기 형식 데이터와 각 레코드 위치 (delta를 바로 반영하기 위함)
+        self._graph_data = {"nodes": [], "edges": []}
+        if self._scanner is not None:
+            self._graph_data["patterns"] = self._scanner.matches
+        self._node_positions = {}
+        self._edge_positions = {}
+
+    @property
+    def graph_data(self):
+        """graph_to_dict 형식 데이터 (balance_deltas 레코드는 정렬이 필요해서 읽을 때 다시 만듦)"""
+        if self._balance_records_stale:
+            self._graph_data["balance_deltas"] = balance_delta_records(
+                {key: delta for key, delta in self.balance_deltas.items() if delta})
+            self._balance_records_stale = False
+        return self._graph_data
+
+    def add_event(self, event):
+        """이벤트 하나를 반영하고 delta 반환"""
+        return self.add_events([event])
+
+    def add_events(self, events):
+        """
+        이벤트 묶음(트랜잭션, 블록 등)을 반영하고 변경된 노드 / 엣지를 delta로 반환
+
+        delta의 레코드는 export_graph_to_json과 같은 형식임
+        """
+        delta = empty_delta()
+        touched_addresses = {}
+        added_nodes = set()
+        edge_changes = {}
+        touched_balances = {}
+
+        for event in events:
+            event_counter = self.event_count
+            self.event_count += 1
+            if "name" not in event:
+                continue
+
+            # 시퀀스 패턴은 같은 이벤트 스트림에서 함께 진행 (이미 추가된 이전 이벤트의 엣지에도 패턴 기록)
+            if self._scanner is not None:
+                for match in self._scanner.feed(event, event_counter):
+                    delta["patterns_added"].append(match)
+                    self._tag_match(match, edge_changes)
+
+            event_edges = extract_event_edges(event, self.semantic_index, event_counter)
+            if event_edges is None:
+                continue
+            self.processed_events += 1
+
+            for edge in event_edges:
+                source = edge["from_address"]
+                target = edge["to_address"]
+                amount = edge["amount"]
+
+                for address in (source, target):
+                    if address not in self.G:
+                        self.G.add_node(address)
+                        added_nodes.add(address)
+                    totals = self._token_totals.setdefault(address, {})
+                    token_key = (amount.symbol, amount.decimals)
+                    totals[token_key] = totals.get(token_key, 0) + amount.raw
+                    touched_addresses[address] = None
+
+                edge_key = (source, target, edge["event_index"])
+                if edge_key in self._added_edges:
+                    continue
+                self._added_edges.add(edge_key)
+
+                for balance_key, change in (((source, amount.symbol, amount.decimals), -amount.raw),
+                                            ((target, amount.symbol, amount.decimals), amount.raw)):
+                    self.balance_deltas[balance_key] = self.balance_deltas.get(balance_key, 0) + change
+                    touched_balances[balance_key] = None
+
+                # DiGraph이므로 같은 (source, target)은 나중 이벤트의 속성으로 덮어씀 (이전 이벤트의 패턴도 지움)
+                is_new_edge = not self.G.has_edge(source, target)
+                attrs = edge_attributes(edge)
+                if is_new_edge:
+                    self.G.add_edge(source, target, **attrs)
+                else:
+                    edge_attrs = self.G.edges[source, target]
+                    edge_attrs.pop("patterns", None)
+                    edge_attrs.update(attrs)
+                patterns = self._patterns_by_event.get(edge["event_index"])
+                if patterns:
+                    self.G.edges[source, target]["patterns"] = sorted(set(patterns))
+                self._edges_by_event.setdefault(edge["event_index"], set()).add((source, target))
+                if (source, target) not in edge_changes:
+                    edge_changes[(source, target)] = is_new_edge
+
+        for address in touched_addresses:
+            attrs = node_attributes(address, self._address_volume(address))
+            if address not in added_nodes and attrs == self._node_state(address):
+                continue
+            self.G.nodes[address].update(attrs)
+            record = node_record(address, attrs)
+            self._put_record(self._graph_data["nodes"], self._node_positions, address, record)
+            delta["nodes_added" if address in added_nodes else "nodes_updated"].append(record)
+
+        for (source, target), is_new_edge in edge_changes.items():
+            record = edge_record(source, target, self.G.edges[source, target])
+            self._put_record(self._graph_data["edges"], self._edge_positions, (source, target), record)
+            delta["edges_added" if is_new_edge else "edges_updated"].append(record)
+
+        if touched_balances:
+            delta["balance_deltas_updated"] = balance_delta_records(
+                {key: self.balance_deltas[key] for key in touched_balances})
+            self._balance_records_stale = True
+
+        return delta
+
+    def _tag_match(self, match, edge_changes):
+        """완성된 매칭의 이벤트에서 나온 엣지에 패턴 이름 기록 (tag_edge_matches와 같은 결과)"""
+        for event_index in match["events"]:
+            self._patterns_by_event.setdefault(event_index, []).append(match["pattern"])
+            for source, target in self._edges_by_event.get(event_index, ()):
+                attrs = self.G.edges[source, target]
+                # 같은 주소 쌍의 나중 이벤트로 덮어쓴 엣지는 해당 없음
+                if attrs["event_index"] != event_index:
+                    continue
+                attrs["patterns"] = sorted(set(self._patterns_by_event[event_index]))
+                edge_changes.setdefault((source, target), False)
+
+    def _address_volume(self, address):
+        volume = 0.0
+        for (_, decimals), total in self._token_totals.get(address, {}).items():
+            volume += total / 10 ** decimals
+        return volume
+
+    def _node_state(self, address):
+        attrs = self.G.nodes[address]
+        return {key: attrs.get(key) for key in ("size", "title", "type", "volume")}
+
+    @staticmethod
+    def _put_record(records, positions, key, record):
+        position = positions.get(key)
+        if position is None:
+            positions[key] = len(records)
+            records.append(record)
+        else:
+            records[position] = record
+
+    def export_json(self, output_file):
+        """유지 중인 내보내기 데이터를 바로 저장 (그래프를 다시 순회하지 않음)"""
+        return write_graph_data(self.graph_data, output_file)
+
+    def visualize(self, output_file, debug=False):
+        """현재 그래프를 HTML로 렌더링 (visualize_graph가 그래프를 수정하므로 복사본 사용)"""
+        return visualize_graph(self.G.copy(), output_file, debug)
+
+
+def apply_graph_delta(graph_data, delta):
+    """
+    export_graph_to_json 형식의 graph_data에 delta를 제자리 반영
+
+    전체 재빌드 없이 뷰어 등에서 보관 중인 그래프 데이터를 갱신할 때 사용
+    """
+    node_positions = {node["id"]: position for position, node in enumerate(graph_data["nodes"])}
+    edge_positions = {(edge["from"], edge["to"]): position for position, edge in enumerate(graph_data["edges"])}
+
+    for record in delta["nodes_added"] + delta["nodes_updated"]:
+        IncrementalGraphBuilder._put_record(graph_data["nodes"], node_positions, record["id"], record)
+    for record in delta["edges_added"] + delta["edges_updated"]:
+        IncrementalGraphBuilder._put_record(
+            graph_data["edges"], edge_positions, (record["from"], record["to"]), record)
+
+    if delta.get("patterns_added"):
+        graph_data.setdefault("patterns", []).extend(delta["patterns_added"])
+    if delta.get("balance_deltas_updated"):
+        # raw_delta가 0이 된 항목은 제거하고 balance_delta_records와 같이 (주소, 토큰) 순으로 정렬
+        balances = {(record["address"], record["token"], record["decimals"]): record
+                    for record in graph_data.get("balance_deltas", [])}
+        for record in delta["balance_deltas_updated"]:
+            key = (record["address"], record["token"], record["decimals"])
+            if int(record["raw_delta"]):
+                balances[key] = record
+            else:
+                balances.pop(key, None)
+        graph_data["balance_deltas"] = [record for _, record in sorted(
+            balances.items(), key=lambda item: tuple(map(str, item[0])))]
+
+    return graph_data
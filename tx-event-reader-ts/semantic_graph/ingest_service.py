@@ -0,0 +1,487 @@
+"""
+decoded_logs / logs 디렉토리를 감시하면서 새 트랜잭션의 그래프를 계속 만드는 asyncio 서비스
+
+트랜잭션마다 Python 인터프리터를 새로 띄우지 않도록 networkx / pandas / pyvis를 import 하고
+semantic 규칙 / ABI 인덱스를 컴파일한 워커 프로세스 풀을 계속 재사용함.
+
+- 감시: 디렉토리를 주기적으로 스캔하고 (크기, mtime)이 debounce 시간 동안 바뀌지 않은 파일만 처리
+  (TypeScript 디코더가 아직 쓰고 있는 파일을 읽지 않기 위함). 로컬 소켓으로 파일 경로를 한 줄씩 넣을 수도 있음
+- 중복: 작업은 트랜잭션(tx_<hash>) 단위로 큐에 들어가고, 두 디렉토리에 같은 트랜잭션이 있으면 디코딩 된 입력을 사용함.
+  같은 트랜잭션의 빌드 / 출력 / GraphStore 저장은 동시에 일어나지 않음
+- backpressure: 작업 큐 크기가 max_pending으로 제한되어 있어서 큐가 가득 차면 스캐너 / 소켓 입력이 대기함
+- 동시성: 워커 수만큼의 소비자 task가 프로세스 풀에 그래프 빌드를 맡기고, 결과 그래프 파일 / HTML은
+  이벤트 루프를 막지 않도록 스레드에서 임시 파일에 쓴 뒤 os.replace로 교체함
+
+실행 예:
+    python ingest_service.py --decoded-dir ../decoded_logs --logs-dir ../logs -o ../output/graphs --html
+    echo ../decoded_logs/tx_<hash>.json | nc -U /tmp/semantic_graph.sock   (--socket /tmp/semantic_graph.sock)
+"""
+import argparse
+import asyncio
+import os
+import signal
+import tempfile
+import time
+import traceback
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from address_labels import load_address_labels
+from extract_semantic import (
+    block_number,
+    collect_transaction_graph,
+    compile_semantic_index,
+    graph_from_parts,
+    graph_parts_to_dict,
+    graph_to_dict,
+    iter_transaction_events,
+    load_semantic_event,
+    transfer_records,
+)
+from graph_formats import DEFAULT_GRAPH_FORMAT, GRAPH_FORMATS, graph_output_suffix, serialize_graph_data
+from graph_store import GraphStore
+from html_emitter import copy_html_resources, render_graph_page
+from log_decoder import ABI_DIR, build_event_index, decode_logs, load_raw_logs, load_token_metadata
+from sequence_patterns import compile_sequence_patterns
+
+RULES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.5
+
+# 입력 종류: decoded_logs/tx_<hash>.json(l) 또는 logs/<hash>.json (raw receipt 로그)
+DECODED = "decoded"
+RAW = "raw"
+
+# 워커 프로세스별 컴파일된 규칙 / ABI 인덱스 (initializer에서 설정)
+_worker_semantic_index = None
+_worker_sequence_matcher = None
+_worker_event_index = None
+_worker_token_metadata = None
+
+
+def _init_worker(semantic_events_list, abi_dir=None, tokens_path=None, labels_path=None):
+    global _worker_semantic_index, _worker_sequence_matcher, _worker_event_index, _worker_token_metadata
+    label_registry = load_address_labels(labels_path) if labels_path else None
+    _worker_semantic_index = compile_semantic_index(semantic_events_list, label_registry)
+    _worker_sequence_matcher = compile_sequence_patterns(semantic_events_list)
+    if abi_dir:
+        _worker_event_index = build_event_index(abi_dir)
+        _worker_token_metadata = load_token_metadata(tokens_path)
+
+
+def output_base_name(file_path, kind):
+    """입력 파일에 대응하는 출력 이름 (tx_<hash>)"""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    if kind == RAW and not name.startswith("tx_"):
+        name = "tx_" + name
+    return name
+
+
+def build_artifacts(file_path, kind, render_html=False, graph_format=DEFAULT_GRAPH_FORMAT, with_transfers=False):
+    """
+    워커 프로세스에서 트랜잭션 하나의 그래프를 만들고 출력할 그래프 파일 내용(bytes, graph_format 형식) / HTML 문자열을 반환
+
+    파일 쓰기는 서비스(이벤트 루프) 쪽에서 비동기로 수행함.
+    with_transfers=True이면 GraphStore에 저장할 개별 transfer 목록(transfer_records)도 "transfers"에 담음.
+    "block"은 입력의 blockNumber (raw 로그는 receipt 로그의 값, 없으면 None)
+    """
+    started = time.perf_counter()
+    if kind == RAW:
+        if _worker_event_index is None:
+            raise ValueError("raw logs require the worker to be started with an ABI directory")
+        logs = load_raw_logs(file_path)
+        header = decode_logs(logs, _worker_event_index, token_metadata=_worker_token_metadata)
+        events = header["events"]
+    else:
+        # blockNumber 등 events 외의 최상위 키 (이벤트를 모두 읽은 뒤 채워짐)
+        header = {}
+        events = iter_transaction_events(file_path, header=header)
+
+    parts = collect_transaction_graph(events, _worker_semantic_index, sequence_matcher=_worker_sequence_matcher)
+    # GraphStore에는 같은 주소 쌍으로 합쳐지기 전의 개별 transfer를 저장
+    transfers = transfer_records(parts) if with_transfers else None
+    html = None
+    if render_html:
+        G = graph_from_parts(parts)
+        # graph_network_data 내부에서 prune_graph 수행 (공유 lib/를 참조하는 템플릿 페이지)
+        html = render_graph_page(G)
+        graph_data = graph_to_dict(G)
+    else:
+        # HTML이 필요 없으면 networkx 그래프를 만들지 않고 내보내기 데이터를 바로 생성
+        graph_data = graph_parts_to_dict(parts)
+
+    return {
+        "graph": serialize_graph_data(graph_data, graph_format),
+        "html": html,
+        "transfers": transfers,
+        "block": block_number(header.get("blockNumber")),
+        "nodes": len(graph_data["nodes"]),
+        "edges": len(graph_data["edges"]),
+        "build_elapsed": time.perf_counter() - started,
+    }
+
+
+def write_text_atomic(path, text):
+    """임시 파일에 쓴 뒤 교체 (읽는 쪽이 쓰다 만 파일을 보지 않도록). text가 bytes면 그대로 씀"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.splitext(path)[1])
+    try:
+        with (os.fdopen(fd, 'wb') if isinstance(text, bytes) else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def scan_directory(directory, kind):
+    """디렉토리의 입력 파일과 (크기, mtime) 서명 반환"""
+    files = {}
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        name = entry.name
+        if name.startswith(".") or name.endswith(("_graph.json", "_graph.jsonl")):
+            continue
+        if kind == DECODED and not (name.startswith("tx_") and name.endswith((".json", ".jsonl"))):
+            continue
+        if kind == RAW and not name.endswith(".json"):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class IngestService:
+    """디렉토리 감시 / 소켓 입력 -> 작업 큐 -> 프로세스 풀 -> 비동기 파일 쓰기"""
+
+    def __init__(self, output_dir=".", decoded_dir=None, logs_dir=None, rules_dir=RULES_DIR, abi_dir=ABI_DIR,
+                 tokens_path=None, workers=None, max_pending=None, render_html=False, poll_interval=DEFAULT_POLL_INTERVAL,
+                 debounce=DEFAULT_DEBOUNCE, socket_path=None, store_path=None, skip_existing=True,
+                 graph_format=DEFAULT_GRAPH_FORMAT, labels_path=None):
+        self.output_dir = output_dir
+        self.watch_dirs = [(path, kind) for path, kind in ((decoded_dir, DECODED), (logs_dir, RAW)) if path]
+        self.rules_dir = rules_dir
+        # 소켓으로 raw 로그 경로가 들어올 수도 있으므로 --logs-dir이 없어도 워커에 ABI 인덱스를 만듦
+        self.abi_dir = abi_dir
+        self.tokens_path = tokens_path
+        self.labels_path = labels_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.render_html = render_html
+        self.graph_format = graph_format
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.socket_path = socket_path
+        self.store_path = store_path
+        self.skip_existing = skip_existing
+
+        self.queue = None
+        self.stats = {"processed": 0, "failed": 0, "skipped": 0, "started": None}
+        # 경로 -> 처리했거나 큐에 넣은 입력의 서명 (같은 내용은 다시 처리하지 않음)
+        self._dispatched = {}
+        # 큐는 트랜잭션(출력 이름 tx_<hash>) 단위: 이름 -> 큐에서 기다리는 (경로, 종류)
+        self._queued = {}
+        # 디코딩 된 입력이 있는 트랜잭션 이름 (같은 트랜잭션의 raw 입력은 건너뜀)
+        self._decoded_names = set()
+        # 이름 -> 빌드 중인 작업의 lock (같은 출력 파일 / GraphStore 행을 동시에 쓰지 않도록)
+        self._build_locks = weakref.WeakValueDictionary()
+        # 경로 -> (서명, 처음 관찰한 시각) : debounce 대기 중인 파일
+        self._settling = {}
+        self._stopping = None
+        self._pool = None
+        self._pool_initargs = None
+        self._store = None
+        self._store_executor = None
+
+    def _is_up_to_date(self, file_path, kind):
+        """이미 만들어진 그래프 파일이 입력보다 새로우면 재시작 시 건너뜀"""
+        output_graph = os.path.join(self.output_dir,
+                                    output_base_name(file_path, kind) + graph_output_suffix(self.graph_format))
+        try:
+            return os.path.getmtime(output_graph) >= os.path.getmtime(file_path)
+        except OSError:
+            return False
+
+    async def enqueue(self, file_path, kind, signature=None):
+        """
+        작업 추가 (큐가 가득 차면 자리가 날 때까지 대기 = backpressure)
+
+        같은 내용(크기, mtime)으로 이미 처리했거나 큐에 있는 파일이면 False 반환.
+        --decoded-dir과 --logs-dir에 같은 트랜잭션이 있으면 같은 출력 파일에 쓰므로 작업은 트랜잭션 단위로 큐에 넣음:
+        디코딩 된 입력이 있는 트랜잭션의 raw 입력은 건너뛰고 (False), 이미 큐에 있는 트랜잭션은 입력만 바꿈
+        """
+        if signature is None:
+            stat = await asyncio.to_thread(os.stat, file_path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+        if self._dispatched.get(file_path) == signature:
+            return False
+        self._dispatched[file_path] = signature
+
+        name = output_base_name(file_path, kind)
+        if kind == RAW and name in self._decoded_names:
+            return False
+        if kind == DECODED:
+            self._decoded_names.add(name)
+        queued = name in self._queued
+        self._queued[name] = (file_path, kind)
+        if not queued:
+            await self.queue.put(name)
+        return True
+
+    async def watch(self, directory, kind):
+        """디렉토리를 주기적으로 스캔해서 debounce가 지난 새 / 변경된 파일을 큐에 추가"""
+        first_scan = True
+        while not self._stopping.is_set():
+            files = await asyncio.to_thread(scan_directory, directory, kind)
+            now = time.monotonic()
+            for file_path, signature in sorted(files.items()):
+                if self._dispatched.get(file_path) == signature:
+                    continue
+                if first_scan and self.skip_existing and self._is_up_to_date(file_path, kind):
+                    self._dispatched[file_path] = signature
+                    self.stats["skipped"] += 1
+                    continue
+                if self.debounce > 0:
+                    # 처음 보거나 아직 쓰는 중인 파일은 서명이 debounce 동안 유지되는지 다음 스캔에서 확인
+                    settling = self._settling.get(file_path)
+                    if settling is None or settling[0] != signature:
+                        self._settling[file_path] = (signature, now)
+                        continue
+                    if now - settling[1] < self.debounce:
+                        continue
+                    self._settling.pop(file_path)
+                await self.enqueue(file_path, kind, signature)
+            for file_path in set(self._settling) - set(files):
+                self._settling.pop(file_path)
+            first_scan = False
+            try:
+                # debounce가 끝나는 파일을 늦지 않게 확인하도록 둘 중 짧은 간격으로 스캔
+                interval = min(self.poll_interval, self.debounce) if self.debounce > 0 else self.poll_interval
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def handle_client(self, reader, writer):
+        """소켓 클라이언트가 보낸 파일 경로를 한 줄씩 큐에 추가하고 결과를 한 줄씩 응답"""
+        try:
+            while not self._stopping.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                file_path = line.decode("utf-8").strip()
+                if not file_path:
+                    continue
+                if not os.path.isfile(file_path):
+                    writer.write(f"error: file '{file_path}' not found\n".encode("utf-8"))
+                else:
+                    kind = DECODED if os.path.basename(file_path).startswith("tx_") else RAW
+                    queued = await self.enqueue(file_path, kind)
+                    writer.write(f"{'queued' if queued else 'unchanged'} {file_path}\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def consume(self):
+        """큐에서 작업을 꺼내 프로세스 풀에서 빌드하고 결과를 비동기로 저장"""
+        loop = asyncio.get_running_loop()
+        while True:
+            name = await self.queue.get()
+            file_path, kind = self._queued.pop(name)
+            started = time.perf_counter()
+            # 같은 트랜잭션이 빌드 중이면 (큐에서 꺼낸 뒤 다시 들어온 경우) 끝날 때까지 기다림
+            lock = self._build_locks.get(name)
+            if lock is None:
+                lock = self._build_locks[name] = asyncio.Lock()
+            try:
+                async with lock:
+                    artifacts = await self.build(file_path, kind)
+                    outputs = await self.write_artifacts(file_path, kind, artifacts)
+                    if self._store is not None:
+                        await loop.run_in_executor(self._store_executor, self._store_transfers, file_path, kind,
+                                                   artifacts["transfers"], artifacts["block"])
+                self.stats["processed"] += 1
+                print(f"Built {os.path.basename(file_path)}: {artifacts['nodes']} nodes, {artifacts['edges']} edges "
+                      f"({time.perf_counter() - started:.2f}s) -> {', '.join(outputs)}")
+            except BrokenProcessPool as e:
+                self.stats["failed"] += 1
+                # 단독 워커에서도 죽은 입력은 다시 넣어도 같은 결과이므로 내용이 바뀔 때까지 재시도하지 않음
+                # (_dispatched의 서명을 유지)
+                print(f"error: worker crashed while building graph from '{file_path}': {e}")
+            except Exception as e:
+                self.stats["failed"] += 1
+                # 실패한 입력은 내용이 바뀌면 다시 시도
+                self._dispatched.pop(file_path, None)
+                print(f"error: failed to build graph from '{file_path}': {type(e).__name__}: {e}")
+                traceback.print_exc()
+            finally:
+                self.queue.task_done()
+
+    async def build(self, file_path, kind):
+        """
+        프로세스 풀에서 build_artifacts 실행
+
+        워커가 비정상 종료(OOM, segfault 등)하면 풀 전체가 BrokenProcessPool이 되어 이후 작업도 모두 실패하므로 풀을 새로 만듦.
+        어떤 작업이 워커를 죽였는지는 알 수 없으므로 함께 실패한 작업은 각자 단독 워커 프로세스에서 한 번 더 시도하고,
+        거기서도 죽으면 BrokenProcessPool을 그대로 올림
+        """
+        loop = asyncio.get_running_loop()
+        args = (build_artifacts, file_path, kind, self.render_html, self.graph_format, self._store is not None)
+        pool = self._pool
+        try:
+            return await loop.run_in_executor(pool, *args)
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+        print(f"warning: worker pool broke while building '{file_path}', retrying in a separate worker")
+        isolated = ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=self._pool_initargs)
+        try:
+            return await loop.run_in_executor(isolated, *args)
+        finally:
+            isolated.shutdown(wait=False)
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=self._pool_initargs)
+
+    def _restart_pool(self, broken_pool):
+        """깨진 풀을 정리하고 새로 만듦 (여러 소비자가 같은 풀의 실패를 받아도 한 번만 교체)"""
+        if self._pool is not broken_pool:
+            return
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+        self._start_pool()
+
+    async def write_artifacts(self, file_path, kind, artifacts):
+        base = os.path.join(self.output_dir, output_base_name(file_path, kind))
+        writes = [asyncio.to_thread(write_text_atomic, base + graph_output_suffix(self.graph_format),
+                                    artifacts["graph"])]
+        if artifacts["html"] is not None:
+            writes.append(asyncio.to_thread(write_text_atomic, base + "_graph.html", artifacts["html"]))
+        return await asyncio.gather(*writes)
+
+    def _open_store(self):
+        # sqlite 연결은 만든 스레드에서만 사용할 수 있으므로 store 전용 스레드에서 생성 / 사용
+        self._store = GraphStore(self.store_path)
+
+    def _store_transfers(self, file_path, kind, transfers, block):
+        transaction = output_base_name(file_path, kind)[len("tx_"):]
+        self._store.add_edge_records(transfers, transaction, block)
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, once=False):
+        """
+        서비스 실행 (stop() 또는 SIGINT / SIGTERM까지)
+
+        once=True이면 현재 디렉토리에 있는 파일만 처리하고 종료
+        """
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self._stopping = asyncio.Event()
+        self.stats["started"] = time.time()
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.render_html:
+            await asyncio.to_thread(copy_html_resources, self.output_dir)
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        semantic_events_list = load_semantic_event(self.rules_dir)
+        self._pool_initargs = (semantic_events_list, self.abi_dir, self.tokens_path, self.labels_path)
+        self._start_pool()
+        if self.store_path:
+            self._store_executor = ThreadPoolExecutor(max_workers=1)
+            await loop.run_in_executor(self._store_executor, self._open_store)
+
+        consumers = [asyncio.create_task(self.consume()) for _ in range(self.workers)]
+        server = None
+        try:
+            if once:
+                for directory, kind in self.watch_dirs:
+                    for file_path, signature in sorted((await asyncio.to_thread(scan_directory, directory, kind)).items()):
+                        if self.skip_existing and self._is_up_to_date(file_path, kind):
+                            self.stats["skipped"] += 1
+                            continue
+                        await self.enqueue(file_path, kind, signature)
+            else:
+                if self.socket_path:
+                    if os.path.exists(self.socket_path):
+                        os.remove(self.socket_path)
+                    server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+                    print(f"Listening for transaction files on {self.socket_path}")
+                watchers = [asyncio.create_task(self.watch(directory, kind)) for directory, kind in self.watch_dirs]
+                print(f"Watching {', '.join(directory for directory, _ in self.watch_dirs) or 'nothing'} "
+                      f"with {self.workers} workers (max {self.max_pending} pending)")
+                await self._stopping.wait()
+                for watcher in watchers:
+                    watcher.cancel()
+                await asyncio.gather(*watchers, return_exceptions=True)
+
+            # 큐에 남은 작업은 끝까지 처리
+            await self.queue.join()
+        finally:
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+                if os.path.exists(self.socket_path):
+                    os.remove(self.socket_path)
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            self._pool.shutdown(cancel_futures=True)
+            if self._store_executor is not None:
+                await loop.run_in_executor(self._store_executor, self._store.close)
+                self._store_executor.shutdown()
+
+        print(f"Ingest service stopped: {self.stats['processed']} built, {self.stats['failed']} failed, "
+              f"{self.stats['skipped']} up to date")
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch decoded / raw logs and build semantic graphs continuously")
+    parser.add_argument("--decoded-dir", default=None, help="directory of decoded logs (tx_*.json) to watch")
+    parser.add_argument("--logs-dir", default=None, help="directory of raw receipt logs (<hash>.json) to watch")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for graph outputs")
+    parser.add_argument("--rules-dir", default=RULES_DIR, help="directory of semantic rule JSON files")
+    parser.add_argument("--abi-dir", default=ABI_DIR, help="directory of ABI JSON files (raw logs)")
+    parser.add_argument("--tokens", default=None, help="JSON file of token metadata by address (raw logs)")
+    parser.add_argument("--labels", default=None,
+                        help="JSON / CSV file of address labels; dispatch protocol rules on the emitter's label")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--max-pending", type=int, default=None, help="maximum number of queued files")
+    parser.add_argument("--html", action="store_true", help="also render HTML graphs")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="seconds between scans")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="seconds a file must stay unchanged before it is processed")
+    parser.add_argument("--socket", default=None, help="also accept file paths (one per line) on this unix socket")
+    parser.add_argument("--format", default=DEFAULT_GRAPH_FORMAT, choices=GRAPH_FORMATS, help="graph export format")
+    parser.add_argument("--store", default=None, help="append graph edges to this SQLite graph store")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild graphs that are already up to date")
+    parser.add_argument("--once", action="store_true", help="process the current files and exit")
+    args = parser.parse_args()
+
+    if not args.decoded_dir and not args.logs_dir and not args.socket:
+        parser.error("nothing to watch: pass --decoded-dir, --logs-dir or --socket")
+
+    service = IngestService(args.output_dir, args.decoded_dir, args.logs_dir, args.rules_dir, args.abi_dir,
+                            args.tokens, args.workers, args.max_pending, args.html, args.poll_interval,
+                            args.debounce, args.socket, args.store, not args.rebuild, args.format, args.labels)
+    return asyncio.run(service.run(once=args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+semantic 파이프라인 계측 (단계별 시간, 카운터, 선택적 cProfile / tracemalloc)
+
+debug print 대신 실행마다 기계가 읽을 수 있는 리포트(dict / JSON)를 만듦.
+단계 시간은 perf_counter 두 번, 카운터는 dict 덧셈 한 번이라 batch 작업에서 켜 둬도 됨.
+hot loop(이벤트 단위)에서는 지역 변수로 모아 두었다가 마지막에 한 번만 반영함.
+이벤트 루프는 기본적으로 "scan" 단계 하나로 재고, detailed=True이면 이벤트마다
+parse / extract / sequence 시간을 나눠 잼 (이벤트당 perf_counter 여러 번이라 수 % ~ 십수 % 느려짐).
+
+사용 예:
+    instrumentation = Instrumentation()
+    with instrumentation.stage("load"):
+        data = load_transaction_data(path)
+    G, _ = build_transaction_graph(data, rules, instrumentation=instrumentation)
+    write_report(instrumentation.report(), "timing.json")
+"""
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# cProfile 리포트에 남길 함수 수
+PROFILE_TOP_FUNCTIONS = 25
+
+
+class Instrumentation:
+    """실행 하나에 대한 단계별 시간 / 카운터 수집기"""
+
+    enabled = True
+
+    def __init__(self, name=None, profile=False, trace_memory=False, detailed=False):
+        self.name = name
+        self.detailed = detailed
+        self.stages = {}
+        self.counters = {}
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self._profiler = None
+        self._started = time.perf_counter()
+        self._tracemalloc_started = False
+
+        if trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc_started = True
+        if profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    @contextmanager
+    def stage(self, name):
+        """with 블록의 실행 시간을 name 단계에 누적 (trace_memory이면 블록 동안의 메모리 peak도 기록)"""
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                stage = self.stages[name]
+                stage["peak_bytes"] = max(stage.get("peak_bytes", 0), peak)
+
+    def add_time(self, name, seconds, calls=1):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"seconds": 0.0, "calls": 0}
+        stage["seconds"] += seconds
+        stage["calls"] += calls
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_many(self, values, prefix=""):
+        """{이름: 값} 카운터를 한 번에 누적 (prefix는 "rule_file." 처럼 이름 앞에 붙임)"""
+        for name, value in values.items():
+            self.count(prefix + name, value)
+
+    def stop(self):
+        """cProfile / tracemalloc 종료 (report()에서 자동으로 호출됨)"""
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._tracemalloc_started:
+            import tracemalloc
+            self.counters["memory_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._tracemalloc_started = False
+
+    def report(self):
+        """기계가 읽을 수 있는 리포트 dict"""
+        self.stop()
+        report = {
+            "name": self.name,
+            "wall_seconds": time.perf_counter() - self._started,
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+        if self._profiler is not None:
+            report["profile"] = profile_top_functions(self._profiler)
+        return report
+
+
+class NullInstrumentation:
+    """계측을 끈 경우의 no-op 구현 (호출하는 쪽에서 None 검사를 하지 않도록)"""
+
+    enabled = False
+    detailed = False
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def count_many(self, values, prefix=""):
+        pass
+
+    def stop(self):
+        pass
+
+    def report(self):
+        return None
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+def profile_top_functions(profiler, limit=PROFILE_TOP_FUNCTIONS):
+    """cProfile 결과에서 누적 시간 상위 함수 목록"""
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": calls,
+            "own_seconds": own_time,
+            "cumulative_seconds": cumulative_time,
+        })
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:limit]
+
+
+def merge_reports(reports, name=None):
+    """여러 실행의 리포트를 합산 (batch 요약용, profile 항목은 합치지 않음)"""
+    merged = {"name": name, "runs": 0, "wall_seconds": 0.0, "stages": {}, "counters": {}}
+    for report in reports:
+        if not report:
+            continue
+        merged["runs"] += 1
+        merged["wall_seconds"] += report.get("wall_seconds", 0.0)
+        for stage_name, stage in report.get("stages", {}).items():
+            target = merged["stages"].setdefault(stage_name, {"seconds": 0.0, "calls": 0})
+            target["seconds"] += stage["seconds"]
+            target["calls"] += stage["calls"]
+            if "peak_bytes" in stage:
+                target["peak_bytes"] = max(target.get("peak_bytes", 0), stage["peak_bytes"])
+        for counter_name, value in report.get("counters", {}).items():
+            if counter_name.endswith("peak_bytes"):
+                merged["counters"][counter_name] = max(merged["counters"].get(counter_name, 0), value)
+            else:
+                merged["counters"][counter_name] = merged["counters"].get(counter_name, 0) + value
+    return merged
+
+
+def format_report(report):
+    """리포트를 사람이 읽을 수 있는 표 문자열로 변환"""
+    lines = [f"Timing report{' for ' + report['name'] if report.get('name') else ''} "
+             f"({report['wall_seconds']:.3f}s wall)"]
+    for name, stage in sorted(report["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True):
+        line = f"  {name:<24} {stage['seconds'] * 1000:>10.2f} ms  {stage['calls']:>8} calls"
+        if "peak_bytes" in stage:
+            line += f"  peak {stage['peak_bytes'] / 1024:.0f} KiB"
+        lines.append(line)
+    for name, value in sorted(report["counters"].items()):
+        lines.append(f"  {name:<40} {value}")
+    for row in report.get("profile", [])[:10]:
+        lines.append(f"  {row['cumulative_seconds'] * 1000:>10.2f} ms  {row['function']}")
+    return "\n".join(lines)
+
+
+def write_report(report, output_file):
+    """리포트를 JSON 파일로 저장"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return output_file
@@ -0,0 +1,574 @@
+"""
+원시 로그(logs/<hash>.json) 디코더
+
+abis/*.json 전체에서 topic0(이벤트 시그니처 해시) -> 이벤트 정의 인덱스를 한 번 만들어 두고,
+receipt 로그(address / topics / data)를 decodeLogs.ts와 같은 events / inputs 구조로 바로 디코딩함.
+결과 이벤트는 파일로 저장하지 않고 build_transaction_graph에 그대로 넘길 수 있음.
+
+실행 예: python log_decoder.py ../logs/<hash>.json --graph
+"""
+import argparse
+import glob
+import json
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+
+try:
+    from Crypto.Hash import keccak as _pycryptodome_keccak
+except ImportError:
+    _pycryptodome_keccak = None
+
+ABI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "abis")
+
+# 주소(소문자) -> 토큰 메타데이터. decodeLogs.ts는 RPC로 조회하지만 여기서는 오프라인 테이블을 사용
+DEFAULT_TOKEN_METADATA = {
+    "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2": {"symbol": "WETH", "decimals": 18},
+    "0x2260fac5e5542a773aa44fbcfedf7c193bc2c599": {"symbol": "WBTC", "decimals": 8},
+    "0x6b175474e89094c44da98b954eedeac495271d0f": {"symbol": "DAI", "decimals": 18},
+    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48": {"symbol": "USDC", "decimals": 6},
+    "0xdac17f958d2ee523a2206206994597c13d831ec7": {"symbol": "USDT", "decimals": 6},
+}
+
+# 이름으로 추론하는 기본 토큰 (decodeLogs.ts의 defaultTokenMetadata와 같은 순서)
+NAMED_TOKEN_METADATA = [
+    ("eth", {"symbol": "ETH", "decimals": 18}),
+    ("weth", {"symbol": "WETH", "decimals": 18}),
+    ("dai", {"symbol": "DAI", "decimals": 18}),
+    ("usdc", {"symbol": "USDC", "decimals": 6}),
+    ("usdt", {"symbol": "USDT", "decimals": 6}),
+    ("wbtc", {"symbol": "WBTC", "decimals": 8}),
+]
+
+# uint 입력 이름에 이 키워드가 있으면 토큰 금액으로 취급
+AMOUNT_KEYWORDS = ("amount", "value", "wad", "fee", "token", "price", "bought", "sold", "rate", "borrow")
+
+_WORD = 32
+
+
+# ---------------------------------------------------------------------------
+# keccak256 (pycryptodome이 없으면 순수 Python 구현 사용. 시그니처 / 체크섬 계산에만 쓰임)
+# ---------------------------------------------------------------------------
+
+_KECCAK_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+# lane (x + 5 * y) 별 회전 수
+_KECCAK_ROTATIONS = [
+    0, 1, 62, 28, 27,
+    36, 44, 6, 55, 20,
+    3, 10, 43, 25, 39,
+    41, 45, 15, 21, 8,
+    18, 2, 61, 56, 14,
+]
+_LANE_MASK = (1 << 64) - 1
+_KECCAK_RATE = 136
+
+
+def _rotate_left(value, shift):
+    return ((value << shift) | (value >> (64 - shift))) & _LANE_MASK if shift else value
+
+
+def _keccak_f(state):
+    for round_constant in _KECCAK_ROUND_CONSTANTS:
+        # theta
+        columns = [state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20] for x in range(5)]
+        mix = [columns[(x - 1) % 5] ^ _rotate_left(columns[(x + 1) % 5], 1) for x in range(5)]
+        state = [lane ^ mix[i % 5] for i, lane in enumerate(state)]
+        # rho + pi
+        moved = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                moved[y + 5 * ((2 * x + 3 * y) % 5)] = _rotate_left(state[x + 5 * y], _KECCAK_ROTATIONS[x + 5 * y])
+        # chi + iota
+        state = [moved[i] ^ (~moved[(i + 1) % 5 + i - i % 5] & moved[(i + 2) % 5 + i - i % 5]) for i in range(25)]
+        state[0] ^= round_constant
+    return state
+
+
+def _keccak256_python(data):
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(bytes(-len(padded) % _KECCAK_RATE))
+    padded[-1] |= 0x80
+
+    state = [0] * 25
+    for start in range(0, len(padded), _KECCAK_RATE):
+        block = padded[start:start + _KECCAK_RATE]
+        for lane in range(_KECCAK_RATE // 8):
+            state[lane] ^= int.from_bytes(block[lane * 8:lane * 8 + 8], "little")
+        state = _keccak_f(state)
+
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+def keccak256(data):
+    """Ethereum keccak256 해시 (bytes)"""
+    if _pycryptodome_keccak is not None:
+        return _pycryptodome_keccak.new(digest_bits=256, data=data).digest()
+    return _keccak256_python(data)
+
+
+@lru_cache(maxsize=65536)
+def to_checksum_address(address):
+    """EIP-55 체크섬 주소 (ethers.getAddress와 같은 결과)"""
+    hex_address = address.lower()[2:]
+    digest = keccak256(hex_address.encode("ascii")).hex()
+    return "0x" + "".join(char.upper() if int(digest[i], 16) >= 8 else char for i, char in enumerate(hex_address))
+
+
+# ---------------------------------------------------------------------------
+# ABI 타입 / 이벤트 인덱스
+# ---------------------------------------------------------------------------
+
+def compile_abi_type(abi_input):
+    """
+    ABI input 정의를 디코딩용 타입 튜플로 변환
+
+    ("uint", bits) / ("int", bits) / ("address",) / ("bool",) / ("fixed_bytes", n) / ("bytes",) / ("string",)
+    / ("tuple", [컴포넌트 타입]) / ("array", 원소 타입, 길이 또는 None)
+    """
+    type_name = abi_input["type"]
+    if type_name.endswith("]"):
+        base, _, length = type_name[:-1].rpartition("[")
+        element = compile_abi_type(dict(abi_input, type=base))
+        return ("array", element, int(length) if length else None)
+    if type_name == "tuple":
+        return ("tuple", [compile_abi_type(component) for component in abi_input.get("components", [])])
+    if type_name in ("address", "bool", "string", "bytes"):
+        return (type_name,)
+    if type_name.startswith("uint"):
+        return ("uint", int(type_name[4:] or 256))
+    if type_name.startswith("int"):
+        return ("int", int(type_name[3:] or 256))
+    if type_name.startswith("bytes"):
+        return ("fixed_bytes", int(type_name[5:]))
+    raise ValueError(f"unsupported ABI type: {type_name}")
+
+
+def canonical_type(abi_input):
+    """시그니처에 쓰이는 타입 문자열 (tuple은 컴포넌트 타입으로 펼침)"""
+    type_name = abi_input["type"]
+    if type_name.startswith("tuple"):
+        components = ",".join(canonical_type(component) for component in abi_input.get("components", []))
+        return f"({components}){type_name[len('tuple'):]}"
+    return type_name
+
+
+def event_signature(abi_event):
+    inputs = ",".join(canonical_type(abi_input) for abi_input in abi_event.get("inputs", []))
+    return f"{abi_event['name']}({inputs})"
+
+
+def compile_event_spec(abi_event):
+    """ABI 이벤트 정의를 디코딩 스펙으로 컴파일"""
+    inputs = []
+    for i, abi_input in enumerate(abi_event.get("inputs", [])):
+        inputs.append({
+            "name": abi_input.get("name") or f"arg{i}",
+            "type": abi_input["type"],
+            "abi_type": compile_abi_type(abi_input),
+            "indexed": bool(abi_input.get("indexed")),
+        })
+    signature = event_signature(abi_event)
+    return {
+        "name": abi_event["name"],
+        "signature": signature,
+        "topic0": "0x" + keccak256(signature.encode("utf-8")).hex(),
+        "inputs": inputs,
+        "indexed_count": sum(1 for abi_input in inputs if abi_input["indexed"]),
+    }
+
+
+def _read_abi(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        abi = json.load(f)
+    # Etherscan 응답 형식 ({"result": "[...]"}) 도 허용
+    if isinstance(abi, dict):
+        abi = abi.get("abi", abi.get("result", []))
+        if isinstance(abi, str):
+            abi = json.loads(abi)
+    return abi if isinstance(abi, list) else []
+
+
+def build_event_index(abi_dir=ABI_DIR):
+    """
+    abis/*.json 으로부터 이벤트 인덱스 생성
+
+    반환값:
+        {"by_topic": {topic0: [스펙, ...]},          # 모든 ABI의 이벤트 (시그니처 + indexed 구성이 같으면 하나만 유지)
+         "by_address": {주소(소문자): {topic0: 스펙}}} # 해당 주소 ABI에 정의된 이벤트
+    파일 이름(주소)은 대소문자를 구분하지 않으며 같은 주소의 ABI는 합쳐짐
+    """
+    by_topic = {}
+    by_address = {}
+    seen = set()
+
+    for file_path in sorted(glob.glob(os.path.join(abi_dir, "*.json"))):
+        address = os.path.splitext(os.path.basename(file_path))[0].lower()
+        try:
+            abi = _read_abi(file_path)
+        except (OSError, ValueError) as e:
+            print(f"warning: failed to load ABI '{file_path}': {e}")
+            continue
+
+        address_events = by_address.setdefault(address, {})
+        for item in abi:
+            if item.get("type") != "event" or item.get("anonymous"):
+                continue
+            try:
+                spec = compile_event_spec(item)
+            except (KeyError, ValueError) as e:
+                print(f"warning: skipping event in '{file_path}': {e}")
+                continue
+
+            address_events.setdefault(spec["topic0"], spec)
+            layout = (spec["topic0"], tuple((item["name"], item["indexed"]) for item in spec["inputs"]))
+            if layout not in seen:
+                seen.add(layout)
+                by_topic.setdefault(spec["topic0"], []).append(spec)
+
+    return {"by_topic": by_topic, "by_address": by_address}
+
+
+def find_event_spec(event_index, address, topics):
+    """
+    로그에 맞는 이벤트 스펙 조회
+
+    로그 주소의 ABI를 우선 사용하고, 없으면 topic 수(indexed 입력 수)가 맞는 다른 ABI의 정의를 사용함
+    (프록시 컨트랙트처럼 자신의 ABI가 없는 경우)
+    """
+    if not topics:
+        return None
+    topic0 = topics[0].lower()
+    indexed_count = len(topics) - 1
+
+    spec = event_index["by_address"].get(address.lower(), {}).get(topic0)
+    if spec is not None and spec["indexed_count"] == indexed_count:
+        return spec
+    for spec in event_index["by_topic"].get(topic0, ()):
+        if spec["indexed_count"] == indexed_count:
+            return spec
+    return None
+
+
+# ---------------------------------------------------------------------------
+# ABI 값 디코딩
+# ---------------------------------------------------------------------------
+
+def _is_dynamic(abi_type):
+    kind = abi_type[0]
+    if kind in ("bytes", "string"):
+        return True
+    if kind == "array":
+        return abi_type[2] is None or _is_dynamic(abi_type[1])
+    if kind == "tuple":
+        return any(_is_dynamic(component) for component in abi_type[1])
+    return False
+
+
+def _head_size(abi_type):
+    if _is_dynamic(abi_type):
+        return _WORD
+    if abi_type[0] == "tuple":
+        return sum(_head_size(component) for component in abi_type[1])
+    if abi_type[0] == "array":
+        return abi_type[2] * _head_size(abi_type[1])
+    return _WORD
+
+
+def _read_word(data, offset):
+    word = data[offset:offset + _WORD]
+    if len(word) != _WORD:
+        raise ValueError("ABI data too short")
+    return word
+
+
+def _decode_word(abi_type, word):
+    kind = abi_type[0]
+    if kind == "uint":
+        return int.from_bytes(word, "big")
+    if kind == "int":
+        return int.from_bytes(word, "big", signed=True)
+    if kind == "address":
+        return to_checksum_address("0x" + word[12:].hex())
+    if kind == "bool":
+        return word[-1] != 0
+    if kind == "fixed_bytes":
+        return "0x" + word[:abi_type[1]].hex()
+    raise ValueError(f"not a single-word type: {kind}")
+
+
+def _decode_sequence(abi_types, data, start):
+    """tuple / 배열 원소를 head-tail 인코딩에서 순서대로 디코딩"""
+    values = []
+    offset = start
+    for abi_type in abi_types:
+        if _is_dynamic(abi_type):
+            pointer = int.from_bytes(_read_word(data, offset), "big")
+            values.append(_decode_value(abi_type, data, start + pointer))
+        else:
+            values.append(_decode_value(abi_type, data, offset))
+        offset += _head_size(abi_type)
+    return values
+
+
+def _decode_value(abi_type, data, offset):
+    kind = abi_type[0]
+    if kind in ("bytes", "string"):
+        length = int.from_bytes(_read_word(data, offset), "big")
+        content = data[offset + _WORD:offset + _WORD + length]
+        if len(content) != length:
+            raise ValueError("ABI data too short")
+        return content.decode("utf-8", errors="replace") if kind == "string" else "0x" + content.hex()
+    if kind == "tuple":
+        return _decode_sequence(abi_type[1], data, offset)
+    if kind == "array":
+        length = abi_type[2]
+        if length is None:
+            length = int.from_bytes(_read_word(data, offset), "big")
+            offset += _WORD
+        return _decode_sequence([abi_type[1]] * length, data, offset)
+    return _decode_word(abi_type, _read_word(data, offset))
+
+
+def _decode_topic(abi_type, topic):
+    """indexed 입력 디코딩 (동적 타입은 값 대신 keccak 해시만 topic에 있음)"""
+    if _is_dynamic(abi_type) or abi_type[0] in ("tuple", "array"):
+        return topic.lower()
+    return _decode_word(abi_type, bytes.fromhex(topic[2:]))
+
+
+def value_to_string(value):
+    """ethers의 value.toString()과 같은 문자열 (배열 / tuple은 쉼표로 펼침)"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ",".join(value_to_string(item) for item in value)
+    return str(value)
+
+
+# ---------------------------------------------------------------------------
+# 로그 -> 이벤트
+# ---------------------------------------------------------------------------
+
+def _named_token(name):
+    for keyword, metadata in NAMED_TOKEN_METADATA:
+        if keyword in name:
+            return metadata
+    return None
+
+
+def infer_token_metadata(event_name, input_name, raw_value, candidate_addresses, token_metadata, value_tokens):
+    """
+    decodeLogs.ts와 같은 순서로 금액 입력의 토큰 추론 (입력 이름 -> 이벤트 이름 -> 관련 주소)
+
+    value_tokens는 트랜잭션 안에서 같은 원시 금액이 처음 연결된 토큰 주소 (같은 금액이 여러 이벤트를 거쳐 이동하는 경우)
+    """
+    metadata = _named_token(input_name) or _named_token(event_name.lower())
+    if metadata is None:
+        for address in candidate_addresses:
+            metadata = token_metadata.get(address.lower())
+            if metadata is not None:
+                break
+
+    if value_tokens is not None:
+        token_address = value_tokens.get(raw_value)
+        if token_address is not None:
+            metadata = token_metadata.get(token_address, metadata)
+        else:
+            for address in candidate_addresses:
+                if address.lower() in token_metadata:
+                    value_tokens[raw_value] = address.lower()
+                    break
+    symbol = metadata["symbol"] if metadata else "?"
+    decimals = metadata["decimals"] if metadata else 18
+
+    # Compound cToken의 기초 자산 금액 / Mint의 mintAmount는 기초 자산 단위
+    underlying_amount = any(keyword in input_name for keyword in ("mintamount", "borrowamount", "repayamount"))
+    if symbol.startswith("c") and underlying_amount:
+        symbol = symbol[1:]
+        underlying = _named_token(symbol.lower())
+        decimals = underlying["decimals"] if underlying else 18
+
+    # EthPurchase의 eth_bought는 ETH
+    if event_name == "EthPurchase" and input_name == "eth_bought":
+        symbol, decimals = "ETH", 18
+
+    return symbol, decimals
+
+
+def format_display_value(formatted_value, symbol):
+    text = f"{formatted_value:,.6f}".rstrip("0").rstrip(".")
+    return f"{text} {symbol}"
+
+
+def decode_log(log, event_index, token_metadata=None, value_tokens=None):
+    """
+    원시 로그 하나를 decodeLogs.ts 형식의 이벤트 dict로 디코딩 (ABI를 찾지 못하면 None 반환)
+
+    value_tokens는 같은 트랜잭션의 로그끼리 공유하는 금액 -> 토큰 주소 dict (None이면 사용하지 않음)
+    """
+    if token_metadata is None:
+        token_metadata = DEFAULT_TOKEN_METADATA
+
+    topics = log.get("topics") or []
+    address = log.get("address", "")
+    spec = find_event_spec(event_index, address, topics)
+    if spec is None:
+        return None
+
+    data = log.get("data") or "0x"
+    data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+
+    data_inputs = [item for item in spec["inputs"] if not item["indexed"]]
+    data_values = iter(_decode_sequence([item["abi_type"] for item in data_inputs], data, 0))
+    topic_values = iter(topics[1:])
+
+    values = []
+    for item in spec["inputs"]:
+        if item["indexed"]:
+            values.append(_decode_topic(item["abi_type"], next(topic_values)))
+        else:
+            values.append(next(data_values))
+
+    candidate_addresses = [value for item, value in zip(spec["inputs"], values) if item["type"] == "address"]
+    candidate_addresses.append(address)
+
+    inputs = []
+    for item, value in zip(spec["inputs"], values):
+        input_field = {"name": item["name"], "type": item["type"], "rawValue": value_to_string(value)}
+        name_lower = item["name"].lower()
+
+        if item["type"] == "address":
+            input_field["displayValue"] = value
+        elif item["type"].startswith("uint") and isinstance(value, int) \
+                and any(keyword in name_lower for keyword in AMOUNT_KEYWORDS):
+            symbol, decimals = infer_token_metadata(spec["name"], name_lower, input_field["rawValue"],
+                                                   candidate_addresses, token_metadata, value_tokens)
+            # 정수 / 정수 나눗셈은 정확히 반올림된 float을 반환함
+            formatted_value = value / 10 ** decimals
+            input_field["formattedValue"] = formatted_value
+            input_field["symbol"] = symbol
+            input_field["decimals"] = decimals
+            input_field["displayValue"] = format_display_value(formatted_value, symbol)
+
+        inputs.append(input_field)
+
+    return {
+        "eventIndex": log.get("index", log.get("logIndex")),
+        "name": spec["name"],
+        "address": to_checksum_address(address) if address.startswith("0x") and len(address) == 42 else address,
+        "inputs": inputs,
+    }
+
+
+def iter_decoded_events(logs, event_index, token_metadata=None, debug=False):
+    """
+    로그 목록을 디코딩 된 이벤트로 순서대로 변환 (디코딩 실패한 로그는 건너뜀)
+
+    블록 범위처럼 여러 트랜잭션의 로그가 섞여 있으면 value_tokens는 transactionHash별로 따로 유지함
+    """
+    value_tokens_by_transaction = {}
+    for log in logs:
+        value_tokens = value_tokens_by_transaction.setdefault(log.get("transactionHash"), {})
+        try:
+            event = decode_log(log, event_index, token_metadata, value_tokens)
+        except (ValueError, StopIteration) as e:
+            if debug:
+                print(f"Could not decode log {log.get('index')} from {log.get('address')}: {e}")
+            continue
+        if event is None:
+            if debug:
+                print(f"Could not decode log {log.get('index')} from {log.get('address')}")
+            continue
+        yield event
+
+
+def decode_logs(logs, event_index, tx_hash=None, token_metadata=None, debug=False, vectorized=False):
+    """
+    로그 목록을 decoded_logs/tx_<hash>.json 과 같은 구조로 디코딩
+
+    vectorized=True이면 같은 이벤트 로그를 묶어 NumPy로 디코딩함 (vector_decoder.decode_logs_vectorized 참고).
+    두 경로 모두 금액 -> 토큰 재사용 추론(value_tokens)을 transactionHash별로 수행하므로 결과가 같음
+    (블록 범위 포함, bench/bench_vector_decoder.py로 확인)
+    """
+    if tx_hash is None and logs:
+        tx_hash = logs[0].get("transactionHash")
+    if vectorized:
+        from vector_decoder import decode_logs_vectorized
+        events = decode_logs_vectorized(logs, event_index, token_metadata)
+    else:
+        events = list(iter_decoded_events(logs, event_index, token_metadata, debug))
+    return {
+        "events": events,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "transactionHash": tx_hash,
+        "blockNumber": logs[0].get("blockNumber") if logs else None,
+    }
+
+
+def load_raw_logs(file_path):
+    """logs/<hash>.json (receipt 로그 배열 또는 {"logs": [...]}) 로드"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        logs = json.load(f)
+    if isinstance(logs, dict):
+        logs = logs.get("logs", [])
+    return logs
+
+
+def load_token_metadata(file_path=None):
+    """기본 토큰 테이블에 JSON 파일({주소: {"symbol", "decimals"}})의 항목을 덧붙여 반환"""
+    token_metadata = dict(DEFAULT_TOKEN_METADATA)
+    if file_path:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for address, metadata in json.load(f).items():
+                token_metadata[address.lower()] = metadata
+    return token_metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode raw receipt logs with the ABIs in abis/")
+    parser.add_argument("log_file", help="raw log file (logs/<hash>.json)")
+    parser.add_argument("--abi-dir", default=ABI_DIR, help="directory of ABI JSON files")
+    parser.add_argument("--tokens", default=None, help="JSON file of token metadata by address")
+    parser.add_argument("-o", "--output", default=None, help="write decoded events to this JSON file")
+    parser.add_argument("--graph", action="store_true", help="build the semantic graph directly from the decoded events")
+    parser.add_argument("--vectorized", action="store_true", help="decode logs of the same event in NumPy batches")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    event_index = build_event_index(args.abi_dir)
+    logs = load_raw_logs(args.log_file)
+    decoded = decode_logs(logs, event_index, token_metadata=load_token_metadata(args.tokens), debug=args.debug,
+                          vectorized=args.vectorized)
+    print(f"Decoded {len(decoded['events'])} of {len(logs)} logs")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(decoded, f, indent=2, ensure_ascii=False)
+        print(f"Decoded logs saved to: {args.output}")
+
+    if args.graph:
+        from extract_semantic import (
+            build_transaction_graph,
+            export_graph_to_json,
+            load_semantic_event,
+            visualize_graph,
+        )
+        tx_name = f"tx_{decoded['transactionHash'] or os.path.splitext(os.path.basename(args.log_file))[0]}"
+        G, _ = build_transaction_graph(decoded, load_semantic_event(os.path.dirname(os.path.abspath(__file__))),
+                                       args.debug)
+        visualize_graph(G, f"{tx_name}_graph.html", args.debug)
+        export_graph_to_json(G, f"{tx_name}_graph.json")
+
+    return decoded
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+여러 이벤트로 이루어진 시퀀스 패턴 매칭 (flash loan, swap-and-repay 등)
+
+semantic JSON의 "sequences" 섹션에 정의된 패턴을 이벤트 이름 -> (패턴, 단계) dispatch 테이블로 컴파일하고,
+이벤트 스트림을 한 번만 훑으면서 모든 패턴을 동시에 진행시킴 (backtracking 없음).
+
+패턴은 순서대로 나타나야 하는 단계(step) 목록이며 단계 사이에 다른 이벤트가 끼어 있어도 됨.
+각 단계까지 도달한 부분 매칭 중 가장 늦게 시작한 것만 유지하면 되므로 (늦게 시작한 매칭이 window 조건에 항상 유리함)
+상태는 패턴 단계마다 하나이고, 이벤트 하나당 그 이벤트 이름을 기다리는 단계만 확인함.
+
+정의 예:
+    {
+        "sequences": [
+            {
+                "name": "flash_loan_swap_and_repay",
+                "description": "...",
+                "max_events": 100,
+                "steps": [
+                    {"name": "LogWithdraw", "label": "flash_loan"},
+                    {"name": ["Mint", "Borrow"], "label": "collateral"},
+                    {"name": ["EthPurchase", "TokenPurchase"], "label": "swap"},
+                    {"name": "LogDeposit", "address": ["dydx"], "label": "repay"}
+                ]
+            }
+        ]
+    }
+"""
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    return [value] if isinstance(value, str) else list(value)
+
+
+def compile_sequence_patterns(semantic_events_list):
+    """
+    semantic 정의 파일들의 "sequences" 섹션을 SequenceMatcher로 컴파일
+
+    정의된 패턴이 없으면 None 반환. 같은 이름의 패턴은 먼저 로드된 정의가 우선함
+    """
+    patterns = []
+    seen = set()
+    for semantic_event in semantic_events_list:
+        for pattern in semantic_event.get("sequences", []):
+            name = pattern.get("name")
+            steps = pattern.get("steps") or []
+            if not name or not steps or name in seen:
+                continue
+            seen.add(name)
+            patterns.append({
+                "name": name,
+                "description": pattern.get("description", ""),
+                "max_events": pattern.get("max_events"),
+                "steps": [
+                    {
+                        "names": _as_list(step.get("name")) or [],
+                        "addresses": set(_as_list(step.get("address")) or ()),
+                        "label": step.get("label") or f"step{i}",
+                    }
+                    for i, step in enumerate(steps)
+                ],
+            })
+    return SequenceMatcher(patterns) if patterns else None
+
+
+class SequenceMatcher:
+    """컴파일된 시퀀스 패턴 집합 (트랜잭션 간에 공유, 상태는 scanner()가 따로 가짐)"""
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        # 이벤트 이름 -> [(패턴 번호, 단계 번호)], 한 이벤트가 같은 패턴을 두 단계 진행하지 않도록 단계 역순
+        self.dispatch = {}
+        for pattern_id, pattern in enumerate(patterns):
+            for step_id, step in enumerate(pattern["steps"]):
+                for name in step["names"]:
+                    self.dispatch.setdefault(name, []).append((pattern_id, step_id))
+        for entries in self.dispatch.values():
+            entries.sort(key=lambda entry: (entry[0], -entry[1]))
+
+    def scanner(self):
+        return SequenceScanner(self)
+
+    def scan(self, events):
+        """이벤트 목록 전체를 훑어서 매칭 목록 반환"""
+        scanner = self.scanner()
+        for position, event in enumerate(events):
+            scanner.feed(event, position)
+        return scanner.matches
+
+
+class SequenceScanner:
+    """트랜잭션 하나(또는 이벤트 스트림 하나)에 대한 매칭 상태"""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        # 패턴별, 단계별로 "그 단계 직전까지 매칭된 가장 늦게 시작한 부분 매칭" (시작 위치, 매칭된 이벤트 튜플)
+        self.partial = [[None] * len(pattern["steps"]) for pattern in matcher.patterns]
+        self.matches = []
+
+    def feed(self, event, position):
+        """이벤트 하나를 반영하고 이번 이벤트로 완성된 매칭 목록 반환"""
+        entries = self.matcher.dispatch.get(event.get("name"))
+        if not entries:
+            return []
+
+        completed = []
+        finished = set()
+        event_index = event.get("eventIndex", position)
+        for pattern_id, step_id in entries:
+            if pattern_id in finished:
+                continue
+            pattern = self.matcher.patterns[pattern_id]
+            step = pattern["steps"][step_id]
+            if step["addresses"] and event.get("address") not in step["addresses"]:
+                continue
+
+            if step_id == 0:
+                start, matched = position, ()
+            else:
+                state = self.partial[pattern_id][step_id]
+                if state is None:
+                    continue
+                start, matched = state
+                max_events = pattern["max_events"]
+                if max_events is not None and position - start >= max_events:
+                    # window를 벗어난 부분 매칭은 더 진행할 수 없음 (더 늦게 시작한 부분 매칭도 없음)
+                    self.partial[pattern_id][step_id] = None
+                    continue
+            matched = matched + (event_index,)
+
+            if step_id + 1 == len(pattern["steps"]):
+                completed.append({
+                    "pattern": pattern["name"],
+                    "description": pattern["description"],
+                    "events": list(matched),
+                    "steps": {s["label"]: index for s, index in zip(pattern["steps"], matched)},
+                })
+                # 매칭끼리 겹치지 않도록 패턴 상태를 초기화하고 이 이벤트로는 더 진행하지 않음
+                self.partial[pattern_id] = [None] * len(pattern["steps"])
+                finished.add(pattern_id)
+                continue
+
+            following = self.partial[pattern_id][step_id + 1]
+            if following is None or following[0] < start:
+                self.partial[pattern_id][step_id + 1] = (start, matched)
+
+        self.matches.extend(completed)
+        return completed
+
+
+def tag_graph_matches(G, matches):
+    """매칭 결과를 그래프에 기록 (G.graph["patterns"], 매칭된 이벤트의 엣지 "patterns" 속성)"""
+    G.graph["patterns"] = matches
+    tag_edge_matches((attrs for _, _, attrs in G.edges(data=True)), matches)
+    return G
+
+
+def tag_edge_matches(edge_attrs, matches):
+    """엣지 속성 dict 목록 중 매칭된 이벤트의 엣지에 "patterns" 속성 기록"""
+    patterns_by_event = {}
+    for match in matches:
+        for event_index in match["events"]:
+            patterns_by_event.setdefault(event_index, []).append(match["pattern"])
+    for attrs in edge_attrs:
+        patterns = patterns_by_event.get(attrs.get("event_index"))
+        if patterns:
+            attrs["patterns"] = sorted(set(patterns))
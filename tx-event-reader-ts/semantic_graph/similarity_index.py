@@ -0,0 +1,507 @@
+"""
+트랜잭션 구조 유사도 인덱스 (MinHash / LSH)
+
+build_transaction_graph / build_graph_data 결과를 다음 특징(shingle) 집합으로 바꾸고 MinHash 서명으로 압축함.
+- 이벤트 순서 shingle: event_index 순서의 이벤트 이름 k-gram
+- 엣지 종류: (이벤트, 토큰)과 등장 횟수 구간
+- 역할로 정규화한 주소: 처음 등장한 순서대로 R0, R1, ... 로 바꾼 (source 역할, target 역할, 이벤트, 토큰) 엣지
+- 매칭된 시퀀스 패턴 이름
+서명은 SQLite 파일의 LSH 버킷(band별 해시)에 저장하므로 수십만 트랜잭션에서도 유사 트랜잭션 조회가 ms 단위로 끝남.
+인덱스 추가는 트랜잭션 단위로 점진적으로 할 수 있고, CLI는 프로세스 풀에서 병렬로 서명을 계산함.
+
+실행 예:
+    python similarity_index.py ../decoded_logs --index similarity.db --workers 8
+    python similarity_index.py --index similarity.db --query ../decoded_logs/tx_0xb5c8...9838.json
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+DEFAULT_INDEX_PATH = "similarity.db"
+DEFAULT_NUM_PERM = 128
+# 32 band x 4 row: 추정 Jaccard 약 0.42 이상이면 후보가 될 확률이 높음 ((1 / bands) ** (1 / rows))
+DEFAULT_BANDS = 32
+DEFAULT_SHINGLE_SIZE = 3
+# 이보다 뒤에 처음 등장한 주소는 같은 역할(R*)로 묶음
+MAX_ROLES = 16
+# 조회 시 signature를 비교할 후보 수 상한 (공유하는 band 수가 많은 후보부터)
+DEFAULT_MAX_CANDIDATES = 2000
+# 병렬 빌드에서 한 번에 커밋하는 서명 수
+INSERT_BATCH = 1024
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# band 안의 각 값에 곱하는 홀수 상수 (band 크기는 num_perm / bands, 고정 seed)
+_BAND_MULTIPLIERS = np.random.RandomState(0x5eed).randint(
+    0, np.iinfo(np.int64).max, size=64, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+
+RULES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    feature_count INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+-- (band, key)로 바로 찾도록 클러스터링. 트랜잭션 삭제 시에는 저장된 서명에서 band key를 다시 계산해서 지움
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    tx_id INTEGER NOT NULL,
+    PRIMARY KEY (band, key, tx_id)
+) WITHOUT ROWID;
+"""
+
+
+def _edge_rows(graph):
+    """nx.DiGraph 또는 graph_to_dict 형식 데이터에서 (from, to, event, token, event_index) 목록"""
+    if hasattr(graph, "edges") and callable(graph.edges):
+        return [(source, target, attrs.get("event", ""), attrs.get("token", ""), attrs.get("event_index", -1))
+                for source, target, attrs in graph.edges(data=True)], graph.graph.get("patterns", [])
+    return [(edge["from"], edge["to"], edge.get("event", ""), edge.get("token", ""), edge.get("event_index", -1))
+            for edge in graph["edges"]], graph.get("patterns", [])
+
+
+def transaction_features(graph, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """
+    그래프의 구조 특징 문자열 집합
+
+    prune_graph와 같이 zero address 엣지는 제외하므로 내보낸 그래프 파일과 원래 그래프의 특징이 같음
+    """
+    rows, patterns = _edge_rows(graph)
+    rows = sorted((row for row in rows if ZERO_ADDRESS not in (row[0], row[1])), key=lambda row: row[4])
+    features = set()
+
+    # 이벤트 순서 (같은 이벤트에서 나온 여러 엣지는 한 번만)
+    sequence = []
+    last_index = None
+    for _, _, event, _, event_index in rows:
+        if event_index != last_index:
+            sequence.append(event)
+            last_index = event_index
+    for size in range(1, shingle_size + 1):
+        for start in range(len(sequence) - size + 1):
+            features.add("seq:" + ">".join(sequence[start:start + size]))
+
+    roles = {}
+    type_counts = {}
+    for source, target, event, token, _ in rows:
+        for address in (source, target):
+            if address not in roles:
+                roles[address] = f"R{len(roles)}" if len(roles) < MAX_ROLES else "R*"
+        edge_type = f"{event}:{token}"
+        count = type_counts[edge_type] = type_counts.get(edge_type, 0) + 1
+        features.add("type:" + edge_type)
+        # 1, 2, 4, 8, ... 번째 등장에서 횟수 구간 특징 추가
+        if count & (count - 1) == 0:
+            features.add(f"count:{edge_type}:{count}")
+        features.add(f"edge:{roles[source]}>{roles[target]}:{edge_type}")
+
+    for match in patterns:
+        features.add("pattern:" + match.get("pattern", ""))
+    return features
+
+
+def _feature_hashes(features):
+    return np.array([int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little")
+                     for feature in features], dtype=np.uint64)
+
+
+class MinHasher:
+    """
+    num_perm개 해시로 특징 집합의 MinHash 서명(uint32) 계산
+
+    해시는 ((a * h + b) mod 2^64) mod (2^61 - 1)의 하위 32bit (h는 특징의 32bit blake2b 해시, a / b는 63bit 난수).
+    a * h가 uint64에서 wrap 되므로 (2^61 - 1)을 법으로 한 universal hash는 아님.
+    저장된 인덱스의 서명과 비교할 수 있어야 하므로 계산 방식은 바꾸지 않음
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, features):
+        hashes = _feature_hashes(features)
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # uint64 곱 / 합의 overflow(wrap)는 의도된 동작
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self.a[None, :] + self.b[None, :]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+def estimate_similarity(signature, other):
+    """두 MinHash 서명의 Jaccard 유사도 추정값"""
+    return float(np.mean(signature == other))
+
+
+def band_keys(signature, bands):
+    """서명을 bands개 구간으로 나눈 각 구간의 64bit 해시 (SQLite INTEGER에 맞도록 부호 있는 값)"""
+    rows = len(signature) // bands
+    values = np.asarray(signature, dtype=np.uint64).reshape(bands, rows)
+    with np.errstate(over="ignore"):
+        keys = (values * _BAND_MULTIPLIERS[:rows]).sum(axis=1, dtype=np.uint64)
+        # 곱의 합만으로는 하위 bit가 잘 섞이지 않으므로 xorshift-multiply로 한 번 더 섞음
+        keys ^= keys >> np.uint64(29)
+        keys *= np.uint64(0xBF58476D1CE4E5B9)
+        keys ^= keys >> np.uint64(32)
+    return keys.view(np.int64).tolist()
+
+
+class SimilarityIndex:
+    """트랜잭션 MinHash 서명과 LSH 버킷을 저장하는 SQLite 인덱스"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 shingle_size=DEFAULT_SHINGLE_SIZE, seed=1):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        # 버킷 B-tree 삽입이 임의 위치에 흩어지므로 page cache를 크게 잡음 (약 256MB)
+        self.connection.execute("PRAGMA cache_size = -262144")
+        self.connection.executescript(_SCHEMA)
+
+        # 이미 만들어진 인덱스면 저장된 파라미터를 사용 (다른 파라미터의 서명은 비교할 수 없음)
+        settings = {"num_perm": num_perm, "bands": bands, "shingle_size": shingle_size, "seed": seed}
+        stored = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if stored:
+            settings = {key: int(stored.get(key, value)) for key, value in settings.items()}
+        else:
+            if num_perm % bands or num_perm // bands > len(_BAND_MULTIPLIERS):
+                raise ValueError(f"num_perm must be a multiple of bands with at most {len(_BAND_MULTIPLIERS)} rows per band")
+            with self.connection:
+                self.connection.executemany("INSERT INTO meta(key, value) VALUES (?, ?)",
+                                            [(key, str(value)) for key, value in settings.items()])
+        self.num_perm = settings["num_perm"]
+        self.bands = settings["bands"]
+        self.shingle_size = settings["shingle_size"]
+        self.seed = settings["seed"]
+        self.hasher = MinHasher(self.num_perm, self.seed)
+        self._bulk_depth = 0
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    @contextmanager
+    def bulk(self):
+        """블록 안의 add를 하나의 SQLite 트랜잭션으로 묶음 (GraphStore.bulk와 같은 용도)"""
+        if self._bulk_depth:
+            self._bulk_depth += 1
+            try:
+                yield self
+            finally:
+                self._bulk_depth -= 1
+            return
+
+        self._bulk_depth = 1
+        try:
+            with self.connection:
+                yield self
+        finally:
+            self._bulk_depth = 0
+
+    def _write(self):
+        return nullcontext() if self._bulk_depth else self.connection
+
+    def signature(self, graph):
+        """그래프(nx.DiGraph 또는 graph_to_dict 형식)의 (서명, 특징 수)"""
+        features = transaction_features(graph, self.shingle_size)
+        return self.hasher.signature(features), len(features)
+
+    def has_transaction(self, transaction):
+        row = self.connection.execute("SELECT 1 FROM transactions WHERE hash = ?", (transaction,)).fetchone()
+        return row is not None
+
+    def add_signature(self, transaction, signature, feature_count=0):
+        """서명 하나 추가 (같은 트랜잭션이 있으면 교체)"""
+        signature = np.asarray(signature, dtype=np.uint32)
+        if len(signature) != self.num_perm:
+            raise ValueError(f"signature has {len(signature)} values, index uses {self.num_perm}")
+        with self._write():
+            self._delete(transaction)
+            tx_id = self.connection.execute(
+                "INSERT INTO transactions(hash, feature_count, signature) VALUES (?, ?, ?)",
+                (transaction, feature_count, signature.astype("<u4").tobytes())).lastrowid
+            self.connection.executemany("INSERT INTO buckets(band, key, tx_id) VALUES (?, ?, ?)",
+                                        [(band, key, tx_id) for band, key in
+                                         enumerate(band_keys(signature, self.bands))])
+        return tx_id
+
+    def add_signatures(self, items):
+        """
+        (트랜잭션, 서명, 특징 수) 목록을 한 번에 추가 (병렬 빌드의 부모 프로세스에서 사용)
+
+        버킷 행을 (band, key) 순서로 정렬해서 넣으므로 하나씩 add_signature 하는 것보다 B-tree 쓰기가 적음
+        """
+        bucket_rows = []
+        with self._write():
+            for transaction, signature, feature_count in items:
+                signature = np.asarray(signature, dtype=np.uint32)
+                if len(signature) != self.num_perm:
+                    raise ValueError(f"signature has {len(signature)} values, index uses {self.num_perm}")
+                self._delete(transaction)
+                tx_id = self.connection.execute(
+                    "INSERT INTO transactions(hash, feature_count, signature) VALUES (?, ?, ?)",
+                    (transaction, feature_count, signature.astype("<u4").tobytes())).lastrowid
+                bucket_rows.extend((band, key, tx_id) for band, key in enumerate(band_keys(signature, self.bands)))
+            bucket_rows.sort()
+            self.connection.executemany("INSERT INTO buckets(band, key, tx_id) VALUES (?, ?, ?)", bucket_rows)
+        return len(bucket_rows) // self.bands
+
+    def add_graph(self, graph, transaction):
+        """그래프의 서명을 계산해서 추가"""
+        signature, feature_count = self.signature(graph)
+        return self.add_signature(transaction, signature, feature_count)
+
+    def _delete(self, transaction):
+        row = self.connection.execute("SELECT id, signature FROM transactions WHERE hash = ?", (transaction,)).fetchone()
+        if row is None:
+            return
+        tx_id, signature = row
+        self.connection.executemany("DELETE FROM buckets WHERE band = ? AND key = ? AND tx_id = ?",
+                                    [(band, key, tx_id) for band, key in
+                                     enumerate(band_keys(np.frombuffer(signature, dtype="<u4"), self.bands))])
+        self.connection.execute("DELETE FROM transactions WHERE id = ?", (tx_id,))
+
+    def remove_transaction(self, transaction):
+        with self._write():
+            self._delete(transaction)
+
+    def stored_signature(self, transaction):
+        row = self.connection.execute("SELECT signature FROM transactions WHERE hash = ?", (transaction,)).fetchone()
+        if row is None:
+            raise KeyError(f"transaction '{transaction}' is not in the index")
+        return np.frombuffer(row[0], dtype="<u4")
+
+    def query(self, signature, k=10, min_similarity=0.0, exclude=None, max_candidates=DEFAULT_MAX_CANDIDATES):
+        """
+        서명과 LSH 버킷을 공유하는 트랜잭션 중 추정 유사도가 높은 k개 [(트랜잭션, 유사도)]
+
+        exclude에 트랜잭션 해시를 주면 결과에서 제외 (저장된 트랜잭션 자신으로 조회할 때)
+        """
+        signature = np.asarray(signature, dtype=np.uint32)
+        shared = {}
+        for band, key in enumerate(band_keys(signature, self.bands)):
+            for (tx_id,) in self.connection.execute("SELECT tx_id FROM buckets WHERE band = ? AND key = ?", (band, key)):
+                shared[tx_id] = shared.get(tx_id, 0) + 1
+        if not shared:
+            return []
+
+        # 공유하는 band가 많은 후보만 서명을 읽어서 비교
+        ids = sorted(shared, key=shared.get, reverse=True)[:max_candidates]
+        rows = self.connection.execute(
+            f"SELECT hash, signature FROM transactions WHERE id IN ({', '.join('?' for _ in ids)})", ids).fetchall()
+        rows = [row for row in rows if row[0] != exclude]
+        if not rows:
+            return []
+        signatures = np.frombuffer(b"".join(row[1] for row in rows), dtype="<u4").reshape(len(rows), -1)
+        similarities = (signatures == signature[None, :]).mean(axis=1)
+        order = np.argsort(-similarities, kind="stable")[:k]
+        return [(rows[position][0], float(similarities[position])) for position in order.tolist()
+                if similarities[position] >= min_similarity]
+
+    def query_graph(self, graph, k=10, min_similarity=0.0):
+        """인덱스에 없는 그래프와 비슷한 트랜잭션"""
+        return self.query(self.signature(graph)[0], k, min_similarity)
+
+    def query_transaction(self, transaction, k=10, min_similarity=0.0):
+        """인덱스에 저장된 트랜잭션과 비슷한 다른 트랜잭션"""
+        return self.query(self.stored_signature(transaction), k, min_similarity, exclude=transaction)
+
+
+# 워커 프로세스별 컴파일된 규칙과 MinHasher (initializer에서 설정)
+_worker_semantic_index = None
+_worker_sequence_matcher = None
+_worker_hasher = None
+_worker_shingle_size = DEFAULT_SHINGLE_SIZE
+
+
+def _init_worker(semantic_events_list, num_perm, seed, shingle_size):
+    from extract_semantic import compile_semantic_index
+    from sequence_patterns import compile_sequence_patterns
+
+    global _worker_semantic_index, _worker_sequence_matcher, _worker_hasher, _worker_shingle_size
+    _worker_semantic_index = compile_semantic_index(semantic_events_list)
+    _worker_sequence_matcher = compile_sequence_patterns(semantic_events_list)
+    _worker_hasher = MinHasher(num_perm, seed)
+    _worker_shingle_size = shingle_size
+
+
+def fingerprint_file(file_path):
+    """워커에서 트랜잭션 파일 하나의 그래프를 만들고 (파일, 서명 bytes, 특징 수, 에러) 반환"""
+    import contextlib
+    import io
+
+    from extract_semantic import build_graph_data, iter_transaction_events
+
+    try:
+        # build_graph_data의 진행 메시지는 출력하지 않음
+        with contextlib.redirect_stdout(io.StringIO()):
+            graph_data = build_graph_data(iter_transaction_events(file_path), _worker_semantic_index,
+                                          sequence_matcher=_worker_sequence_matcher)
+        features = transaction_features(graph_data, _worker_shingle_size)
+        return file_path, _worker_hasher.signature(features).astype("<u4").tobytes(), len(features), None
+    except Exception as e:
+        return file_path, None, 0, f"{type(e).__name__}: {e}"
+
+
+def transaction_name(file_path):
+    """tx_<hash>.json -> <hash>"""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name[len("tx_"):] if name.startswith("tx_") else name
+
+
+def build_similarity_index(target, index_path=DEFAULT_INDEX_PATH, rules_dir=RULES_DIR, workers=None,
+                           max_pending=None, rebuild=False):
+    """
+    target(디렉토리 / glob)의 트랜잭션 서명을 프로세스 풀에서 계산해서 인덱스에 추가
+
+    이미 인덱스에 있는 트랜잭션은 rebuild=True가 아니면 건너뜀 (점진적 추가). 쓰기는 부모 프로세스에서만 수행
+    """
+    from batch_semantic import collect_transaction_files
+    from extract_semantic import load_semantic_event
+
+    started = time.perf_counter()
+    report = {"added": 0, "skipped": 0, "failed": 0, "errors": []}
+    with SimilarityIndex(index_path) as index:
+        files = []
+        for file_path in collect_transaction_files(target):
+            if not rebuild and index.has_transaction(transaction_name(file_path)):
+                report["skipped"] += 1
+            else:
+                files.append(file_path)
+
+        semantic_events_list = load_semantic_event(rules_dir)
+        workers = workers or os.cpu_count() or 1
+        max_pending = max_pending or workers * 4
+
+        # 커밋마다 WAL에 흩어진 버킷 페이지를 쓰므로 INSERT_BATCH개씩 모아서 한 번에 추가
+        items = []
+
+        def flush():
+            report["added"] += index.add_signatures(items)
+            items.clear()
+
+        # 제출한 future -> 파일 경로
+        pending = {}
+
+        def collect(done):
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    _, signature, feature_count, error = future.result()
+                except Exception as e:
+                    # fingerprint_file 밖의 실패 (워커 프로세스가 죽은 BrokenProcessPool 등)
+                    signature, feature_count, error = None, 0, f"{type(e).__name__}: {e}"
+                if error is not None:
+                    report["failed"] += 1
+                    report["errors"].append(f"{file_path}: {error}")
+                    continue
+                items.append((transaction_name(file_path), np.frombuffer(signature, dtype="<u4"), feature_count))
+            if len(items) >= INSERT_BATCH:
+                flush()
+
+        def new_executor():
+            return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(semantic_events_list, index.num_perm, index.seed,
+                                                 index.shingle_size))
+
+        executor = new_executor()
+        try:
+            for file_path in files:
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                try:
+                    future = executor.submit(fingerprint_file, file_path)
+                except BrokenProcessPool:
+                    # 워커가 죽으면 풀 전체를 쓸 수 없으므로 새 풀에서 계속
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = new_executor()
+                    future = executor.submit(fingerprint_file, file_path)
+                pending[future] = file_path
+            done, _ = wait(pending)
+            collect(done)
+        finally:
+            executor.shutdown(cancel_futures=True)
+            # 중간에 중단되어도 이미 계산한 서명은 저장
+            flush()
+        report["total"] = len(index)
+
+    report["elapsed"] = time.perf_counter() - started
+    return report
+
+
+def main():
+    from extract_semantic import load_semantic_event
+
+    parser = argparse.ArgumentParser(description="Index transactions by structural similarity and query it")
+    parser.add_argument("target", nargs="?", default=None,
+                        help="directory of decoded logs (tx_*.json) or a glob pattern to add to the index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="SQLite similarity index file")
+    parser.add_argument("--rules-dir", default=RULES_DIR, help="directory of semantic rule JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--rebuild", action="store_true", help="recompute signatures of indexed transactions")
+    parser.add_argument("--query", default=None,
+                        help="transaction hash in the index, or a decoded log file, to find similar transactions for")
+    parser.add_argument("-k", type=int, default=10, help="number of similar transactions to print")
+    parser.add_argument("--min-similarity", type=float, default=0.0, help="minimum estimated Jaccard similarity")
+    args = parser.parse_args()
+
+    if not args.target and not args.query:
+        parser.error("nothing to do: pass a target to index and/or --query")
+
+    if args.target:
+        report = build_similarity_index(args.target, args.index, args.rules_dir, args.workers, rebuild=args.rebuild)
+        print(f"Similarity index {args.index}: {report['added']} added, {report['skipped']} already indexed, "
+              f"{report['failed']} failed, {report['total']} total ({report['elapsed']:.2f}s)")
+        for error in report["errors"]:
+            print(f"  error: {error}")
+
+    if args.query:
+        with SimilarityIndex(args.index) as index:
+            started = time.perf_counter()
+            if os.path.isfile(args.query):
+                _init_worker(load_semantic_event(args.rules_dir), index.num_perm, index.seed, index.shingle_size)
+                _, signature, _, error = fingerprint_file(args.query)
+                if error is not None:
+                    print(f"error: {error}")
+                    return
+                results = index.query(np.frombuffer(signature, dtype="<u4"), args.k, args.min_similarity,
+                                      exclude=transaction_name(args.query))
+            else:
+                results = index.query_transaction(args.query, args.k, args.min_similarity)
+            elapsed = time.perf_counter() - started
+        print(f"{len(results)} similar transactions ({elapsed * 1000:.1f} ms)")
+        for transaction, similarity in results:
+            print(f"  {similarity:.3f}  {transaction}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""SequenceScanner 매칭 규칙 (가장 늦게 시작한 부분 매칭, max_events window, 매칭 후 초기화)"""
+from sequence_patterns import compile_sequence_patterns
+
+
+def _matcher(steps, max_events=None):
+    return compile_sequence_patterns([{
+        "sequences": [{"name": "pattern", "max_events": max_events, "steps": [{"name": name} for name in steps]}]
+    }])
+
+
+def _events(names):
+    return [{"name": name, "eventIndex": index} for index, name in enumerate(names)]
+
+
+def _matched_events(matcher, names):
+    return [match["events"] for match in matcher.scan(_events(names))]
+
+
+def test_partial_match_keeps_latest_start():
+    assert _matched_events(_matcher(["A", "B"]), ["A", "A", "B"]) == [[1, 2]]
+
+
+def test_other_events_between_steps():
+    assert _matched_events(_matcher(["A", "B", "C"]), ["A", "X", "B", "Y", "C"]) == [[0, 2, 4]]
+
+
+def test_window_drops_partial_match():
+    matcher = _matcher(["A", "B"], max_events=3)
+    assert _matched_events(matcher, ["A", "X", "X", "B"]) == []
+    assert _matched_events(matcher, ["A", "X", "B"]) == [[0, 2]]
+
+
+def test_later_start_fits_window():
+    assert _matched_events(_matcher(["A", "B"], max_events=3), ["A", "X", "A", "X", "B"]) == [[2, 4]]
+
+
+def test_reset_after_match():
+    # 매칭에 쓰인 이벤트와 그 이전의 부분 매칭은 다음 매칭에 다시 쓰지 않음
+    assert _matched_events(_matcher(["A", "B"]), ["A", "A", "B", "B"]) == [[1, 2]]
+    assert _matched_events(_matcher(["A", "B"]), ["A", "B", "A", "B"]) == [[0, 1], [2, 3]]
+
+
+def test_event_advances_one_step():
+    # 같은 이름의 단계가 연속이면 이벤트 하나가 두 단계를 진행하지 않음
+    assert _matched_events(_matcher(["A", "A"]), ["A", "A", "A"]) == [[0, 1]]
+    assert _matched_events(_matcher(["A", "A"]), ["A", "A", "A", "A"]) == [[0, 1], [2, 3]]
+
+
+def test_feed_returns_completed_matches():
+    scanner = _matcher(["A", "B"]).scanner()
+    assert scanner.feed({"name": "A", "eventIndex": 7}, 0) == []
+    completed = scanner.feed({"name": "B", "eventIndex": 9}, 1)
+    assert [match["events"] for match in completed] == [[7, 9]]
+    assert completed[0]["steps"] == {"step0": 7, "step1": 9}
+    assert scanner.matches == completed
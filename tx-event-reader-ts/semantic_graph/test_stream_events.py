@@ -0,0 +1,63 @@
+"""iter_transaction_events / _iter_json_array_items 스트리밍 파싱 (청크 경계에 걸친 값)"""
+import io
+import json
+
+import pytest
+
+from extract_semantic import _iter_json_array_items, iter_transaction_events
+
+DOCUMENT = {
+    "transactionHash": "0xabc",
+    "events": [
+        {"name": "Transfer", "inputs": [{"name": "value", "rawValue": "12345678901234567890"}]},
+        "quote \" and ] , } inside a string",
+        "escaped \\\\ backslash \\u00e9 and unicode é中",
+        123456789,
+        -0.5e-3,
+        [1, [2, [3]], {"nested": "]"}],
+        True,
+        None,
+        {},
+        [],
+    ],
+    "blockNumber": "0x90b9a0",
+    "after": {"events": ["not the top-level array"]},
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+def test_items_split_across_chunks(chunk_size):
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+    header = {}
+    items = list(_iter_json_array_items(io.StringIO(text), "events", chunk_size, header))
+    assert items == DOCUMENT["events"]
+    assert header == {key: value for key, value in DOCUMENT.items() if key != "events"}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4])
+def test_whitespace_and_empty_array(chunk_size):
+    text = ' \n{ "events" : [ ] ,\n "blockNumber" : 12 }\n'
+    header = {}
+    assert list(_iter_json_array_items(io.StringIO(text), "events", chunk_size, header)) == []
+    assert header == {"blockNumber": 12}
+    assert list(_iter_json_array_items(io.StringIO("{}"), "events", chunk_size)) == []
+
+
+def test_truncated_document_raises():
+    text = json.dumps(DOCUMENT)[:-20]
+    with pytest.raises(ValueError):
+        list(_iter_json_array_items(io.StringIO(text), "events", 8))
+
+
+def test_iter_transaction_events_header(tmp_path):
+    path = tmp_path / "tx_0xabc.json"
+    path.write_text(json.dumps(DOCUMENT, ensure_ascii=False), encoding="utf-8")
+    header = {}
+    assert list(iter_transaction_events(str(path), chunk_size=3, header=header)) == DOCUMENT["events"]
+    assert header["blockNumber"] == "0x90b9a0"
+
+
+def test_iter_transaction_events_jsonl(tmp_path):
+    path = tmp_path / "tx_0xabc.jsonl"
+    path.write_text("\n".join(json.dumps(event) for event in DOCUMENT["events"]) + "\n\n", encoding="utf-8")
+    assert list(iter_transaction_events(str(path))) == DOCUMENT["events"]
@@ -0,0 +1,394 @@
+"""
+NumPy 기반 배치 로그 디코더
+
+같은 이벤트 시그니처(예: ERC-20 Transfer, WETH Deposit / Withdrawal)의 로그를 묶어서
+data / topics hex를 한 번에 bytes로 변환한 뒤 (N, 워드 수, 32) uint8 배열로 보고
+고정 폭 필드(uint / int / address / bool / bytesN)를 컬럼 단위로 꺼냄.
+정적 tuple / 고정 길이 배열(예: dYdX LogDeposit의 update)은 워드 컬럼 여러 개로 펼쳐서 디코딩한 뒤 rawValue로 합침.
+동적 타입이 있는 이벤트, 길이가 맞지 않는 로그는 log_decoder.decode_log로 하나씩 디코딩함.
+
+같은 금액 -> 토큰 재사용 추론(value_tokens)은 로그 순서에 의존하므로 배치 디코딩이 끝난 뒤 apply_value_tokens가
+금액 입력을 (transactionHash, 금액)으로 묶어 NumPy로 처리함 (토큰이 바뀌는 입력만 수정).
+결과는 log_decoder.iter_decoded_events와 같음 (bench/bench_vector_decoder.py로 확인).
+"""
+import numpy as np
+
+from log_decoder import (
+    AMOUNT_KEYWORDS,
+    DEFAULT_TOKEN_METADATA,
+    decode_log,
+    find_event_spec,
+    format_display_value,
+    infer_token_metadata,
+    to_checksum_address,
+)
+
+_WORD = 32
+_TOPIC_LENGTH = 2 + _WORD * 2
+_WORD_KINDS = ("uint", "int", "address", "bool", "fixed_bytes")
+
+
+def static_word_types(abi_type):
+    """정적 타입을 인코딩 순서의 워드 타입 목록으로 펼침 (tuple / 고정 길이 배열 포함, 동적 타입이면 None)"""
+    kind = abi_type[0]
+    if kind in _WORD_KINDS:
+        return [abi_type]
+    if kind == "tuple":
+        components = abi_type[1]
+    elif kind == "array" and abi_type[2] is not None:
+        components = [abi_type[1]] * abi_type[2]
+    else:
+        return None
+    words = []
+    for component in components:
+        component_words = static_word_types(component)
+        if component_words is None:
+            return None
+        words.extend(component_words)
+    return words
+
+
+def data_word_count(spec):
+    """
+    컬럼 단위로 디코딩할 수 있는 이벤트면 data의 워드 수, 아니면 None
+
+    indexed 입력은 워드 하나인 타입이어야 함 (indexed tuple / 배열은 topic에 해시만 있음)
+    """
+    count = 0
+    for item in spec["inputs"]:
+        if item["indexed"]:
+            if item["abi_type"][0] not in _WORD_KINDS:
+                return None
+            continue
+        words = static_word_types(item["abi_type"])
+        if words is None:
+            return None
+        count += len(words)
+    return count
+
+
+def word_matrix(hex_rows, words):
+    """길이가 같은 hex 문자열 목록을 (N, words, 32) uint8 배열로 변환 (bytes 버퍼를 복사 없이 사용)"""
+    buffer = bytes.fromhex("".join(hex_rows))
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(len(hex_rows), words, _WORD)
+
+
+def decode_word_column(abi_type, column):
+    """(N, 32) uint8 워드 컬럼을 Python 값 목록으로 디코딩"""
+    kind = abi_type[0]
+    if kind in ("uint", "int"):
+        # big-endian uint64 limb 4개로 보고 한 번에 Python 정수 목록으로 변환
+        limbs = np.ascontiguousarray(column).view(">u8").tolist()
+        values = [(a << 192) | (b << 128) | (c << 64) | d for a, b, c, d in limbs]
+        if kind == "int":
+            values = [value - (1 << 256) if value >> 255 else value for value in values]
+        return values
+    if kind == "address":
+        text = column[:, 12:].tobytes().hex()
+        return [to_checksum_address("0x" + text[start:start + 40]) for start in range(0, len(text), 40)]
+    if kind == "bool":
+        return (column[:, -1] != 0).tolist()
+    if kind == "fixed_bytes":
+        width = abi_type[1] * 2
+        text = column[:, :abi_type[1]].tobytes().hex()
+        return ["0x" + text[start:start + width] for start in range(0, len(text), width)]
+    raise ValueError(f"not a single-word type: {kind}")
+
+
+def _string_column(abi_type, column):
+    """워드 컬럼 값을 value_to_string과 같은 문자열로 변환 (tuple / 배열 컬럼은 이미 문자열)"""
+    if abi_type[0] == "bool":
+        return ["true" if value else "false" for value in column]
+    return list(map(str, column))
+
+
+def decode_log_batch(logs, spec, token_metadata=None):
+    """
+    같은 이벤트 스펙의 로그 묶음을 컬럼 단위로 디코딩
+
+    모든 로그는 0x 접두사가 있고 topic 수와 data 길이가 spec과 맞아야 함 (decode_logs_vectorized에서 확인)
+    """
+    return _decode_batch(logs, spec, token_metadata)[0]
+
+
+def _decode_batch(logs, spec, token_metadata=None):
+    """
+    decode_log_batch 본체. (이벤트 목록, 금액 컬럼, 로그별 첫 번째 토큰 주소 목록) 반환
+
+    금액 컬럼은 [(입력 위치, rawValue 목록, (symbol, decimals) 목록)].
+
+    첫 번째 토큰 주소는 decode_log의 후보 주소(주소 입력들 + 로그 주소) 중 토큰 테이블에 있는 첫 주소 (없으면 None)
+    """
+    if token_metadata is None:
+        token_metadata = DEFAULT_TOKEN_METADATA
+    if not logs:
+        return [], [], []
+
+    inputs_spec = spec["inputs"]
+    data_positions = [i for i, item in enumerate(inputs_spec) if not item["indexed"]]
+    topic_positions = [i for i, item in enumerate(inputs_spec) if item["indexed"]]
+    columns = [None] * len(inputs_spec)
+
+    if data_positions:
+        word_types = [static_word_types(inputs_spec[position]["abi_type"]) for position in data_positions]
+        data = word_matrix([log["data"][2:] for log in logs], sum(len(types) for types in word_types))
+        word = 0
+        for position, types in zip(data_positions, word_types):
+            if inputs_spec[position]["abi_type"][0] in _WORD_KINDS:
+                columns[position] = decode_word_column(types[0], data[:, word])
+            else:
+                # value_to_string처럼 원소 값을 쉼표로 이어 붙인 문자열
+                leaves = [_string_column(abi_type, decode_word_column(abi_type, data[:, word + offset]))
+                          for offset, abi_type in enumerate(types)]
+                columns[position] = [",".join(values) for values in zip(*leaves)] if leaves else [""] * len(logs)
+            word += len(types)
+    if topic_positions:
+        topics = word_matrix(["".join(topic[2:] for topic in log["topics"][1:]) for log in logs],
+                             len(topic_positions))
+        for word, position in enumerate(topic_positions):
+            columns[position] = decode_word_column(inputs_spec[position]["abi_type"], topics[:, word])
+
+    names_lower = [item["name"].lower() for item in inputs_spec]
+    address_positions = [i for i, item in enumerate(inputs_spec) if item["type"] == "address"]
+    amount_positions = [
+        i for i, item in enumerate(inputs_spec)
+        if item["type"].startswith("uint") and any(keyword in names_lower[i] for keyword in AMOUNT_KEYWORDS)
+    ]
+
+    addresses = [log.get("address", "") for log in logs]
+    event_addresses = [
+        to_checksum_address(address) if address.startswith("0x") and len(address) == 42 else address
+        for address in addresses
+    ]
+
+    # 첫 번째 토큰 주소 (주소 입력 컬럼 순서대로 보고 못 찾은 행만 다음 컬럼에서 찾음)
+    first_known = [None] * len(logs)
+    known = {}
+    for candidates in [columns[i] for i in address_positions] + [addresses]:
+        for row, candidate in enumerate(candidates):
+            if first_known[row] is not None:
+                continue
+            is_known = known.get(candidate)
+            if is_known is None:
+                is_known = known[candidate] = candidate.lower() in token_metadata
+            if is_known:
+                first_known[row] = candidate
+
+    field_columns = []
+    amount_columns = []
+    # 토큰 추론은 입력 이름 / 이벤트 이름과 첫 번째 토큰 주소에만 의존하므로 그 조합별로 한 번만 수행
+    token_cache = {}
+    for i, (item, column) in enumerate(zip(inputs_spec, columns)):
+        name, type_name = item["name"], item["type"]
+        if type_name == "address":
+            field_columns.append([
+                {"name": name, "type": type_name, "rawValue": value, "displayValue": value} for value in column
+            ])
+            continue
+        raw_values = _string_column(item["abi_type"], column)
+        if i not in amount_positions:
+            field_columns.append([{"name": name, "type": type_name, "rawValue": raw} for raw in raw_values])
+            continue
+
+        fields = []
+        tokens = []
+        for value, raw, candidate in zip(column, raw_values, first_known):
+            token = token_cache.get((i, candidate))
+            if token is None:
+                symbol, decimals = infer_token_metadata(spec["name"], names_lower[i], None,
+                                                        (candidate,) if candidate else (), token_metadata, None)
+                token = token_cache[(i, candidate)] = ((symbol, decimals), 10 ** decimals)
+            (symbol, decimals), scale = token
+            tokens.append(token[0])
+            formatted_value = value / scale
+            fields.append({"name": name, "type": type_name, "rawValue": raw, "formattedValue": formatted_value,
+                           "symbol": symbol, "decimals": decimals,
+                           "displayValue": format_display_value(formatted_value, symbol)})
+        field_columns.append(fields)
+        amount_columns.append((i, raw_values, tokens))
+
+    event_name = spec["name"]
+    events = [
+        {"eventIndex": log.get("index", log.get("logIndex")), "name": event_name, "address": address,
+         "inputs": list(inputs)}
+        for log, address, inputs in zip(logs, event_addresses, zip(*field_columns))
+    ]
+    return events, amount_columns, first_known
+
+
+def _event_amount_columns(event, log, token_metadata):
+    """decode_log로 하나씩 디코딩한 이벤트의 _decode_batch와 같은 (금액 컬럼, 첫 번째 토큰 주소)"""
+    inputs = event["inputs"]
+    candidates = [field["rawValue"] for field in inputs if field["type"] == "address"]
+    candidates.append(log.get("address", ""))
+    first_known = next((candidate for candidate in candidates if candidate.lower() in token_metadata), None)
+    amount_columns = [(i, [field["rawValue"]], [(field["symbol"], field["decimals"])])
+                      for i, field in enumerate(inputs) if "symbol" in field]
+    return amount_columns, [first_known]
+
+
+def apply_value_tokens(results, logs, amount_groups, token_metadata=None):
+    """
+    decode_log에 트랜잭션별 value_tokens를 넘긴 것과 같도록 금액 입력의 토큰을 다시 지정 (results를 직접 수정)
+
+    amount_groups는 (로그 위치 목록, 금액 컬럼, 첫 번째 토큰 주소 목록) 목록 (_decode_batch 결과).
+    금액 입력을 (transactionHash, rawValue)로 한 번 묶고, 묶음 안에서 로그 순서로 처음 토큰 주소가 있는 입력의
+    주소를 그 뒤 입력에 NumPy로 이어 붙임. 토큰 추론은 (이벤트, 입력 이름, 이어 받은 주소) 조합마다 한 번만 수행하고
+    토큰이 실제로 바뀐 입력만 수정함
+    """
+    if token_metadata is None:
+        token_metadata = DEFAULT_TOKEN_METADATA
+
+    transaction_ids = {}
+    raw_ids = {}
+    address_ids = {}
+    # (이벤트 이름, 입력 이름) / (symbol, decimals) -> id
+    slot_ids = {}
+    token_ids = {}
+    positions, fields, slots, transactions, raws, known, tokens = [], [], [], [], [], [], []
+    for group_positions, amount_columns, first_known in amount_groups:
+        if not amount_columns:
+            continue
+        group_transactions = [transaction_ids.setdefault(logs[position].get("transactionHash"), len(transaction_ids))
+                              for position in group_positions]
+        group_known = [-1 if candidate is None else address_ids.setdefault(candidate.lower(), len(address_ids))
+                       for candidate in first_known]
+        event = results[group_positions[0]]
+        for i, raw_values, column_tokens in amount_columns:
+            slot = slot_ids.setdefault((event["name"], event["inputs"][i]["name"].lower()), len(slot_ids))
+            positions.extend(group_positions)
+            fields.extend([i] * len(group_positions))
+            slots.extend([slot] * len(group_positions))
+            transactions.extend(group_transactions)
+            raws.extend([raw_ids.setdefault(raw, len(raw_ids)) for raw in raw_values])
+            known.extend(group_known)
+            tokens.extend([token_ids.setdefault(token, len(token_ids)) for token in column_tokens])
+    if not positions:
+        return results
+
+    positions = np.array(positions, dtype=np.int64)
+    fields = np.array(fields, dtype=np.int64)
+    # 로그 순서 (같은 로그 안에서는 입력 순서)
+    order = np.lexsort((fields, positions))
+    positions, fields = positions[order], fields[order]
+    slots = np.array(slots, dtype=np.int64)[order]
+    transactions = np.array(transactions, dtype=np.int64)[order]
+    raws = np.array(raws, dtype=np.int64)[order]
+    known = np.array(known, dtype=np.int64)[order]
+    tokens = np.array(tokens, dtype=np.int64)[order]
+
+    _, groups = np.unique(transactions * len(raw_ids) + raws, return_inverse=True)
+    groups = groups.reshape(-1)
+    rows = np.arange(len(groups))
+    # 묶음마다 토큰 주소가 있는 첫 입력 위치. 그 뒤의 입력이 그 주소를 재사용함
+    first = np.full(groups.max() + 1, len(groups), dtype=np.int64)
+    has_token = known >= 0
+    np.minimum.at(first, groups[has_token], rows[has_token])
+    reused = np.flatnonzero(rows > first[groups])
+    if not len(reused):
+        return results
+
+    # 재사용 토큰은 (입력, 주소) 조합마다 한 번만 추론
+    reused_keys, inverse = np.unique(slots[reused] * max(len(address_ids), 1) + known[first[groups[reused]]],
+                                     return_inverse=True)
+    slot_names = list(slot_ids)
+    addresses = list(address_ids)
+    resolved = []
+    for key in reused_keys.tolist():
+        event_name, input_name = slot_names[key // max(len(address_ids), 1)]
+        address = addresses[key % max(len(address_ids), 1)]
+        # value_tokens에 이미 있는 금액과 같은 경로로 추론 (금액 자체는 결과에 영향 없음)
+        token = infer_token_metadata(event_name, input_name, None, (), token_metadata, {None: address})
+        resolved.append(token_ids.setdefault(token, len(token_ids)))
+    reused_tokens = np.array(resolved, dtype=np.int64)[inverse.reshape(-1)]
+    changed = reused_tokens != tokens[reused]
+
+    token_names = list(token_ids)
+    for position, i, token in zip(positions[reused[changed]].tolist(), fields[reused[changed]].tolist(),
+                                  reused_tokens[changed].tolist()):
+        symbol, decimals = token_names[token]
+        field = results[position]["inputs"][i]
+        formatted_value = int(field["rawValue"]) / 10 ** decimals
+        field["formattedValue"] = formatted_value
+        field["symbol"] = symbol
+        field["decimals"] = decimals
+        field["displayValue"] = format_display_value(formatted_value, symbol)
+    return results
+
+
+def decode_logs_vectorized(logs, event_index, token_metadata=None, infer_value_tokens=True):
+    """
+    로그 목록을 이벤트 스펙별로 묶어 배치 디코딩하고 원래 순서대로 이벤트 목록 반환
+
+    결과는 build_transaction_graph에 그대로 넘길 수 있음. 디코딩하지 못한 로그는 제외됨.
+    infer_value_tokens=False이면 같은 금액 -> 토큰 재사용 추론을 건너뜀 (로그마다 독립적으로 추론)
+    """
+    if token_metadata is None:
+        token_metadata = DEFAULT_TOKEN_METADATA
+    results = [None] * len(logs)
+    # id(spec) -> (spec, 로그 위치 목록)
+    groups = {}
+    data_lengths = {}
+    # (주소, topic0, topic 수) -> 스펙. 블록 범위에서는 같은 컨트랙트 / 이벤트가 반복되므로 조회 결과를 재사용
+    spec_cache = {}
+    # 하나씩 디코딩한 로그 위치
+    single_positions = []
+
+    for position, log in enumerate(logs):
+        topics = log.get("topics") or []
+        address = log.get("address", "")
+        cache_key = (address, topics[0] if topics else None, len(topics))
+        if cache_key in spec_cache:
+            spec = spec_cache[cache_key]
+        else:
+            spec = spec_cache[cache_key] = find_event_spec(event_index, address, topics)
+        if spec is None:
+            continue
+
+        # 묶음으로 처리할 수 있는 스펙이면 data hex 길이 (아니면 None)
+        spec_id = id(spec)
+        if spec_id in data_lengths:
+            data_length = data_lengths[spec_id]
+        else:
+            data_words = data_word_count(spec)
+            data_length = data_lengths[spec_id] = None if data_words is None else 2 + data_words * _WORD * 2
+
+        # 0x 접두사가 있는 정상 길이의 로그만 묶음으로 처리
+        data = log.get("data") or "0x"
+        if (data_length is not None and len(data) == data_length and data.startswith("0x")
+                and all(map(_TOPIC_LENGTH.__eq__, map(len, topics)))):
+            groups.setdefault(spec_id, (spec, []))[1].append(position)
+            continue
+
+        # 동적 타입 / 길이가 다른 로그는 하나씩 디코딩
+        try:
+            results[position] = decode_log(log, event_index, token_metadata)
+        except (ValueError, StopIteration):
+            continue
+        single_positions.append(position)
+
+    amount_groups = []
+    for spec, positions in groups.values():
+        try:
+            events, amount_columns, first_known = _decode_batch([logs[position] for position in positions], spec,
+                                                                token_metadata)
+        except ValueError:
+            # hex가 잘못된 로그가 섞여 있으면 해당 묶음만 하나씩 디코딩
+            for position in positions:
+                try:
+                    results[position] = decode_log(logs[position], event_index, token_metadata)
+                except (ValueError, StopIteration):
+                    continue
+                single_positions.append(position)
+            continue
+        for position, event in zip(positions, events):
+            results[position] = event
+        amount_groups.append((positions, amount_columns, first_known))
+
+    if infer_value_tokens:
+        for position in single_positions:
+            if results[position] is not None:
+                amount_groups.append(([position], *_event_amount_columns(results[position], logs[position],
+                                                                         token_metadata)))
+        apply_value_tokens(results, logs, amount_groups, token_metadata)
+    return [event for event in results if event is not None]
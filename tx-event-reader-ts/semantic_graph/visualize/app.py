@@ -2,180 +2,377 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amounts import format_raw_amount
+from extract_semantic import node_attributes
+from graph_formats import arrow_graph_metadata, read_graph_arrow, read_graph_file
+from graph_timeline import load_timeline, render_timeline_html, timeline_from_graph_data
 
 # 샘플 데이터 경로 (실제 데이터 경로로 변경해주세요)
 DATA_PATH = "../../decoded_logs"
+# extract_semantic.py가 그래프 HTML / JSON을 저장하는 경로
+GRAPH_PATH = ".."
+
+# 파일 캐시 항목 수 상한 (초과하면 오래된 항목부터 제거)
+CACHE_MAX_ENTRIES = 32
+# 한 페이지에 표시할 이벤트 수
+EVENTS_PER_PAGE = 50
+# 그래프 파일을 찾는 순서 (batch_semantic / ingest_service의 --format에 따라 확장자가 다름)
+GRAPH_FILE_SUFFIXES = ["_graph.arrow", "_graph.jsonl", "_graph.json"]
+
+# 그래프 화면의 표시 방식 (Timeline은 event_index 순서로 재생)
+GRAPH_MODES = ["Final graph", "Timeline"]
+
+VIEWS = ["Basic Information", "Original Events", "Detailed Information", "Semantic Graph"]
+KNOWN_TRANSACTIONS = {
+    "0xb5c8bd9430b6cc87a0e2fe110ece6bf527fa4f170a4bc8cd032f768fc5219838": "bZx Hack",
+}
+
+
+def _file_mtime(file_path):
+    try:
+        return os.path.getmtime(file_path)
+    except OSError:
+        return None
 
-def load_transaction_data(filename):
-    """파일에서 트랜잭션 데이터를 로드합니다."""
+
+# 경로 + 수정 시각을 키로 캐시하므로 파일이 바뀌면 자동으로 다시 읽음.
+# 큰 트랜잭션을 rerun 마다 복사하지 않도록 cache_resource 사용 (반환값은 읽기 전용으로 취급)
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _read_json(file_path, mtime):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _read_text(file_path, mtime):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def load_transaction_data(filename, data_path=DATA_PATH, required=True):
+    """파일에서 트랜잭션 데이터를 로드합니다. (경로와 수정 시각 기준으로 캐시)"""
+    file_path = os.path.join(data_path, f"{filename}.json")
+    mtime = _file_mtime(file_path)
+    if mtime is None:
+        if required:
+            st.error(f"Error loading data: file '{file_path}' not found")
+        return None
     try:
-        file_path = os.path.join(DATA_PATH, f"{filename}.json")
-        print(file_path)
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return data
+        return _read_json(file_path, mtime)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_transactions(data_path=DATA_PATH):
+    """decoded_logs 디렉토리에서 트랜잭션 해시 목록 스캔"""
+    try:
+        file_names = os.listdir(data_path)
+    except OSError:
+        return []
+    return sorted(
+        name[len("tx_"):-len(".json")]
+        for name in file_names
+        if name.startswith("tx_") and name.endswith(".json") and not name.endswith("_graph.json")
+    )
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES * EVENTS_PER_PAGE, show_spinner=False)
+def _arguments_frame(file_path, mtime, event_position, value_key):
+    """이벤트 하나의 inputs를 DataFrame으로 변환 (펼쳐진 이벤트에 대해서만 호출)"""
+    event = _read_json(file_path, mtime)["events"][event_position]
+    # 필요한 필드만 추출하여 새로운 데이터 구조 생성
+    args_data = []
+    for input_item in event.get("inputs", []):
+        if value_key == "displayValue":
+            value = input_item.get("displayValue", input_item.get("rawValue", ""))
+        else:
+            value = input_item.get("rawValue", "")
+        args_data.append({
+            "Name": input_item.get("name", ""),
+            "Type": input_item.get("type", ""),
+            "Value": str(value)  # 문자열로 변환하여 복잡한 값도 처리
+        })
+    return pd.DataFrame(args_data)
+
+
+def find_graph_file(tx_name, graph_path=GRAPH_PATH):
+    """tx_<hash>의 내보낸 그래프 파일 경로 (arrow / jsonl / json 순서로 찾음, 없으면 None)"""
+    for suffix in GRAPH_FILE_SUFFIXES:
+        file_path = os.path.join(graph_path, tx_name + suffix)
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _graph_frames(file_path, mtime):
+    """
+    그래프 파일을 (노드 DataFrame, 엣지 DataFrame)으로 읽음
+
+    arrow는 memory map한 컬럼과 주소 테이블에서 바로 만들고, 나머지 형식은 read_graph_file로 읽음
+    """
+    if file_path.endswith(".arrow"):
+        table = read_graph_arrow(file_path)
+        metadata = arrow_graph_metadata(table)
+        addresses = pd.Series(metadata["addresses"], dtype=object)
+        node_ids = metadata["addresses"][:metadata["node_count"]]
+        node_attrs = [node_attributes(address, volume) for address, volume in zip(node_ids, metadata["volumes"])]
+        nodes_df = pd.DataFrame({
+            "ID": node_ids,
+            "Type": [attrs["type"] for attrs in node_attrs],
+            "Size": [attrs["size"] for attrs in node_attrs],
+            "Title": [attrs["title"] for attrs in node_attrs],
+        })
+        edges_df = pd.DataFrame({
+            "From": addresses.take(table.column("from").to_numpy()).to_numpy(),
+            "To": addresses.take(table.column("to").to_numpy()).to_numpy(),
+            "Event": table.column("event").to_pandas(),
+            "Token": table.column("token").to_pandas(),
+            "Amount": [format_raw_amount(raw_amount, decimals) if raw_amount else 0 for raw_amount, decimals in
+                       zip(table.column("raw_amount").to_pylist(), table.column("decimals").to_pylist())],
+            "Event Index": table.column("event_index").to_numpy(),
+        })
+        return nodes_df, edges_df
+
+    graph_data = read_graph_file(file_path)
+    nodes_df = pd.DataFrame([{
+        "ID": node.get("id", ""),
+        "Type": node.get("type", ""),
+        "Size": node.get("size", ""),
+        "Title": node.get("title", "")
+    } for node in graph_data.get("nodes", [])])
+    edges_df = pd.DataFrame([{
+        "From": edge.get("from", ""),
+        "To": edge.get("to", ""),
+        "Event": edge.get("event", ""),
+        "Token": edge.get("token", ""),
+        "Amount": edge.get("amount", ""),
+        "Event Index": edge.get("event_index", "")
+    } for edge in graph_data.get("edges", [])])
+    return nodes_df, edges_df
+
+
+def _rules_signature(rules_dir=GRAPH_PATH):
+    """규칙 파일 (이름, 수정 시각) 목록 (규칙이 바뀌면 타임라인 캐시를 다시 만듦)"""
+    try:
+        file_names = sorted(os.listdir(rules_dir))
+    except OSError:
+        return ()
+    return tuple((name, _file_mtime(os.path.join(rules_dir, name))) for name in file_names
+                 if name.endswith(".json") and not name.endswith("_graph.json"))
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _timeline_view(file_path, mtime, rules_signature):
+    """
+    타임라인 HTML과 단계 요약 DataFrame
+
+    원본 로그(decoded_logs)가 있으면 모든 엣지로, 없으면 내보낸 그래프 파일(같은 주소 쌍은 합쳐짐)로 만듦.
+    단계 이동은 HTML 안의 슬라이더가 처리하므로 Streamlit rerun / pyvis 재생성이 일어나지 않음
+    """
+    if file_path.endswith(tuple(GRAPH_FILE_SUFFIXES)):
+        timeline = timeline_from_graph_data(read_graph_file(file_path))
+    else:
+        timeline = load_timeline(file_path, GRAPH_PATH)
+    steps_df = pd.DataFrame(timeline.step_summaries(),
+                            columns=["Event Index", "Events", "Added Edges", "Edges", "Nodes"])
+    # components.html은 srcdoc iframe이라 lib/ 상대 경로를 읽을 수 없으므로 스크립트를 포함
+    html = render_timeline_html(timeline, title=os.path.basename(file_path), height="560px", inline_assets=True)
+    return html, steps_df
+
+
+def show_timeline(tx_name):
+    """event_index 순서로 그래프가 만들어지는 과정을 슬라이더 / 재생 버튼으로 표시"""
+    file_path = os.path.join(DATA_PATH, f"{tx_name}.json")
+    if _file_mtime(file_path) is None:
+        file_path = find_graph_file(tx_name)
+        if file_path is None:
+            st.info("Timeline not available for this transaction.")
+            return
+        st.caption("Decoded log not found: edges between the same addresses are merged in the exported graph.")
+    try:
+        html, steps_df = _timeline_view(file_path, _file_mtime(file_path), _rules_signature())
+    except Exception as e:
+        st.error(f"Error building timeline: {e}")
+        return
+    if not len(steps_df):
+        st.info("No edges in this transaction.")
+        return
+    st.components.v1.html(html, height=620)
+    if st.toggle("Show steps", key=f"timeline_steps_{tx_name}"):
+        st.dataframe(steps_df, hide_index=True)
+
+
+def show_events(filename, data, value_key, title_index_key=None):
+    """이벤트 목록을 페이지 단위로 표시. 인자 표는 사용자가 펼친 이벤트만 생성"""
+    if not data or not data.get("events"):
+        st.info("No transaction events.")
+        return
+
+    events = data["events"]
+    page_count = max(1, (len(events) + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE)
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key=f"page_{value_key}")
+    start = (page - 1) * EVENTS_PER_PAGE
+
+    file_path = os.path.join(DATA_PATH, f"{filename}.json")
+    mtime = _file_mtime(file_path)
+
+    for i in range(start, min(start + EVENTS_PER_PAGE, len(events))):
+        event = events[i]
+        index_label = event.get(title_index_key, "No index") if title_index_key else i + 1
+        st.write(f"**Event #{index_label}: {event.get('name', 'No name')}** — {event.get('address', 'N/A')}")
+
+        if event.get("inputs") and st.toggle("Show arguments", key=f"args_{value_key}_{filename}_{i}"):
+            st.dataframe(_arguments_frame(file_path, mtime, i, value_key), hide_index=True)
+
+
+def show_basic_information(original_filename, source_filename, tx_original_data):
+    st.subheader("Transaction Basic Information")
+    # 다운로드 데이터는 다시 직렬화하지 않고 캐시된 파일 내용을 그대로 사용
+    source_path = os.path.join(DATA_PATH, f"{source_filename}.json")
+    st.download_button(label="Download Raw Data", data=_read_text(source_path, _file_mtime(source_path)),
+                       file_name=f"{original_filename}.json")
+    tx_info = len(tx_original_data["events"])
+    tx_time = tx_original_data.get("timestamp", "N/A")
+    tx_hash = tx_original_data.get("transactionHash", original_filename)
+    df = pd.DataFrame({
+        'Item': ['Event Count', 'Time', 'Hash'],
+        'Value': [str(tx_info), str(tx_time), str(tx_hash)]
+    })
+    st.dataframe(df, hide_index=True)
+
+    st.subheader("Detailed Information")
+    if "show_raw_data" in st.session_state and st.session_state.show_raw_data:
+        st.json(tx_original_data)
+    else:
+        st.info("원본 데이터를 보려면 사이드바에서 'Show raw data'를 체크하세요.")
+
+
+def show_graph_html(tx_name):
+    """extract_semantic.py가 저장한 최종 그래프 HTML 표시"""
+    graph_html_path = os.path.join(GRAPH_PATH, f"{tx_name}_graph.html")
+    mtime = _file_mtime(graph_html_path)
+
+    if mtime is not None:
+        try:
+            # HTML 내용 표시 (파일이 바뀌지 않았으면 캐시된 내용 사용)
+            st.components.v1.html(_read_text(graph_html_path, mtime), height=600, scrolling=True)
+        except Exception as e:
+            st.error(f"Error loading graph visualization: {str(e)}")
+    else:
+        st.info("Graph visualization not available for this transaction.")
+        st.write("Expected path:", graph_html_path)
+
+
+def show_semantic_graph(tx_name):
+    st.subheader("Transaction Graph Data")
+
+    # 그래프 HTML 파일 또는 타임라인 표시
+    with st.expander("Graph Visualization", expanded=True):
+        mode = st.radio("Graph mode", GRAPH_MODES, horizontal=True, key=f"graph_mode_{tx_name}",
+                        label_visibility="collapsed")
+        if mode == "Timeline":
+            show_timeline(tx_name)
+        else:
+            show_graph_html(tx_name)
+
+    # 노드 / 엣지 정보는 요청할 때만 로드
+    if not st.toggle("Show nodes and edges", key=f"graph_tables_{tx_name}"):
+        return
+
+    graph_file = find_graph_file(tx_name)
+    if graph_file is None:
+        st.info("No graph data available.")
+        return
+    try:
+        nodes_df, edges_df = _graph_frames(graph_file, _file_mtime(graph_file))
+    except Exception as e:
+        st.error(f"Error loading graph data: {e}")
+        return
+
+    # 노드 정보 표시
+    with st.expander("Nodes Information", expanded=False):
+        if len(nodes_df):
+            st.dataframe(nodes_df, hide_index=True)
+        else:
+            st.info("No node information available.")
+
+    # 엣지 정보 표시
+    with st.expander("Edges Information", expanded=False):
+        if len(edges_df):
+            st.dataframe(edges_df, hide_index=True)
+        else:
+            st.info("No edge information available.")
+
+
 def read_reciept():
-    original_filename = "0xb5c8bd9430b6cc87a0e2fe110ece6bf527fa4f170a4bc8cd032f768fc5219838"
-    decoded_filename = "tx_0xb5c8bd9430b6cc87a0e2fe110ece6bf527fa4f170a4bc8cd032f768fc5219838"
-    semantic_filename = "tx_0xb5c8bd9430b6cc87a0e2fe110ece6bf527fa4f170a4bc8cd032f768fc5219838_graph"
+    original_filename = st.session_state.get("tx_hash", "")
+    if not original_filename:
+        st.warning("트랜잭션을 선택하거나 해시를 입력하세요.")
+        return
+
+    decoded_filename = f"tx_{original_filename}"
     st.write(f"Transaction Receipt: {original_filename}")
-    
-    # 트랜잭션 데이터 로드
-    tx_original_data = load_transaction_data(original_filename)
-    tx_decoded_data = load_transaction_data(decoded_filename)
-    tx_semantic_data = load_transaction_data(semantic_filename)
+
+    # 원본 데이터가 없으면 디코딩 된 데이터로 대신 표시
+    original_source = original_filename
+    tx_original_data = load_transaction_data(original_filename, required=False)
+    if tx_original_data is None:
+        original_source = decoded_filename
+        tx_original_data = load_transaction_data(decoded_filename)
+
     if tx_original_data:
-        # 탭 생성
-        tab1, tab2, tab3, tab4 = st.tabs(["Basic Information", "Original Events", "Detailed Information", "Semantic Graph"])
-        
-        with tab1:
-            st.subheader("Transaction Basic Information")
-            st.download_button(label="Download Raw Data", data=json.dumps(tx_original_data), file_name=f"{original_filename}.json")
-            tx_info = len(tx_original_data["events"])
-            tx_time = tx_original_data["timestamp"]
-            tx_hash = tx_original_data["transactionHash"]
-            df = pd.DataFrame({
-                'Item': ['Event Count', 'Time', 'Hash'],
-                'Value': [tx_info, tx_time, tx_hash]
-            })
-            st.dataframe(df, hide_index=True)
-            
-            st.subheader("Detailed Information")
-            if "show_raw_data" in st.session_state and st.session_state.show_raw_data:
-                st.json(tx_original_data)
-            else:
-                st.info("원본 데이터를 보려면 사이드바에서 'Show raw data'를 체크하세요.")
-
-        with tab2:
+        # 선택된 화면의 데이터만 로드 / 렌더링
+        view = st.radio("View", VIEWS, horizontal=True, key="view", label_visibility="collapsed")
+
+        if view == "Basic Information":
+            show_basic_information(original_filename, original_source, tx_original_data)
+
+        elif view == "Original Events":
             st.subheader("Original Transaction Events")
-            if "events" in tx_original_data and tx_original_data["events"]:
-                events = tx_original_data["events"]
-                for i, event in enumerate(events):
-                    with st.expander(f"Event #{i+1}: {event.get('name', 'No name')}"):
-                        st.write("**Contract Address:**", event.get("address", "N/A"))
-                        st.write("**Event Name:**", event.get("name", "N/A"))
-                        
-                        if "inputs" in event and event["inputs"]:
-                            st.write("**Arguments:**")
-                            # 필요한 필드만 추출하여 새로운 데이터 구조 생성
-                            args_data = []
-                            for input_item in event["inputs"]:
-                                args_data.append({
-                                    "Name": input_item.get("name", ""),
-                                    "Type": input_item.get("type", ""),
-                                    "Value": str(input_item.get("rawValue", ""))  # 문자열로 변환하여 복잡한 값도 처리
-                                })
-                            args_df = pd.DataFrame(args_data)
-                            st.dataframe(args_df, hide_index=True)
-            else:
-                st.info("No transaction events.")
-        
-        with tab3:
+            show_events(original_source, tx_original_data, "rawValue")
+
+        elif view == "Detailed Information":
             st.subheader("Decoded Transaction Events")
-            if "events" in tx_decoded_data and tx_decoded_data["events"]:
-                events = tx_decoded_data["events"]
-                for i, event in enumerate(events):
-                    with st.expander(f"Event #{event.get('eventIndex', 'No index')}: {event.get('name', 'No name')}"):
-                        st.write("**Contract Address:**", event.get("address", "N/A"))
-                        st.write("**Event Name:**", event.get("name", "N/A"))
-                        
-                        if "inputs" in event and event["inputs"]:
-                            st.write("**Arguments:**")
-                            # 필요한 필드만 추출하여 새로운 데이터 구조 생성
-                            args_data = []
-                            for input_item in event["inputs"]:
-                                args_data.append({
-                                    "Name": input_item.get("name", ""),
-                                    "Type": input_item.get("type", ""),
-                                    "Value": str(input_item.get("displayValue", input_item.get("rawValue", "")))
-                                })
-                            args_df = pd.DataFrame(args_data)
-                            st.dataframe(args_df, hide_index=True)
-            else:
-                st.info("No transaction events.")
-        
-        with tab4:
-            st.subheader("Transaction Graph Data")
-            
-            # 그래프 HTML 파일 표시
-            with st.expander("Graph Visualization", expanded=True):
-                # HTML 파일 경로 생성 (tx_decoded_data 파일 경로에서 파일명 추출)
-                graph_html_path = "../tx_0xb5c8bd9430b6cc87a0e2fe110ece6bf527fa4f170a4bc8cd032f768fc5219838_graph.html"
-                
-                # 디버그 정보 (필요시 주석 해제)
-                # st.write(f"Graph HTML path: {graph_html_path}")
-                # st.write(f"File exists: {os.path.exists(graph_html_path)}")
-                
-                if os.path.exists(graph_html_path):
-                    try:
-                        # HTML 파일 읽기
-                        with open(graph_html_path, 'r', encoding='utf-8') as f:
-                            html_content = f.read()
-                        
-                        # HTML 내용 표시
-                        st.components.v1.html(html_content, height=600, scrolling=True)
-                    except Exception as e:
-                        st.error(f"Error loading graph visualization: {str(e)}")
-                else:
-                    st.info("Graph visualization not available for this transaction.")
-                    st.write("Expected path:", graph_html_path)
-            
-            # 노드 정보 표시
-            with st.expander("Nodes Information", expanded=False):
-                if "nodes" in tx_semantic_data and tx_semantic_data["nodes"]:
-                    nodes_data = []
-                    for node in tx_semantic_data["nodes"]:
-                        nodes_data.append({
-                            "ID": node.get("id", ""),
-                            "Type": node.get("type", ""),
-                            "Size": node.get("size", ""),
-                            "Title": node.get("title", "")
-                        })
-                    nodes_df = pd.DataFrame(nodes_data)
-                    st.dataframe(nodes_df, hide_index=True)
-                else:
-                    st.info("No node information available.")
-            
-            # 엣지 정보 표시
-            with st.expander("Edges Information", expanded=False):
-                if "edges" in tx_semantic_data and tx_semantic_data["edges"]:
-                    edges_data = []
-                    for edge in tx_semantic_data["edges"]:
-                        edges_data.append({
-                            "From": edge.get("from", ""),
-                            "To": edge.get("to", ""),
-                            "Event": edge.get("event", ""),
-                            "Token": edge.get("token", ""),
-                            "Amount": edge.get("amount", ""),
-                            "Event Index": edge.get("event_index", "")
-                        })
-                    edges_df = pd.DataFrame(edges_data)
-                    st.dataframe(edges_df, hide_index=True)
-                else:
-                    st.info("No edge information available.")
+            tx_decoded_data = load_transaction_data(decoded_filename)
+            show_events(decoded_filename, tx_decoded_data, "displayValue", title_index_key="eventIndex")
+
+        else:
+            show_semantic_graph(decoded_filename)
     else:
         st.warning("트랜잭션 데이터를 불러올 수 없습니다.")
 
+
 def load_page():
-    # 파일 목록은 실제 데이터 폴더의 파일을 스캔하도록 수정 가능
-    file_list = ["bZx Hack"]
-    
-    st.sidebar.selectbox("Transaction Selection", file_list, key="file_name")
+    # decoded_logs 폴더의 파일을 스캔해서 트랜잭션 목록 생성
+    file_list = list_transactions()
+
+    selected = st.sidebar.selectbox(
+        "Transaction Selection", file_list, key="file_name",
+        format_func=lambda tx_hash: KNOWN_TRANSACTIONS.get(tx_hash, tx_hash))
+    typed_hash = st.sidebar.text_input("Transaction hash", key="typed_hash").strip()
+    st.session_state.tx_hash = typed_hash or selected or ""
     st.sidebar.checkbox("Show raw data", value=False, key="show_raw_data")
 
     # 함수 자체를 navigation에 전달
     pg = st.navigation([read_reciept])
     pg.run()
 
+
 def main():
     st.title("Transaction Semantic Graph")
     st.write("This app can visualize the semantic graph of a transaction.")
 
     load_page()
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()